@@ -9,20 +9,35 @@ procesamiento y visualización de datos provenientes de un sistema UDP.
 Integra funcionalidades con CustomTkinter y Matplotlib, permitiendo 
 manejar gráficos en tiempo real y controlar múltiples procesos mediante hilos.
 
+Matplotlib se importa al crear la gráfica, después de mostrar la ventana, para
+que la interfaz y la recepción estén disponibles cuanto antes. Los tiempos de
+arranque de cada etapa quedan en `metricas.ARRANQUE`.
+
+Con `proceso=True` la recepción y el registro corren en otro proceso
+(`Calorimetro_Mariana_proceso_v24_1120`) y la gráfica lee las muestras de
+memoria compartida, así que dibujar no frena la adquisición.
+
+El botón "Historial" abre las corridas guardadas
+(`Calorimetro_Mariana_historial_v24_1120`), cargando sólo el intervalo de
+tiempo que se está viendo.
 """
 # Paqueterías a usar
-import tkinter as tk
-from tkinter import ttk    #tkinter para Interfaz grafica
+import tkinter as tk    #tkinter para Interfaz grafica
 import customtkinter as ctk      # Para mejorar la interfaz
-import matplotlib.pyplot as plt  # 3 librearias para graficas 
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.animation import FuncAnimation
-import numpy as np, pandas as pd     #Numpy y pandas para manejo de datos
 import time as tm                #time para marcar tiempos de ejecucion
 import threading as th, queue as qu  #threading para manejo de hilos
-import sys, io
+import os
+import sys
+import logging
 import Calorimetro_Mariana_receiverUDP_v24_1120 as rc
 import Calorimetro_Mariana_senderUDP_v24_1120 as sd
+import Calorimetro_Mariana_consola_v24_1120 as cs
+import Calorimetro_Mariana_grafica_v24_1120 as gr
+import Calorimetro_Mariana_metricas_v24_1120 as mt
+
+log = cs.obtenerLogger("interfaz")
+_t_cuadro = mt.METRICAS.histograma("cuadro_segundos", "Duracion de un cuadro de la grafica en vivo")
+_latencia_grafica = mt.METRICAS.histograma("latencia_grafica_segundos", "Tiempo de la recepcion a la grafica de la ultima muestra")
 
 
 """Interfaz grafica
@@ -49,14 +64,19 @@ class InterfazGrafica:
        Listas para almacenar datos de los ejes X e Y en los gráficos.
    isReceiving, isSending, isWriting : bool
        Bandera para controlar el estado de recepción, envío y registro.
-   recibir : Calorimetro_Mariana_receiverUDP_v24_1120.Recibir
+   recibir : Calorimetro_Mariana_receiverUDP_v24_1120.Recibir or MotorAsincrono
        Instancia de la clase que gestiona la recepción de datos.
-   registro : Calorimetro_Mariana_receiverUDP_v24_1120.Registro
-       Instancia de la clase que gestiona el registro de datos.
+   registro : Calorimetro_Mariana_receiverUDP_v24_1120.Registro or BancoRegistros
+       Instancia de la clase que gestiona el registro de datos (uno por dispositivo al demultiplexar).
    enviar : Calorimetro_Mariana_senderUDP_v24_1120.sender
        Instancia de la clase que gestiona el envío de datos.
+   proceso : Calorimetro_Mariana_proceso_v24_1120.AdquisicionProceso or None
+       Recepción y registro en un proceso aparte (entonces `recibir` y `registro` son None).
+   cola_consola : Calorimetro_Mariana_consola_v24_1120.ColaMensajes
+       Anillo acotado donde los hilos depositan sus mensajes; se dibuja por lotes.
    """
-    def __init__(self, root):
+    def __init__(self, root, motor="hilos", canales=('Temperatura',), puerto_metricas=None, proceso=False,
+                 puertos=(8889,), demultiplexar=None):
         """
         Constructor que inicializa la ventana principal y todos los elementos 
         gráficos, colas y objetos relacionados con el manejo de datos.
@@ -65,6 +85,20 @@ class InterfazGrafica:
         -----------
         root : tkinter.Tk
             Ventana principal de la aplicación.
+        motor : str
+            Motor de recepción: "hilos" (Recibir con selector) o "asyncio" (MotorAsincrono).
+        canales : tuple of str
+            Nombres de los termopares que envía cada dispositivo en un mismo datagrama.
+        puerto_metricas : int, opcional
+            Si se indica, publica las métricas para Prometheus en http://127.0.0.1:<puerto>/metrics.
+        proceso : bool, opcional
+            Recibir y registrar en un proceso aparte, para que la gráfica y la
+            consola no compitan por el GIL con la recepción. Por defecto False.
+        puertos : tuple of int, opcional
+            Puertos UDP de escucha. Por defecto (8889,).
+        demultiplexar : str, opcional
+            Separar los dispositivos por "ip", "direccion" o "puerto": cada uno
+            tiene su registro y se elige cuál graficar. Por defecto None (sin separar).
         """
         self.root=root
         self.root.geometry("800x600")
@@ -81,16 +115,46 @@ class InterfazGrafica:
         self.data_queue = qu.Queue()    #Cola para recibir los datos
         self.data_queue_0 = qu.Queue()  #Cola para manejo de datos intermedios
         self.men_queue = qu.Queue()     #Cola para indicar si se consiguieron los registros necesarios
-        self.data_dict = {'Temperatura': []}
+        self.canales = tuple(canales)
+        self.data_dict = {canal: [] for canal in self.canales}
         self.xs, self.ys= [],[]
         
+        # Consola: los hilos escriben en un anillo acotado, la interfaz lo dibuja por lotes
+        self.cola_consola = cs.ColaMensajes(capacidad=5000)
+        self.periodo_consola = 200      # ms entre dibujados de la consola
+        self.max_lote_consola = 500     # Mensajes dibujados por ciclo como máximo
+        self.max_lineas_consola = 2000  # Líneas retenidas en el widget
+        
         #Crear instancia de las clases provenientes de receiverUDP
-        self.recibir =rc.Recibir(self, self.data_queue, self.data_queue_0)  
-        self.registro= rc.Registro(self, self.data_queue, self.data_queue_0, self.men_queue)     # Registrar      
+        self.proceso = None
+        demultiplexor = rc.Demultiplexor(por=demultiplexar) if demultiplexar else None
+        if proceso:
+            if demultiplexor is not None or len(puertos) > 1:
+                raise ValueError("El proceso de adquisicion atiende un solo puerto y un solo dispositivo")
+            import Calorimetro_Mariana_proceso_v24_1120 as pc
+            self.proceso = pc.AdquisicionProceso(canales=self.canales, puerto=puertos[0], motor=motor)
+            self.proceso.iniciar()
+            self.recibir = self.registro = None
+        elif motor == "asyncio":
+            self.recibir = rc.MotorAsincrono(self, self.data_queue, self.data_queue_0, puertos=puertos,
+                                             canales=self.canales, demultiplexor=demultiplexor)
+        else:
+            self.recibir =rc.Recibir(self, self.data_queue, self.data_queue_0, canales=self.canales, puertos=puertos,
+                                     demultiplexor=demultiplexor)
+        if demultiplexor is not None:
+            self.registro = rc.BancoRegistros(self, self.data_queue, self.data_queue_0, self.men_queue, canales=self.canales)
+        elif self.proceso is None:
+            self.registro= rc.Registro(self, self.data_queue, self.data_queue_0, self.men_queue, canales=self.canales)     # Registrar      
         self.enviar = sd.sender(self)   #Crear instancia de la clase proveniente de senderUDP
         
+        self.servidor_metricas = None
+        if puerto_metricas is not None:
+            self.servidor_metricas = mt.ServidorMetricas(puerto=puerto_metricas)
+            self.servidor_metricas.iniciar()
+        
         # Configuración de la interfaz gráfica
-        self._crearElementosGraficos()
+        with mt.ARRANQUE.medir("interfaz: elementos"):
+            self._crearElementosGraficos()
         
     def _crearElementosGraficos(self):
         """
@@ -120,15 +184,36 @@ class InterfazGrafica:
         #Titulo de cuadro de vuelo
         self.subtitle1 = ctk.CTkLabel(self.frameRight, text="Consola", font=('Verdana',10)).pack(padx=10, pady=10)
         
-        #Grafica 1
-        self.canvas1, self.scatter, self.ax = self.crearGrafica("C vs T") 
-        self.canvas1.draw()
+        # Estadisticas en vivo del primer canal
+        self.etiqueta_est = ctk.CTkLabel(self.frameRight, text="", font=('Verdana',10), justify="left")
+        self.etiqueta_est.pack(side="top", padx=10)
+        
+        # Metricas de la cadena de adquisicion
+        self.etiqueta_met = ctk.CTkLabel(self.frameRight, text="", font=('Verdana',9), justify="left")
+        self.etiqueta_met.pack(side="top", padx=10)
+        self.after_metricas = self.root.after(1000, self._mostrarMetricas)
+        
+        # Dispositivo graficado (al demultiplexar)
+        self.dispositivo_visible = ctk.StringVar(value="")
+        if isinstance(self.registro, rc.BancoRegistros):
+            self.menu_dispositivos = ctk.CTkOptionMenu(self.frameRight, values=[""], variable=self.dispositivo_visible,
+                                                       command=self._cambiarDispositivo)
+            self.menu_dispositivos.pack(side="top", pady=5)
+        
+        #Grafica 1: se crea cuando la ventana ya está visible
+        self.grafica = None
+        self.cuadros = gr.ProgramadorCuadros()
+        self.n_graficadas = 0
+        self.generacion_graficada = None
+        self.root.after(10, self._crearGraficaViva)   # Despues de dibujar la ventana
         
         # Botones en la barra de menú
-        self._crearBotonesMenu()
+        with mt.ARRANQUE.medir("interfaz: botones"):
+            self._crearBotonesMenu()
         
         # Consola de salida
-        self._crearConsola()
+        with mt.ARRANQUE.medir("interfaz: consola"):
+            self._crearConsola()
 
         
     def _crearBotonesMenu(self):
@@ -142,13 +227,21 @@ class InterfazGrafica:
         self.button3 = ctk.CTkButton(self.menu_frame, text="Detener escucha", command=self.detenerRecepcion).pack(side="left", padx=10)
         self.button4 = ctk.CTkButton(self.menu_frame, text="Detener registro", command=self.detenerRegistro).pack(side="left", padx=10)
         self.button5 = ctk.CTkButton(self.menu_frame, text="Detener simulacion", command=self.detenerEnvio).pack(side="left", padx=10)
+        self.button7 = ctk.CTkButton(self.menu_frame, text="Historial", command=self.abrirHistorial).pack(side="left", padx=10)
         self.button6 = ctk.CTkButton(self.menu_frame, text="Apagar y salir", fg_color="#676969", hover_color="gray",command=self.apagar).pack(side="right", pady=10)
         
     def _crearConsola(self):
         """
         Configura un widget de texto para redirigir y mostrar la salida de consola
         dentro de la interfaz gráfica.
+
+        Ni `print` ni `logging` tocan el widget desde otros hilos: ambos escriben en
+        `cola_consola` y `_drenarConsola` la dibuja desde el hilo de Tk.
         """
+        # Nivel mínimo mostrado (DEBUG incluye los mensajes por paquete)
+        self.nivel_consola = ctk.StringVar(value="INFO")
+        ctk.CTkOptionMenu(self.frameRight, values=list(cs.NIVELES), variable=self.nivel_consola,
+                          command=self._cambiarNivelConsola).pack(side="top", pady=5)
         # Crear un widget scrolledtext (Text con barra de desplazamiento) en frameRight
         self.text_out = ctk.CTkTextbox(self.frameRight)
         self.text_out.pack(side='left', expand=True, fill="both", pady=10)
@@ -157,77 +250,168 @@ class InterfazGrafica:
         # Enlazar el scrollbar con el text_out y hacer el textbox de solo lectura
         self.text_out.configure(yscrollcommand=self.scrollbar.set)
         self.text_out.configure(state="disabled")
-        # Redirigir sys.stdout para capturar la salida de la consola
+        # Redirigir sys.stdout y logging al anillo de la consola
         self.stdout_backup = sys.stdout  # Guardar la referencia al stdout original
-        sys.stdout = TextRedirector(self.text_out, "stdout")  # Redirigir stdout a Text widget
+        sys.stdout = cs.SalidaCola(self.cola_consola)
+        self.manejador_consola = cs.configurarConsola(self.cola_consola, self.nivel_consola.get())
+        self.after_consola = self.root.after(self.periodo_consola, self._drenarConsola)
         # Etiqueta inferior de la interfaz
-        self.etiqueta = ctk.CTkLabel(root, text="")
+        self.etiqueta = ctk.CTkLabel(self.root, text="")
         self.etiqueta.pack(side=tk.BOTTOM)
         self.etiqueta.pack(fill=tk.X) 
 
+    def _drenarConsola(self):
+        """
+        Dibuja en la consola los mensajes pendientes, en un solo insert por ciclo.
+
+        Se dibujan como máximo `max_lote_consola` mensajes (el resto espera al
+        siguiente ciclo), se filtran por el nivel elegido y el widget se recorta a
+        `max_lineas_consola` líneas, así que el costo no depende de la tasa de paquetes.
+        """
+        lote, descartados = self.cola_consola.drenar(self.max_lote_consola)
+        minimo = logging.getLevelName(self.nivel_consola.get())
+        lineas = [texto for nivel, texto in lote if nivel >= minimo]
+        if descartados:
+            lineas.insert(0, f"... {descartados} mensajes descartados ...")
+        if lineas:
+            self.text_out.configure(state="normal")
+            self.text_out.insert(tk.END, "\n".join(lineas) + "\n")
+            exceso = int(self.text_out.index("end-1c").split(".")[0]) - 1 - self.max_lineas_consola
+            if exceso > 0:
+                self.text_out.delete("1.0", f"{exceso + 1}.0")
+            self.text_out.see(tk.END)
+            self.text_out.configure(state="disabled")
+        self.after_consola = self.root.after(self.periodo_consola, self._drenarConsola)
+
+    def _cambiarNivelConsola(self, nivel):
+        """
+        Cambia el nivel mínimo de la consola. Los mensajes por debajo del nivel
+        ni siquiera se formatean en los hilos de trabajo.
+        """
+        cs.obtenerLogger().setLevel(nivel)
+
     # Creacion de graficas -----------------------------------------------
     def actualizarPuntos(self):
         """
-        Actualiza los datos del gráfico de dispersión con los nuevos puntos 
-        obtenidos de las colas de datos y mensajes.
-    
-        El método verifica si hay datos disponibles en las colas y actualiza 
-        las coordenadas y valores de color en el gráfico. Además, configura 
-        etiquetas y título del gráfico.
-    
+        Actualiza la gráfica en vivo con las muestras registradas hasta ahora.
+
+        Se llama periódicamente desde el hilo de Tk. Sólo dibuja si llegaron
+        muestras nuevas (las que llegan entre dos cuadros se dibujan juntas) y
+        el siguiente cuadro se programa según el costo medido de dibujar
+        (`ProgramadorCuadros`). También consume los bloques completos que
+        entrega el registro, que quedan en `data_dict`, o, con `proceso`, los
+        eventos del proceso de adquisición.
+
         Returns
         -------
         None.
         """
-        datos_temp= []
-        datos_c=[]
         try:
-            mensaje = self.men_queue.get_nowait()
-            
-            if mensaje == "Datos completos":
-                
-                datos_temp= self.data_queue.get()
-                datos_c= self.calculoCalor()
-                
-                self.scatter.set_offsets(list(zip(datos_temp,datos_c)))
-                self.scatter.set_array(np.array(datos_temp)) # Dado que cmap depende de datos_temp
-                
-                # Volver a dibujar el grafico con los nuevos puntos        
-                self.ax.set_title("Scatter")
-                self.ax.set_xlabel('Eje X')
-                self.ax.set_ylabel('Eje Y')
-                self.canvas1.draw()
-                
-                # Reiniciar el ciclo de recepcion
-                self.men_queue.put("Mensaje incompleto")
-                return              # Salir del bucle tras terminar de actualizar la grafica
-                
+            while self.men_queue.get_nowait() != "Datos completos":
+                pass
+            self.data_dict = self.data_queue.get()     # {canal: arreglo}
         except qu.Empty:
-            print("Sin mensajes recibidos aun")
-            
+            pass
         except Exception as e:
-            print(f"Error inesperado: {e}")
-                 
-    def calculoCalor(self): # Calor aplicado
+            log.error("Error inesperado: %s", e)
+
+        if self.proceso is not None:
+            self.proceso.sondear(self.cola_consola)
+            fuente = self.proceso.anillo             # Memoria compartida con el proceso
+        else:
+            registro = self._registroVisible()
+            fuente = registro.serie if registro is not None else None
+        if fuente is not None and fuente.generacion != self.generacion_graficada:
+            self.generacion_graficada, self.n_graficadas = fuente.generacion, 0     # Registro nuevo
+        if fuente is not None and self.grafica is not None and len(fuente) > self.n_graficadas:     # None: aun sin dispositivos
+            self.n_graficadas = len(fuente)
+            serie = fuente.vista()                   # (t + canales, n), sin copia
+            t = serie[0] - fuente.t0                 # Segundos desde la primera muestra
+            duracion = self.grafica.actualizar(t, serie[1:])
+            self.cuadros.registrar(duracion)
+            _t_cuadro.observar(duracion)
+            _latencia_grafica.observar(tm.time() - serie[0, -1])
+            self._mostrarEstadisticas()
+        self.after = self.root.after(self.cuadros.intervalo(), self.actualizarPuntos)
+    
+    def _mostrarEstadisticas(self):
         """
-        Returns
-        -------
-        None.
+        Muestra las estadísticas en vivo del primer canal (acumuladas y de la ventana más larga)
+        y el último resultado calorimétrico.
+        """
+        if self.proceso is not None:
+            resumen, c = self.proceso.estadisticas, self.proceso.calor
+            if not resumen:
+                return          # Aun no llega el primer estado del proceso
+        else:
+            registro = self._registroVisible()
+            resumen, c = registro.estadisticas.resumen(), registro.calorimetro.ultimo
+        e = resumen[self.canales[0]]
+        w, v = max(e["ventanas"].items())
+        texto = (f"{self.canales[0]}: {e['media']:.3f} ± {e['desviacion']:.3f} (n={e['n']})\n"
+                 f"min {e['minimo']:.3f}  max {e['maximo']:.3f}  EWMA {e['ewma']:.3f}\n"
+                 f"Ultimos {w}: {v['media']:.3f} ± {v['desviacion']:.3f}")
+        if c is not None:
+            texto += f"\nE = {c.energia:.1f} J  dT/dt = {c.dTdt:.4f} K/s\nC = {c.capacidad:.2f} J/K"
+        self.etiqueta_est.configure(text=texto)
+
+    def _registroVisible(self):
+        """
+        Registro cuyas muestras se grafican: el único, o el del dispositivo elegido
+        (el primero que llegó si no se ha elegido). None si aún no llega ninguno.
+        """
+        if not isinstance(self.registro, rc.BancoRegistros):
+            return self.registro
+        nombres = list(self.registro.registros)
+        if nombres and nombres != self.menu_dispositivos.cget("values"):
+            self.menu_dispositivos.configure(values=nombres)
+            if not self.dispositivo_visible.get():
+                self.dispositivo_visible.set(nombres[0])
+        return self.registro.registros.get(self.dispositivo_visible.get())
 
+    def _cambiarDispositivo(self, nombre):
         """
-        intensidad = 0.569  # Amperaje del sistema
-        resistencia = 1.4   # Valor de la resistencia en el circuito
-        delta_t = 0.5       # Diferencia de tiempo entre mediciones
-        
-        q = pow(intensidad, 2)*resistencia*delta_t
-        
-        datos_c = [q for _ in range(3600)]
-        
-        return datos_c
-    
+        Grafica otro dispositivo: se redibuja su serie completa en el siguiente cuadro.
+        """
+        self.generacion_graficada = None
+
+    def _mostrarMetricas(self):
+        """
+        Muestra cada segundo las métricas principales de la cadena de adquisición.
+        """
+        m = mt.METRICAS.resumen()
+        if self.proceso is not None:
+            self.proceso.sondear(self.cola_consola)
+            m.update(self.proceso.metricas)       # Recepcion y registro se miden en el proceso
+
+        def ms(nombre):     # p99 de un histograma, en ms
+            return 1000 * m[nombre][3] if nombre in m else float("nan")
+
+        self.etiqueta_met.configure(text=(
+            f"Recibidos {m.get('datagramas_recibidos_total', 0):.0f}  "
+            f"invalidos {m.get('datagramas_invalidos_total', 0):.0f}\n"
+            f"Perdidos {m.get('secuencia_perdidos_total', 0):.0f}  "
+            f"duplicados {m.get('secuencia_duplicados_total', 0):.0f}  "
+            f"tardios {m.get('secuencia_tardios_total', 0):.0f}\n"
+            f"Cola registro {m.get('cola_registro', 0):.0f}  bitacora {m.get('bitacora_pendientes', 0):.0f}  "
+            f"escritor {m.get('escritor_pendientes', 0):.0f} (esperas {m.get('escritor_esperas_total', 0):.0f})\n"
+            f"p99: verif {ms('verificacion_segundos'):.1f} ms  registro {ms('latencia_registro_segundos'):.1f} ms\n"
+            f"p99: guardado {ms('guardado_segundos'):.1f} ms  grafica {ms('latencia_grafica_segundos'):.0f} ms"))
+        self.after_metricas = self.root.after(1000, self._mostrarMetricas)
+
+    def _crearGraficaViva(self):
+        """
+        Crea la gráfica en vivo (importa matplotlib) una vez mostrada la ventana.
+        """
+        with mt.ARRANQUE.medir("interfaz: grafica"):
+            self.canvas1, self.ax = self.crearGrafica("T vs t")
+            self.grafica = gr.GraficaViva(self.canvas1, self.ax, self.canales)
+            self.canvas1.draw()
+        mt.ARRANQUE.marcar("interfaz: grafica visible")
+
     def crearGrafica(self, titulo):
         """
-        Crea un gráfico vacío para ser actualizado dinámicamente.
+        Crea una gráfica vacía de series de tiempo para ser actualizada dinámicamente.
 
         Parámetros:
         -----------
@@ -236,23 +420,23 @@ class InterfazGrafica:
 
         Retorna:
         --------
-        FigureCanvasTkAgg, matplotlib.scatter, matplotlib.axes:
-            Objeto gráfico y sus elementos para manipulación posterior.
-        """
-        fig, ax = plt.subplots(facecolor="0.55", figsize=(10,8), dpi=100)
-        ax.set_xlim(0, 100)     # Limite eje x 
-        ax.set_ylim(-5, 5)     # Limite eje y 
+        FigureCanvasTkAgg, matplotlib.axes:
+            Objeto gráfico y sus ejes para manipulación posterior.
+        """
+        from matplotlib.figure import Figure     # Sin pyplot: la figura vive solo en Tk
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        fig = Figure(facecolor="0.55", figsize=(10,8), dpi=100)
+        ax = fig.add_subplot()
+        ax.set_xlim(0, 60)     # Limite eje x, se amplia con los datos
+        ax.set_ylim(0, 100)    # Limite eje y, se amplia con los datos
         ax.set_title(titulo, color='red', size=16, family="Tahoma")
-        ax.set_xlabel("Temperatura")
-        ax.set_ylabel("Calor")
-        
-        # Crear grafico scatter vacio
-        scatter= ax.scatter( [], [], cmap='viridis')     #Inicialmente vacia
+        ax.set_xlabel("Tiempo (s)")
+        ax.set_ylabel("Temperatura")
         
         grafica = FigureCanvasTkAgg(fig, master=self.frameLeft2)
         grafica.get_tk_widget().pack()
         
-        return grafica, scatter, ax
+        return grafica, ax
     
     """ Funciones relativas a widgets de la interfaz grafica 
     ---------------------------------------------------------------------------
@@ -263,7 +447,7 @@ class InterfazGrafica:
         
         Este método lanza un hilo que gestiona la recepción de paquetes de datos 
         en tiempo real, asegurando que la interfaz gráfica no se bloquee 
-        durante este proceso.
+        durante este proceso. Los datagramas se drenan por lotes (`recibirLotes`).
 
         Notas:
         ------
@@ -273,8 +457,11 @@ class InterfazGrafica:
         self.etiqueta.configure(text="Se inicia recepcion de datos")
         if not self.isReceiving:
             self.isReceiving= True
-            self.thread_Reciv = th.Thread(target=self.recibir.recibirDatos)
-            self.thread_Reciv.start()
+            if self.proceso is not None:
+                self.proceso.iniciarRecepcion()
+            else:
+                self.thread_Reciv = th.Thread(target=self.recibir.recibirLotes)
+                self.thread_Reciv.start()
             
     def detenerRecepcion(self):
         """
@@ -283,7 +470,10 @@ class InterfazGrafica:
         Cambia la bandera `isReceiving` a `False` para finalizar el hilo asociado 
         a la recepción de paquetes. Esto asegura que no se sigan procesando datos entrantes.
         """
-        self.recibir.detenerRecepcion()
+        if self.proceso is not None:
+            self.proceso.detenerRecepcion()
+        else:
+            self.recibir.detenerRecepcion()
         if self.isReceiving:
             self.isReceiving= False
             if hasattr(self, 'thread_Reciv') and self.thread_Reciv.is_alive():
@@ -300,9 +490,13 @@ class InterfazGrafica:
         self.etiqueta.configure(text="Se inicia registro de datos")
         if not self.isWriting:
             self.isWriting= True
-            self.thread_Reg = th.Thread(target=self.registro.registrarDatos)
-            self.thread_Reg.start()
-            self.after= self.root.after(100, self.actualizarPuntos)  # Llama a la función cada 100 ms
+            if self.proceso is not None:
+                self.proceso.iniciarRegistro()
+            else:
+                self.thread_Reg = th.Thread(target=self.registro.registrarDatos)
+                self.thread_Reg.start()
+            self.n_graficadas = 0
+            self.after= self.root.after(100, self.actualizarPuntos)  # Se reprograma sola con tasa adaptativa
     
     def detenerRegistro(self):
         """
@@ -311,7 +505,10 @@ class InterfazGrafica:
         Cambia la bandera `isWriting` a `False`, finalizando el hilo responsable 
         de escribir datos en el archivo CSV.
         """
-        self.registro.detenerRegistro()
+        if self.proceso is not None:
+            self.proceso.detenerRegistro()
+        else:
+            self.registro.detenerRegistro()
         if self.isWriting:
             self.isWriting=False
             if hasattr(self, 'thread_Reg') and self.thread_Reg.is_alive():
@@ -347,6 +544,19 @@ class InterfazGrafica:
                 self.thread_Send.join(1)     # Esperar a que el hilo de envio termine, si existe
             self.etiqueta.configure(text="Se detiene envio de datos")
  
+    def abrirHistorial(self):
+        """
+        Abre el visor de corridas guardadas en el directorio del registro.
+
+        Las corridas se leen por su índice de tiempo, así que el visor puede
+        usarse mientras se registra sin detener la adquisición.
+        """
+        import Calorimetro_Mariana_historial_v24_1120 as hs     # Solo si se usa
+        directorio = "."
+        if self.registro is not None:
+            directorio = os.path.dirname(os.path.abspath(self.registro.rutaRegistro()))
+        self.historial = hs.VentanaHistorial(self.root, directorio)
+ 
     # Funcion para limpiar un frame
     def clearFrame(frame):
         # destroy all widgets from frame
@@ -366,69 +576,19 @@ class InterfazGrafica:
         self.detenerEnvio()
 
         tm.sleep(1) 
-        sys.stdout = sys.__stdout__
-        root.destroy()
-        root.quit()
+        self.root.after_cancel(self.after_consola)
+        self.root.after_cancel(self.after_metricas)
+        if self.servidor_metricas is not None:
+            self.servidor_metricas.detener()
+        if self.proceso is not None:
+            self.proceso.cerrar()       # Guarda el registro en el proceso y libera la memoria compartida
+        cs.obtenerLogger().removeHandler(self.manejador_consola)
+        sys.stdout = self.stdout_backup
+        self.root.destroy()
+        self.root.quit()
         print("Proceso finalizado")
 
 
-# Clase que redirige stdout al widget Text
-class TextRedirector(io.StringIO):
-    """
-    Clase auxiliar para redirigir la salida estándar de la consola a un widget de texto.
-
-    Atributos:
-    ----------
-    widget : tkinter.Text
-        Widget donde se mostrará la salida redirigida.
-    tag : str
-        Etiqueta asociada al tipo de salida ('stdout' o 'stderr').
-
-    Métodos:
-    --------
-    write:
-        Escribe el texto redirigido en el widget.
-    flush:
-        Mantiene la compatibilidad con el flujo estándar.
-    """
-    def __init__(self, widget, tag=None):
-        """
-        Constructor que inicializa el redireccionamiento.
-
-        Parámetros:
-        -----------
-        widget : tkinter.Text
-            Widget donde se mostrará la salida redirigida.
-        tag : str
-            Etiqueta asociada al tipo de salida ('stdout' o 'stderr').
-        """
-        super().__init__()
-        self.widget = widget
-        self.tag = tag
-
-    def write(self, string):
-        """
-        Escribe una cadena de texto en el widget.
-
-        Parámetros:
-        -----------
-        string : str
-            Texto que será escrito en el widget.
-        """
-        if self.widget.winfo_exists():
-            self.widget.configure(state="normal")
-            self.widget.insert(tk.END, string)  # Insertar texto en el widget Text
-            self.widget.see(tk.END)  # Desplazarse automáticamente hacia el final del texto
-            self.widget.configure(state="disabled")
-        else:
-            sys.stdout = sys.__stdout__
-
-    def flush(self):
-        """
-        Mantiene la compatibilidad con el flujo estándar. Este método no realiza ninguna operación.
-        """
-        pass  # No necesitamos hacer nada para flush en este caso
-
 if __name__ == "__main__":
     ctk.set_appearance_mode("Dark")
     root = ctk.CTk()  # Crear la ventana principal con customtkinter
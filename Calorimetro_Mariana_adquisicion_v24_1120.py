@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Nov 20th 2024
+
+@author: Triton Perea
+
+Adquisición sin interfaz gráfica: recepción UDP + registro (y opcionalmente el
+emisor simulado) para nodos de adquisición sin pantalla.
+
+No importa Tk, customtkinter ni matplotlib. La configuración se toma de un
+archivo JSON (`--config`, con las mismas claves que las opciones largas, p. ej.
+{"puerto": 8889, "canales": ["T1", "T2"], "ruta": "/datos/corrida.npy"}) y las
+opciones de la línea de comandos tienen prioridad. Con `--puertos` se escuchan
+varios puertos a la vez y con `--demultiplexar` cada dispositivo de origen
+(por IP, dirección o puerto; nombres opcionales en la clave "dispositivos" del
+JSON) va a su propio archivo de registro. `--vaciar-muestras`, `--vaciar-segundos`
+y `--vaciar-bytes` fijan cuándo se escribe cada bloque (en un hilo de E/S con
+`--buffers` bloques en vuelo; 0 escribe en el hilo del registro). SIGINT (Ctrl+C) y SIGTERM
+detienen la adquisición de forma ordenada: se guarda lo pendiente del registro
+y se cierra la bitácora.
+
+    python -m Calorimetro_Mariana_adquisicion_v24_1120 --puerto 8889 --ruta corrida.npy
+    python -m Calorimetro_Mariana_adquisicion_v24_1120 --simular simuladorTermico --tasa 100 --duracion 60
+    python -m Calorimetro_Mariana_adquisicion_v24_1120 --puertos 8889 8890 --demultiplexar ip --ruta banco.npy
+"""
+# Importar librerias a usar
+import argparse
+import json
+import logging
+import queue as qu
+import signal
+import threading as th
+import time as tm
+import Calorimetro_Mariana_receiverUDP_v24_1120 as rc
+import Calorimetro_Mariana_protocoloUDP_v24_1120 as pr
+import Calorimetro_Mariana_almacenamiento_v24_1120 as alm
+import Calorimetro_Mariana_consola_v24_1120 as cs
+import Calorimetro_Mariana_metricas_v24_1120 as mt
+
+log = cs.obtenerLogger("adquisicion")
+
+PREDETERMINADOS = {
+    "puerto": 8889, "puertos": None, "demultiplexar": None, "dispositivos": None,
+    "motor": "hilos", "canales": ["Temperatura"], "ruta": "registro.npy",
+    "formato_registro": "npy", "sin_bitacora": False, "intervalo_sync": 1.0,
+    "vaciar_muestras": 3600, "vaciar_segundos": None, "vaciar_bytes": None, "buffers": 2,
+    "simular": None, "formato_trama": "texto", "tasa": 2.0, "ip_emisor": "127.0.0.1",
+    "intervalo_estado": 10.0, "duracion": None, "metricas": None, "nivel": "INFO",
+}
+
+
+def crearParser():
+    """
+    Opciones de la línea de comandos. Todas valen None si no se indican, para
+    poder distinguirlas de los valores del archivo de configuración.
+
+    Returns
+    -------
+    argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser(description="Recepcion y registro UDP sin interfaz grafica",
+                                     argument_default=None)
+    parser.add_argument("--config", help="Archivo JSON de configuracion")
+    parser.add_argument("--puerto", type=int, help="Puerto UDP de escucha (8889)")
+    parser.add_argument("--puertos", type=int, nargs="+", help="Varios puertos UDP de escucha (en lugar de --puerto)")
+    parser.add_argument("--demultiplexar", choices=rc.Demultiplexor.CRITERIOS,
+                        help="Un registro por dispositivo, identificado por ip, direccion o puerto (sin separar)")
+    parser.add_argument("--motor", choices=("hilos", "asyncio"), help="Motor de recepcion (hilos)")
+    parser.add_argument("--canales", nargs="+", help="Nombres de los canales de cada dato (Temperatura)")
+    parser.add_argument("--ruta", help="Archivo o directorio del registro (registro.npy)")
+    parser.add_argument("--formato-registro", choices=alm.FORMATOS_REGISTRO, help="Formato del registro (npy)")
+    parser.add_argument("--sin-bitacora", action="store_const", const=True, help="No escribir la bitacora de recuperacion")
+    parser.add_argument("--intervalo-sync", type=float, help="Segundos entre sincronizaciones de la bitacora (1)")
+    parser.add_argument("--vaciar-muestras", type=int, help="Muestras por bloque escrito (3600)")
+    parser.add_argument("--vaciar-segundos", type=float, help="Escribir el bloque en curso tras estos segundos (sin limite)")
+    parser.add_argument("--vaciar-bytes", type=int, help="Tamano maximo en bytes del bloque en memoria (sin limite)")
+    parser.add_argument("--buffers", type=int, help="Bloques en vuelo hacia el hilo de escritura (2, 0 = sin hilo)")
+    parser.add_argument("--simular", choices=("simuladorRandom", "simuladorTermico", "simuladorCSV"),
+                        help="Lanzar tambien el emisor simulado hacia --ip-emisor y el primer puerto")
+    parser.add_argument("--formato-trama", choices=pr.FORMATOS, help="Formato de trama del emisor simulado (texto)")
+    parser.add_argument("--tasa", type=float, help="Datos por segundo del emisor simulado (2)")
+    parser.add_argument("--ip-emisor", help="Destino del emisor simulado (127.0.0.1)")
+    parser.add_argument("--intervalo-estado", type=float, help="Segundos entre lineas de estado (10, 0 = sin estado)")
+    parser.add_argument("--duracion", type=float, help="Detener tras estos segundos (sin limite)")
+    parser.add_argument("--metricas", type=int, help="Publicar metricas Prometheus en 127.0.0.1:<puerto>")
+    parser.add_argument("--nivel", choices=("DEBUG", "INFO", "WARNING", "ERROR"), help="Nivel de mensajes (INFO)")
+    return parser
+
+
+def cargarConfiguracion(argv=None):
+    """
+    Combina valores predeterminados, archivo de configuración y opciones.
+
+    Parameters
+    ----------
+    argv : list of str, opcional
+        Argumentos de la línea de comandos. Por defecto sys.argv.
+
+    Returns
+    -------
+    dict
+        Configuración final, con las claves de `PREDETERMINADOS`.
+    """
+    args = vars(crearParser().parse_args(argv))
+    config = dict(PREDETERMINADOS)
+    ruta_config = args.pop("config")
+    if ruta_config:
+        with open(ruta_config) as f:
+            archivo = json.load(f)
+        desconocidas = set(archivo) - set(PREDETERMINADOS)
+        if desconocidas:
+            raise ValueError(f"Claves desconocidas en {ruta_config}: {sorted(desconocidas)}")
+        config.update(archivo)
+    config.update({k: v for k, v in args.items() if v is not None})
+    return config
+
+
+class Adquisicion:
+    """
+    Recepción + registro (+ emisor simulado) en hilos, sin interfaz gráfica.
+
+    Atributos:
+    ----------
+    config : dict
+        Configuración (ver `PREDETERMINADOS`).
+    recibir : Recibir or MotorAsincrono
+        Receptor UDP.
+    registro : Registro or BancoRegistros
+        Registro de los datos recibidos (uno por dispositivo si se demultiplexa).
+    enviar : sender or None
+        Emisor simulado, si se pidió.
+    """
+    def __init__(self, config):
+        """
+        Parameters
+        ----------
+        config : dict
+            Configuración (ver `PREDETERMINADOS`).
+        """
+        self.config = config
+        canales = tuple(config["canales"])
+        puertos = tuple(config["puertos"] or (config["puerto"],))
+        self.data_queue, self.data_queue_0, self.men_queue = qu.Queue(), qu.Queue(), qu.Queue()
+        demultiplexor = None
+        if config["demultiplexar"]:
+            demultiplexor = rc.Demultiplexor(config["dispositivos"], por=config["demultiplexar"])
+        if config["motor"] == "asyncio":
+            self.recibir = rc.MotorAsincrono(self, self.data_queue, self.data_queue_0,
+                                             puertos=puertos, canales=canales, demultiplexor=demultiplexor)
+        else:
+            self.recibir = rc.Recibir(self, self.data_queue, self.data_queue_0, puertos=puertos, canales=canales,
+                                      demultiplexor=demultiplexor)
+        politica = alm.PoliticaVaciado(config["vaciar_muestras"], config["vaciar_segundos"], config["vaciar_bytes"])
+        clase = rc.BancoRegistros if demultiplexor is not None else rc.Registro
+        self.registro = clase(True, self.data_queue, self.data_queue_0, self.men_queue, canales=canales,
+                              formato=config["formato_registro"], bitacora=not config["sin_bitacora"],
+                              intervalo_sync=config["intervalo_sync"], serie_viva=False,
+                              politica=politica, buffers=config["buffers"])
+        self.registro.ruta_registro = config["ruta"]
+        self.enviar = None
+        if config["simular"]:
+            import Calorimetro_Mariana_senderUDP_v24_1120 as sd     # Solo si se simula
+            self.enviar = sd.sender(True, config["simular"], config["ip_emisor"], puertos[0],
+                                    formato=config["formato_trama"], n_canales=len(canales), tasa=config["tasa"])
+        self.servidor_metricas = None
+        self._paro = th.Event()
+        self._hilos = []
+
+    def detener(self, *_):
+        """Solicita el paro (seguro desde un manejador de señales)."""
+        self._paro.set()
+
+    def _lanzar(self, objetivo):
+        hilo = th.Thread(target=objetivo, daemon=True)
+        hilo.start()
+        self._hilos.append(hilo)
+        return hilo
+
+    def _estado(self, previo, t_previo):
+        """Escribe una línea de estado y devuelve el contador de muestras registradas."""
+        m = mt.METRICAS.resumen()
+        registradas = m.get("muestras_registradas_total", 0)
+        ahora = tm.monotonic()
+        tasa = (registradas - previo) / (ahora - t_previo) if ahora > t_previo else 0.0
+        log.info("registradas %d (%.1f/s)  recibidos %d  invalidos %d  perdidos %d  cola %d  bitacora %d  "
+                 "escritor %d (esperas %d)",
+                 registradas, tasa, m.get("datagramas_recibidos_total", 0), m.get("datagramas_invalidos_total", 0),
+                 m.get("secuencia_perdidos_total", 0), m.get("cola_registro", 0), m.get("bitacora_pendientes", 0),
+                 m.get("escritor_pendientes", 0), m.get("escritor_esperas_total", 0))
+        return registradas, ahora
+
+    def ejecutar(self):
+        """
+        Arranca los hilos y espera hasta una señal de paro o hasta `duracion`.
+        """
+        config = self.config
+        if config["metricas"] is not None:
+            self.servidor_metricas = mt.ServidorMetricas(puerto=config["metricas"])
+            self.servidor_metricas.iniciar()
+        self._lanzar(self.registro.registrarDatos)
+        self._lanzar(self.recibir.recibirLotes)
+        if self.enviar is not None:
+            self._lanzar(self.enviar.send)
+        log.info("Adquisicion iniciada: puertos %s, registro %s (%s)", ", ".join(map(str, self.recibir.puertos)),
+                 self.registro.rutaRegistro(), config["formato_registro"])
+
+        t_inicio = t_previo = tm.monotonic()
+        previo, intervalo = 0, config["intervalo_estado"]
+        limite = None if config["duracion"] is None else t_inicio + config["duracion"]
+        try:
+            while not self._paro.wait(0.5):
+                self._vaciarColas()
+                ahora = tm.monotonic()
+                if limite is not None and ahora >= limite:
+                    break
+                if intervalo and ahora - t_previo >= intervalo:
+                    previo, t_previo = self._estado(previo, t_previo)
+        finally:
+            self.cerrar()
+
+    def _vaciarColas(self):
+        """Descarta los bloques destinados a la gráfica: sin interfaz nadie los consume."""
+        for cola in (self.data_queue, self.men_queue):
+            try:
+                while True:
+                    cola.get_nowait()
+            except qu.Empty:
+                pass
+
+    def cerrar(self):
+        """
+        Detiene el emisor, el receptor y el registro (en ese orden) y guarda lo pendiente.
+        """
+        if self.enviar is not None:
+            self.enviar.detenerEnvio()
+            tm.sleep(0.2)               # Datagramas del emisor aun en el socket
+        self.recibir.detenerRecepcion()
+        limite = tm.monotonic() + 5.0
+        while (not self.data_queue_0.empty() or self._hilos[1].is_alive()) and tm.monotonic() < limite:
+            tm.sleep(0.05)              # Ultimos lotes en vuelo hacia el registro
+        self.registro.detenerRegistro()
+        for hilo in self._hilos:
+            hilo.join(2)
+        if self.servidor_metricas is not None:
+            self.servidor_metricas.detener()
+        m = mt.METRICAS.resumen()
+        log.info("Adquisicion detenida: %d datos registrados en %s", m.get("muestras_registradas_total", 0),
+                 self.registro.rutaRegistro())
+
+
+def main(argv=None):
+    config = cargarConfiguracion(argv)
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(message)s", datefmt="%H:%M:%S")
+    cs.obtenerLogger().setLevel(config["nivel"])
+    adquisicion = Adquisicion(config)
+    signal.signal(signal.SIGINT, adquisicion.detener)
+    signal.signal(signal.SIGTERM, adquisicion.detener)
+    adquisicion.ejecutar()
+
+
+if __name__ == "__main__":
+    main()
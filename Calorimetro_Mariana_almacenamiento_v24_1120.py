@@ -0,0 +1,1447 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Nov 20th 2024
+
+@author: Triton Perea
+
+Formatos de almacenamiento para los bloques de muestras que entrega `Registro`.
+
+Cada escritor recibe bloques columnares de forma (columnas, n) (una fila por
+columna, p. ej. 't' y un canal por termopar) y los agrega al archivo o
+directorio de destino:
+
+- "npy": directorio con un archivo .npy por bloque y un meta.json con los
+  nombres de columna. Es el formato más rápido de escribir y de recargar.
+- "parquet": un archivo Parquet con un row group por bloque (requiere pyarrow).
+- "csv": texto plano, compatible con las versiones anteriores. Se conserva
+  como opción de exportación (ver `exportarCSV`).
+- "zlib" / "lzma": un archivo comprimido para corridas largas. Cada muestra
+  se cuantiza a la resolución del sensor (0.01 por defecto, 1 µs para 't'), se
+  guarda como diferencia con la anterior en el entero más chico que alcance y
+  cada bloque se comprime por separado, así que se lee bloque a bloque (ver
+  `LectorComprimido`). lzma comprime más y zlib es más rápido. Los valores no
+  finitos o fuera de rango (p. ej. ±inf o 1e300) se leen como NaN.
+
+`EscritorFondo` pasa las escrituras de cualquier escritor a un hilo de E/S
+dedicado con un número acotado de bloques en vuelo (doble o triple buffer), y
+`PoliticaVaciado` decide cuándo se entrega un bloque: por número de muestras,
+por tiempo transcurrido o por tamaño en bytes.
+
+`IndiceRegistro` guarda junto a cada registro el intervalo de tiempo y los
+extremos de cada bloque, para cargar sólo un intervalo sin leer el registro
+completo, y `CatalogoCorridas` lista los registros de un directorio.
+
+Además, `BitacoraMmap` es una bitácora de sólo-agregar en un archivo mapeado en
+memoria donde `Registro` escribe cada muestra al llegar. Si el proceso termina
+de forma inesperada, `recuperarBitacora` pasa al registro normal las muestras
+que aún no se habían guardado.
+"""
+# Importar librerias a usar
+import os
+import json
+from contextlib import nullcontext
+import glob
+import mmap
+import queue
+import struct
+import threading
+import time
+import zlib
+import numpy as np     #Numpy para manejo de datos (pandas se importa solo para CSV y DataFrames)
+
+FORMATOS_REGISTRO = ("npy", "parquet", "csv", "zlib", "lzma")
+FORMATOS_COMPRIMIDOS = ("zlib", "lzma")
+RESOLUCION_SENSOR = 0.01        # Resolucion de los canales en los formatos comprimidos
+RESOLUCION_TIEMPO = 1e-6        # Resolucion (s) de la columna 't' en los formatos comprimidos
+
+
+class EscritorBloques:
+    """
+    Interfaz común de los escritores de bloques.
+
+    Atributos:
+    ----------
+    ruta : str
+        Archivo o directorio de destino.
+    columnas : tuple of str
+        Nombres de las columnas de cada bloque, en el orden de sus filas.
+    n_bloques : int
+        Bloques escritos desde que se abrió el escritor.
+    n_muestras : int
+        Muestras escritas desde que se abrió el escritor.
+    duradero : bool
+        Si cada bloque queda legible en disco al terminar `escribir`. Si es
+        False, lo escrito sólo está a salvo después de `cerrar`.
+    """
+    formato = None
+    duradero = True
+
+    def __init__(self, ruta, columnas):
+        """
+        Parameters
+        ----------
+        ruta : str
+            Archivo o directorio de destino.
+        columnas : tuple of str
+            Nombres de las columnas de cada bloque.
+        """
+        self.ruta = ruta
+        self.columnas = tuple(columnas)
+        self.n_bloques = 0
+        self.n_muestras = 0
+
+    def escribir(self, bloque):
+        """
+        Agrega un bloque de muestras al destino.
+
+        Parameters
+        ----------
+        bloque : numpy.ndarray
+            Muestras de forma (columnas, n).
+        """
+        bloque = np.asarray(bloque)
+        if bloque.shape[-1] == 0:
+            return
+        self._escribir(bloque)
+        self.n_bloques += 1
+        self.n_muestras += bloque.shape[-1]
+
+    def _escribir(self, bloque):
+        raise NotImplementedError
+
+    def cerrar(self):
+        """
+        Libera los recursos del escritor. Los datos ya escritos quedan en disco.
+        """
+        pass
+
+
+class EscritorNPY(EscritorBloques):
+    """
+    Escribe cada bloque como un archivo .npy (float64, forma (columnas, n))
+    dentro de un directorio, con un meta.json que describe las columnas.
+    """
+    formato = "npy"
+
+    def __init__(self, ruta, columnas):
+        super().__init__(ruta, columnas)
+        os.makedirs(ruta, exist_ok=True)
+        meta = os.path.join(ruta, "meta.json")
+        if os.path.exists(meta):
+            with open(meta) as f:
+                previas = tuple(json.load(f)["columnas"])
+            if previas != self.columnas:
+                raise ValueError(f"El registro {ruta} tiene columnas {previas}, no {self.columnas}")
+        else:
+            with open(meta, "w") as f:
+                json.dump({"formato": self.formato, "columnas": list(self.columnas)}, f)
+        self._siguiente = len(bloquesNPY(ruta))     # Continua la numeracion si el directorio ya existe
+
+    def _escribir(self, bloque):
+        nombre = os.path.join(self.ruta, f"bloque_{self._siguiente:06d}.npy")
+        np.save(nombre, np.ascontiguousarray(bloque, dtype=np.float64))
+        self._siguiente += 1
+
+
+class EscritorParquet(EscritorBloques):
+    """
+    Escribe los bloques como row groups de un archivo Parquet con columnas
+    float64 tipadas. Requiere pyarrow.
+
+    Un archivo Parquet no se puede ampliar en su lugar (el pie con los
+    metadatos va al final), así que se escribe en `ruta + ".parcial"`,
+    copiando primero los row groups de `ruta` si ya existe, y `cerrar` lo
+    renombra sobre `ruta`. Hasta entonces `ruta` conserva su contenido
+    anterior y lo nuevo no se puede leer (`duradero` es False).
+    """
+    formato = "parquet"
+    duradero = False
+
+    def __init__(self, ruta, columnas):
+        super().__init__(ruta, columnas)
+        try:
+            import pyarrow as pa, pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("El formato 'parquet' requiere pyarrow (pip install pyarrow)") from e
+        self._pa = pa
+        esquema = pa.schema([(c, pa.float64()) for c in self.columnas])
+        previo = None
+        if os.path.exists(ruta):
+            previo = pq.ParquetFile(ruta)
+            previas = tuple(previo.schema_arrow.names)
+            if previas != self.columnas:
+                raise ValueError(f"El registro {ruta} tiene columnas {previas}, no {self.columnas}")
+        self._ruta_parcial = ruta + ".parcial"      # Si quedo uno de una ejecucion interrumpida, no tiene pie
+        self._writer = pq.ParquetWriter(self._ruta_parcial, esquema)
+        if previo is not None:
+            for i in range(previo.num_row_groups):
+                self._writer.write_table(previo.read_row_group(i).cast(esquema))
+
+    def _escribir(self, bloque):
+        tabla = self._pa.Table.from_arrays([self._pa.array(fila) for fila in bloque], names=list(self.columnas))
+        self._writer.write_table(tabla)
+
+    def cerrar(self):
+        """
+        Cierra el archivo y lo pone en lugar de `ruta`.
+        """
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._writer = None
+        os.replace(self._ruta_parcial, self.ruta)
+
+
+class EscritorCSV(EscritorBloques):
+    """
+    Agrega los bloques a un archivo CSV (formato de las versiones anteriores).
+    """
+    formato = "csv"
+
+    def __init__(self, ruta, columnas):
+        super().__init__(ruta, columnas)
+        self._encabezado = not os.path.exists(ruta)
+
+    def _escribir(self, bloque):
+        import pandas as pd
+        pd.DataFrame(dict(zip(self.columnas, bloque))).to_csv(self.ruta, mode='a', index=False, header=self._encabezado)
+        self._encabezado = False
+
+
+""" Formato comprimido
+-----------------------------------------------------------------------------"""
+_MAGIA_COMPRIMIDO = b"CALZ\x01"
+_CABECERA_BLOQUE = struct.Struct("<IIdd")      # muestras, bytes comprimidos, t inicial, t final
+_CABECERA_COLUMNA = struct.Struct("<qBB")      # primer valor cuantizado, bytes por diferencia, hay NaN
+_ENTEROS = (np.int8, np.int16, np.int32, np.int64)
+_LIMITE_CUANTIZADO = 2.0 ** 62      # |valor * escala| mayor no se cuantiza: sus diferencias desbordarian int64
+
+
+def _compresor(nombre):
+    """(comprimir, descomprimir) del compresor `nombre` ("zlib" o "lzma")."""
+    if nombre == "zlib":
+        return (lambda datos: zlib.compress(datos, 6)), zlib.decompress
+    if nombre == "lzma":
+        import lzma     # Solo si se usa
+        return lzma.compress, lzma.decompress
+    raise ValueError(f"Compresor desconocido: {nombre}")
+
+
+def _codificarColumna(x, escala):
+    """
+    Cuantiza una columna (valor * escala redondeado) y la codifica como el primer
+    valor más las diferencias sucesivas, en el entero más chico que las contenga.
+
+    Los valores no finitos (NaN e infinitos) y los que cuantizados no caben
+    holgadamente en int64 (p. ej. 1e300 de una trama defectuosa) se marcan en
+    una máscara de bits y se decodifican como NaN: un infinito no se conserva.
+    """
+    with np.errstate(invalid="ignore", over="ignore"):
+        escalados = x * escala
+        invalidos = ~(np.abs(escalados) < _LIMITE_CUANTIZADO)       # NaN compara False: tambien invalido
+    hay_nan = bool(invalidos.any())
+    q = np.rint(np.where(invalidos, 0.0, escalados)).astype(np.int64)
+    diferencias = np.diff(q)
+    maximo = int(np.abs(diferencias).max()) if diferencias.size else 0
+    tipo = next(t for t in _ENTEROS if maximo <= np.iinfo(t).max)
+    partes = [_CABECERA_COLUMNA.pack(int(q[0]), np.dtype(tipo).itemsize, hay_nan),
+              diferencias.astype(tipo).tobytes()]
+    if hay_nan:
+        partes.append(np.packbits(invalidos).tobytes())
+    return b"".join(partes)
+
+
+def _decodificarColumna(datos, pos, n, escala):
+    """Inversa de `_codificarColumna`. Devuelve (columna float64, posición siguiente)."""
+    primero, ancho, hay_nan = _CABECERA_COLUMNA.unpack_from(datos, pos)
+    pos += _CABECERA_COLUMNA.size
+    tipo = next(t for t in _ENTEROS if np.dtype(t).itemsize == ancho)
+    q = np.empty(n, dtype=np.int64)
+    q[0] = primero
+    np.cumsum(np.frombuffer(datos, tipo, n - 1, pos), dtype=np.int64, out=q[1:])
+    q[1:] += primero
+    pos += (n - 1) * ancho
+    x = q / escala
+    if hay_nan:
+        bytes_mascara = (n + 7) // 8
+        x[np.unpackbits(np.frombuffer(datos, np.uint8, bytes_mascara, pos), count=n).astype(bool)] = np.nan
+        pos += bytes_mascara
+    return x, pos
+
+
+class EscritorComprimido(EscritorBloques):
+    """
+    Agrega los bloques, cuantizados, codificados por diferencias y comprimidos,
+    a un único archivo de sólo-agregar.
+
+    El archivo empieza con una cabecera (columnas, resoluciones y compresor) y
+    sigue con un registro por bloque: una cabecera fija con el número de
+    muestras, el tamaño comprimido y el intervalo de tiempo del bloque, y los
+    datos comprimidos. Cada bloque se comprime por separado, de modo que se
+    puede leer (o saltear) sin descomprimir los demás y un corte inesperado
+    sólo afecta al bloque que se estaba escribiendo, que se descarta al reabrir.
+
+    Atributos:
+    ----------
+    compresor : str
+        "zlib" o "lzma".
+    resoluciones : tuple of float
+        Resolución de cada columna: los valores se guardan como múltiplos de ella.
+    """
+    def __init__(self, ruta, columnas, compresor="zlib", resolucion=RESOLUCION_SENSOR):
+        """
+        Parameters
+        ----------
+        ruta : str
+            Archivo de destino. Si existe y es compatible, se continúa.
+        columnas : tuple of str
+            Nombres de las columnas de cada bloque.
+        compresor : str, opcional
+            "zlib" o "lzma". Por defecto "zlib".
+        resolucion : float, opcional
+            Resolución de los canales. La columna 't' usa `RESOLUCION_TIEMPO`. Por defecto 0.01.
+        """
+        super().__init__(ruta, columnas)
+        self.formato = self.compresor = compresor
+        self._comprimir = _compresor(compresor)[0]
+        self.resoluciones = tuple(RESOLUCION_TIEMPO if c == "t" else resolucion for c in self.columnas)
+        self._escalas = [1.0 / r for r in self.resoluciones]
+        self._i_t = self.columnas.index("t") if "t" in self.columnas else None
+        if os.path.exists(ruta) and os.path.getsize(ruta):
+            lector = LectorComprimido(ruta)
+            if lector.columnas != self.columnas or lector.compresor != compresor:
+                raise ValueError(f"El registro {ruta} tiene columnas {lector.columnas} ({lector.compresor}), "
+                                 f"no {self.columnas} ({compresor})")
+            self.resoluciones, self._escalas = lector.resoluciones, lector._escalas
+            self._f = open(ruta, "r+b")
+            self._f.truncate(lector.fin)        # Descarta un bloque incompleto de un corte inesperado
+            self._f.seek(lector.fin)
+        else:
+            meta = json.dumps({"formato": compresor, "columnas": list(self.columnas),
+                               "resoluciones": list(self.resoluciones)}).encode()
+            self._f = open(ruta, "wb")
+            self._f.write(_MAGIA_COMPRIMIDO + struct.pack("<I", len(meta)) + meta)
+
+    def _escribir(self, bloque):
+        bloque = np.asarray(bloque, dtype=np.float64)
+        crudo = b"".join(_codificarColumna(fila, e) for fila, e in zip(bloque, self._escalas))
+        datos = self._comprimir(crudo)
+        t = bloque[self._i_t] if self._i_t is not None else np.array([np.nan])
+        self._f.write(_CABECERA_BLOQUE.pack(bloque.shape[-1], len(datos), t[0], t[-1]) + datos)
+        self._f.flush()
+
+    def cerrar(self):
+        self._f.close()
+
+
+class LectorComprimido:
+    """
+    Lee un registro "zlib" o "lzma" bloque a bloque.
+
+    Al abrirlo sólo se recorren las cabeceras de los bloques (sin
+    descomprimir), así que `bloques` sirve de índice para leer únicamente
+    los bloques de un intervalo de tiempo.
+
+    Atributos:
+    ----------
+    ruta : str
+        Archivo del registro.
+    columnas : tuple of str
+        Nombres de las columnas.
+    resoluciones : tuple of float
+        Resolución de cada columna.
+    compresor : str
+        "zlib" o "lzma".
+    bloques : list of tuple
+        (posición, muestras, bytes comprimidos, t inicial, t final) de cada bloque completo.
+    fin : int
+        Posición en el archivo donde termina el último bloque completo.
+    """
+    def __init__(self, ruta):
+        """
+        Parameters
+        ----------
+        ruta : str
+            Archivo del registro.
+        """
+        self.ruta = ruta
+        with open(ruta, "rb") as f:
+            if f.read(len(_MAGIA_COMPRIMIDO)) != _MAGIA_COMPRIMIDO:
+                raise ValueError(f"{ruta} no es un registro comprimido")
+            largo, = struct.unpack("<I", f.read(4))
+            meta = json.loads(f.read(largo))
+            tamano = os.fstat(f.fileno()).st_size
+            pos = f.tell()
+            self.bloques = []
+            while pos + _CABECERA_BLOQUE.size <= tamano:
+                f.seek(pos)
+                n, nbytes, t_inicio, t_fin = _CABECERA_BLOQUE.unpack(f.read(_CABECERA_BLOQUE.size))
+                if pos + _CABECERA_BLOQUE.size + nbytes > tamano:
+                    break                               # Bloque cortado a la mitad
+                self.bloques.append((pos, n, nbytes, t_inicio, t_fin))
+                pos += _CABECERA_BLOQUE.size + nbytes
+        self.fin = pos
+        self.columnas = tuple(meta["columnas"])
+        self.resoluciones = tuple(meta["resoluciones"])
+        self.compresor = meta["formato"]
+        self._escalas = [1.0 / r for r in self.resoluciones]
+        self._descomprimir = _compresor(self.compresor)[1]
+
+    def __len__(self):
+        return len(self.bloques)
+
+    @property
+    def n_muestras(self):
+        return sum(b[1] for b in self.bloques)
+
+    def leer(self, i, f=None):
+        """
+        Descomprime el bloque `i`.
+
+        Parameters
+        ----------
+        i : int
+            Índice del bloque en `bloques`.
+        f : file, opcional
+            Archivo ya abierto en modo binario (para no reabrirlo en cada bloque).
+
+        Returns
+        -------
+        numpy.ndarray
+            Bloque float64 de forma (columnas, n).
+        """
+        pos, n, nbytes, _, _ = self.bloques[i]
+        if f is None:
+            with open(self.ruta, "rb") as f:
+                return self.leer(i, f)
+        f.seek(pos + _CABECERA_BLOQUE.size)
+        crudo = self._descomprimir(f.read(nbytes))
+        bloque = np.empty((len(self.columnas), n))
+        p = 0
+        for j, escala in enumerate(self._escalas):
+            bloque[j], p = _decodificarColumna(crudo, p, n, escala)
+        return bloque
+
+    def __iter__(self):
+        with open(self.ruta, "rb") as f:
+            for i in range(len(self.bloques)):
+                yield self.leer(i, f)
+
+
+_ESCRITORES = {"npy": EscritorNPY, "parquet": EscritorParquet, "csv": EscritorCSV,
+               "zlib": lambda ruta, columnas: EscritorComprimido(ruta, columnas, "zlib"),
+               "lzma": lambda ruta, columnas: EscritorComprimido(ruta, columnas, "lzma")}
+
+
+def crearEscritor(formato, ruta, columnas):
+    """
+    Crea el escritor correspondiente al formato indicado.
+
+    Parameters
+    ----------
+    formato : str
+        Uno de FORMATOS_REGISTRO.
+    ruta : str
+        Archivo o directorio de destino.
+    columnas : tuple of str
+        Nombres de las columnas de cada bloque.
+
+    Returns
+    -------
+    EscritorBloques
+    """
+    try:
+        clase = _ESCRITORES[formato]
+    except KeyError:
+        raise ValueError(f"Formato de registro desconocido: {formato}") from None
+    return clase(ruta, columnas)
+
+
+class PoliticaVaciado:
+    """
+    Cuándo se entrega al escritor el bloque en curso: al juntar `muestras`
+    muestras, al pasar `segundos` desde su primera muestra o al ocupar
+    `maximo_bytes`, lo primero que ocurra.
+
+    Atributos:
+    ----------
+    muestras : int
+        Muestras por bloque como máximo.
+    segundos : float or None
+        Edad máxima del bloque en segundos (None: sin límite de tiempo).
+    maximo_bytes : int or None
+        Tamaño máximo del bloque en bytes (None: sin límite de tamaño).
+    """
+    def __init__(self, muestras=3600, segundos=None, maximo_bytes=None):
+        """
+        Parameters
+        ----------
+        muestras : int, opcional
+            Muestras por bloque. Por defecto 3600.
+        segundos : float, opcional
+            Edad máxima del bloque. Por defecto None.
+        maximo_bytes : int, opcional
+            Tamaño máximo del bloque. Por defecto None.
+        """
+        self.muestras = int(muestras)
+        self.segundos = segundos
+        self.maximo_bytes = maximo_bytes
+
+    def capacidad(self, columnas):
+        """
+        Muestras por bloque según los límites de muestras y de bytes.
+
+        Parameters
+        ----------
+        columnas : int
+            Columnas float64 de cada muestra.
+
+        Returns
+        -------
+        int
+        """
+        if self.maximo_bytes is None:
+            return self.muestras
+        return max(1, min(self.muestras, int(self.maximo_bytes) // (8 * columnas)))
+
+    def vencido(self, t_inicio, ahora):
+        """
+        Indica si un bloque que empezó en `t_inicio` debe entregarse por tiempo.
+
+        Parameters
+        ----------
+        t_inicio, ahora : float
+            Marcas de tiempo (time.time) de la primera muestra y actual.
+
+        Returns
+        -------
+        bool
+        """
+        return self.segundos is not None and ahora - t_inicio >= self.segundos
+
+
+class EscritorFondo:
+    """
+    Escribe los bloques de un `EscritorBloques` en un hilo de E/S dedicado.
+
+    `escribir` sólo encola el bloque, así que quien registra no se detiene
+    mientras se escribe en disco. Se admiten como máximo `buffers` bloques
+    entregados sin terminar de escribir; con el bloque que se está llenando,
+    1 es doble buffer y 2 triple. Si el disco no da abasto, `escribir` espera
+    a que termine una escritura y devuelve cuánto esperó (contrapresión).
+    Si una escritura falla, el error queda en `error` y los bloques siguientes
+    no se escriben: siguen en la bitácora, que no se marca como persistida.
+
+    Atributos:
+    ----------
+    escritor : EscritorBloques
+        Escritor que hace la E/S real.
+    buffers : int
+        Bloques entregados sin terminar de escribir, como máximo.
+    esperas : int
+        Veces que `escribir` tuvo que esperar al hilo de E/S.
+    t_espera : float
+        Segundos acumulados de espera.
+    error : Exception or None
+        Primer error de escritura.
+    """
+    def __init__(self, escritor, buffers=2, observar=None):
+        """
+        Parameters
+        ----------
+        escritor : EscritorBloques
+            Escritor que hace la E/S real.
+        buffers : int, opcional
+            Bloques sin terminar de escribir como máximo. Por defecto 2 (triple buffer).
+        observar : callable, opcional
+            Recibe la duración (s) de cada escritura, p. ej. para un histograma.
+        """
+        self.escritor = escritor
+        self.buffers = max(1, int(buffers))
+        self.observar = observar
+        self.esperas, self.t_espera = 0, 0.0
+        self.error = None
+        self._persistidas = self._en_vuelo = 0
+        self._condicion = threading.Condition()
+        self._cola = queue.Queue()
+        self._hilo = threading.Thread(target=self._trabajar, name=f"escritor-{escritor.formato}", daemon=True)
+        self._hilo.start()
+
+    @property
+    def formato(self):
+        return self.escritor.formato
+
+    @property
+    def ruta(self):
+        return self.escritor.ruta
+
+    @property
+    def n_bloques(self):
+        return self.escritor.n_bloques
+
+    @property
+    def duradero(self):
+        return self.escritor.duradero
+
+    @property
+    def n_muestras(self):
+        return self.escritor.n_muestras
+
+    @property
+    def pendientes(self):
+        """int: Bloques entregados que aún no terminan de escribirse."""
+        return self._en_vuelo
+
+    def escribir(self, bloque):
+        """
+        Encola un bloque para escribirlo en el hilo de E/S.
+
+        El bloque no debe modificarse después (los de `BufferMuestras.extraer` no se reutilizan).
+
+        Parameters
+        ----------
+        bloque : numpy.ndarray
+            Muestras de forma (columnas, n).
+
+        Returns
+        -------
+        float
+            Segundos que se esperó por falta de lugar (0.0 si no hubo contrapresión).
+        """
+        espera = 0.0
+        with self._condicion:
+            if self._en_vuelo >= self.buffers:
+                t0 = time.perf_counter()
+                while self._en_vuelo >= self.buffers:
+                    self._condicion.wait()
+                espera = time.perf_counter() - t0
+                self.esperas += 1
+                self.t_espera += espera
+            self._en_vuelo += 1
+        self._cola.put(bloque)
+        return espera
+
+    def _trabajar(self):
+        while True:
+            bloque = self._cola.get()
+            if bloque is None:
+                break
+            escritas = 0
+            if self.error is None:
+                try:
+                    t0 = time.perf_counter()
+                    self.escritor.escribir(bloque)
+                    if self.observar is not None:
+                        self.observar(time.perf_counter() - t0)
+                    escritas = bloque.shape[-1]
+                except Exception as e:
+                    self.error = e
+            with self._condicion:
+                self._en_vuelo -= 1
+                self._persistidas += escritas
+                self._condicion.notify()
+
+    def tomarPersistidas(self):
+        """
+        Muestras escritas desde la llamada anterior.
+
+        Returns
+        -------
+        int
+        """
+        with self._condicion:
+            k, self._persistidas = self._persistidas, 0
+        return k
+
+    def cerrar(self):
+        """
+        Espera a que se escriban los bloques encolados y cierra el escritor.
+        """
+        self._cola.put(None)
+        self._hilo.join()
+        self.escritor.cerrar()
+
+
+def bloquesNPY(ruta):
+    """
+    Lista ordenada de los archivos de bloque de un registro NPY.
+
+    Parameters
+    ----------
+    ruta : str
+        Directorio del registro.
+
+    Returns
+    -------
+    list of str
+    """
+    return sorted(glob.glob(os.path.join(ruta, "bloque_*.npy")))
+
+
+def detectarFormato(ruta):
+    """
+    Deduce el formato de un registro a partir de su ruta.
+
+    Parameters
+    ----------
+    ruta : str
+        Archivo o directorio del registro.
+
+    Returns
+    -------
+    str
+    """
+    if os.path.isdir(ruta):
+        return "npy"
+    with open(ruta, "rb") as f:
+        if f.read(len(_MAGIA_COMPRIMIDO)) == _MAGIA_COMPRIMIDO:
+            return LectorComprimido(ruta).compresor     # Aunque la extension no lo diga
+    return "parquet" if ruta.lower().endswith(".parquet") else "csv"
+
+
+def leerRegistro(ruta, formato=None):
+    """
+    Carga un registro completo en un DataFrame.
+
+    Parameters
+    ----------
+    ruta : str
+        Archivo o directorio del registro.
+    formato : str, opcional
+        Formato del registro. Por defecto se deduce de la ruta.
+
+    Returns
+    -------
+    pd.DataFrame
+    """
+    import pandas as pd
+    formato = formato or detectarFormato(ruta)
+    if formato == "npy":
+        with open(os.path.join(ruta, "meta.json")) as f:
+            columnas = json.load(f)["columnas"]
+        bloques = [np.load(b, mmap_mode="r") for b in bloquesNPY(ruta)]
+        datos = np.concatenate(bloques, axis=1) if bloques else np.empty((len(columnas), 0))
+        return pd.DataFrame(dict(zip(columnas, datos)))
+    if formato in FORMATOS_COMPRIMIDOS:
+        lector = LectorComprimido(ruta)
+        bloques = list(lector)
+        datos = np.concatenate(bloques, axis=1) if bloques else np.empty((len(lector.columnas), 0))
+        return pd.DataFrame(dict(zip(lector.columnas, datos)))
+    if formato == "parquet":
+        return pd.read_parquet(ruta)
+    return pd.read_csv(ruta)
+
+
+def iterarBloques(ruta, formato=None, filas=4096):
+    """
+    Recorre un registro bloque a bloque sin cargarlo completo en memoria.
+
+    Parameters
+    ----------
+    ruta : str
+        Archivo o directorio del registro.
+    formato : str, opcional
+        Formato del registro. Por defecto se deduce de la ruta.
+    filas : int, opcional
+        Muestras por bloque para CSV y Parquet (los bloques NPY y comprimidos
+        se entregan tal como se escribieron). Por defecto 4096.
+
+    Yields
+    ------
+    tuple
+        (columnas, bloque) con `bloque` de forma (columnas, n).
+    """
+    formato = formato or detectarFormato(ruta)
+    if formato == "npy":
+        with open(os.path.join(ruta, "meta.json")) as f:
+            columnas = tuple(json.load(f)["columnas"])
+        for nombre in bloquesNPY(ruta):
+            yield columnas, np.load(nombre, mmap_mode="r")
+    elif formato in FORMATOS_COMPRIMIDOS:
+        lector = LectorComprimido(ruta)
+        for bloque in lector:
+            yield lector.columnas, bloque
+    elif formato == "parquet":
+        import pyarrow.parquet as pq
+        for lote in pq.ParquetFile(ruta).iter_batches(batch_size=filas):
+            yield tuple(lote.schema.names), np.vstack([c.to_numpy(zero_copy_only=False) for c in lote.columns])
+    else:
+        import pandas as pd
+        for df in pd.read_csv(ruta, chunksize=filas):
+            yield tuple(df.columns), df.to_numpy(dtype=np.float64).T
+
+
+def exportarCSV(ruta, ruta_csv, formato=None):
+    """
+    Exporta un registro (NPY, Parquet o comprimido) a CSV.
+
+    Parameters
+    ----------
+    ruta : str
+        Archivo o directorio del registro.
+    ruta_csv : str
+        Archivo CSV de salida.
+    formato : str, opcional
+        Formato del registro. Por defecto se deduce de la ruta.
+    """
+    leerRegistro(ruta, formato).to_csv(ruta_csv, index=False)
+
+
+""" Indice de tiempo y catalogo de corridas
+-----------------------------------------------------------------------------"""
+def firmaRegistro(ruta, formato=None):
+    """
+    Firma que cambia cuando cambia el contenido de un registro (sin leerlo).
+
+    Parameters
+    ----------
+    ruta : str
+        Archivo o directorio del registro.
+    formato : str, opcional
+        Formato del registro. Por defecto se deduce de la ruta.
+
+    Returns
+    -------
+    list
+        Para "npy", [bloques, tamaño del último bloque]; para los demás, [tamaño, mtime en ns].
+    """
+    formato = formato or detectarFormato(ruta)
+    if formato == "npy":
+        bloques = bloquesNPY(ruta)
+        return [len(bloques), os.path.getsize(bloques[-1]) if bloques else 0]
+    estado = os.stat(ruta)
+    return [estado.st_size, estado.st_mtime_ns]
+
+
+class IndiceRegistro:
+    """
+    Índice por bloque de un registro: intervalo de tiempo, número de muestras
+    y mínimo/máximo de cada columna. Permite cargar sólo un intervalo de
+    tiempo leyendo únicamente los bloques que lo tocan.
+
+    El índice se guarda junto al registro ("indice.npz" dentro de un registro
+    NPY, "<registro>.indice.npz" para los demás) y se reutiliza mientras la
+    firma del registro no cambie. Como los registros NPY y comprimidos sólo
+    crecen, si el registro creció sólo se indexan los bloques nuevos. Si el
+    registro no tiene columna 't', el "tiempo" es el número de muestra.
+
+    Atributos:
+    ----------
+    ruta : str
+        Archivo o directorio del registro.
+    formato : str
+        Formato del registro.
+    columnas : tuple of str
+        Nombres de las columnas.
+    t_inicio, t_fin : numpy.ndarray
+        Primer y último tiempo de cada bloque.
+    muestras : numpy.ndarray
+        Muestras de cada bloque (int64).
+    minimos, maximos : numpy.ndarray
+        Extremos de cada columna en cada bloque, forma (bloques, columnas).
+    """
+    FILAS_CSV = 4096        # Filas por bloque al indexar un CSV
+
+    def __init__(self, ruta, formato=None, guardar=True):
+        """
+        Parameters
+        ----------
+        ruta : str
+            Archivo o directorio del registro.
+        formato : str, opcional
+            Formato del registro. Por defecto se deduce de la ruta.
+        guardar : bool, opcional
+            Guardar el índice junto al registro para la próxima vez. Por defecto True.
+        """
+        self.ruta = ruta
+        self.formato = formato or detectarFormato(ruta)
+        self._lector = None             # LectorComprimido o ParquetFile, abierto al indexar
+        self.columnas = ()
+        self.t_inicio, self.t_fin = np.empty(0), np.empty(0)
+        self.muestras = self._posiciones = np.empty(0, dtype=np.int64)     # Posiciones: inicio de cada bloque
+        self.minimos = self.maximos = np.empty((0, 0))
+        firma = firmaRegistro(ruta, self.formato)
+        previo = self._cargar()
+        if previo is not None and previo["firma"] == firma:
+            return
+        desde = 0
+        if previo is not None and self.formato in ("npy",) + FORMATOS_COMPRIMIDOS:
+            desde = len(self.muestras)      # Solo crece: se conservan los bloques ya indexados
+        self._indexar(desde)
+        if guardar:
+            self._guardar(firma)
+
+    @property
+    def ruta_indice(self):
+        """str: Archivo donde se guarda el índice."""
+        if self.formato == "npy":
+            return os.path.join(self.ruta, "indice.npz")
+        return self.ruta + ".indice.npz"
+
+    def __len__(self):
+        return len(self.muestras)
+
+    @property
+    def n_muestras(self):
+        return int(self.muestras.sum())
+
+    @property
+    def intervalo(self):
+        """tuple: (primer tiempo, último tiempo) del registro; NaN si está vacío."""
+        if not len(self):
+            return float("nan"), float("nan")
+        return float(np.nanmin(self.t_inicio)), float(np.nanmax(self.t_fin))
+
+    @property
+    def columna_t(self):
+        """int or None: Índice de la columna 't'."""
+        return self.columnas.index("t") if "t" in self.columnas else None
+
+    # Construccion --------------------------------------------------------
+    def _cargar(self):
+        """Lee el índice guardado. Devuelve su cabecera o None si no hay uno válido."""
+        try:
+            with np.load(self.ruta_indice) as z:
+                meta = json.loads(str(z["meta"]))
+                if meta["formato"] != self.formato:
+                    return None
+                self.columnas = tuple(meta["columnas"])
+                self.t_inicio, self.t_fin = z["t_inicio"], z["t_fin"]
+                self.muestras, self._posiciones = z["muestras"], z["posiciones"]
+                self.minimos, self.maximos = z["minimos"], z["maximos"]
+            return meta
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def _guardar(self, firma):
+        meta = json.dumps({"formato": self.formato, "columnas": list(self.columnas), "firma": firma})
+        try:
+            with open(self.ruta_indice, "wb") as f:
+                np.savez(f, meta=np.array(meta), t_inicio=self.t_inicio, t_fin=self.t_fin, muestras=self.muestras,
+                         posiciones=self._posiciones, minimos=self.minimos, maximos=self.maximos)
+        except OSError:
+            pass        # Directorio de solo lectura: el indice se rehace la proxima vez
+
+    def _indexar(self, desde):
+        """Indexa los bloques a partir de `desde`, conservando las entradas previas."""
+        entradas, posiciones = [], []
+        for posicion, bloque in self._recorrer(desde):
+            entradas.append(bloque)
+            posiciones.append(posicion)
+        n_cols = len(self.columnas)
+        previas = slice(0, desde)
+        i_t = self.columna_t
+        primera = int(self.muestras[previas].sum())
+        t_inicio, t_fin, muestras = [], [], []
+        minimos, maximos = np.full((len(entradas), n_cols), np.nan), np.full((len(entradas), n_cols), np.nan)
+        for k, bloque in enumerate(entradas):
+            n = bloque.shape[-1]
+            if i_t is None:
+                t_inicio.append(primera)
+                t_fin.append(primera + n - 1)
+            else:
+                t_inicio.append(bloque[i_t, 0])
+                t_fin.append(bloque[i_t, -1])
+            primera += n
+            muestras.append(n)
+            finitos = np.isfinite(bloque)
+            con_datos = finitos.any(axis=1)
+            minimos[k, con_datos] = np.where(finitos, bloque, np.inf).min(axis=1)[con_datos]
+            maximos[k, con_datos] = np.where(finitos, bloque, -np.inf).max(axis=1)[con_datos]
+        self.t_inicio = np.concatenate((self.t_inicio[previas], np.array(t_inicio, dtype=np.float64)))
+        self.t_fin = np.concatenate((self.t_fin[previas], np.array(t_fin, dtype=np.float64)))
+        self.muestras = np.concatenate((self.muestras[previas], np.array(muestras, dtype=np.int64)))
+        self._posiciones = np.concatenate((self._posiciones[previas], np.array(posiciones, dtype=np.int64)))
+        self.minimos = np.concatenate((self.minimos[previas].reshape(-1, n_cols), minimos))
+        self.maximos = np.concatenate((self.maximos[previas].reshape(-1, n_cols), maximos))
+
+    def _recorrer(self, desde):
+        """
+        Recorre los bloques a partir de `desde` para indexarlos.
+
+        Yields
+        ------
+        tuple
+            (posición en el archivo o -1, bloque de forma (columnas, n)).
+        """
+        if self.formato == "npy":
+            with open(os.path.join(self.ruta, "meta.json")) as f:
+                self.columnas = tuple(json.load(f)["columnas"])
+            for nombre in bloquesNPY(self.ruta)[desde:]:
+                yield -1, np.load(nombre, mmap_mode="r")
+        elif self.formato in FORMATOS_COMPRIMIDOS:
+            self._lector = LectorComprimido(self.ruta)
+            self.columnas = self._lector.columnas
+            with open(self.ruta, "rb") as f:
+                for i in range(desde, len(self._lector)):
+                    yield self._lector.bloques[i][0], self._lector.leer(i, f)
+        elif self.formato == "parquet":
+            import pyarrow.parquet as pq
+            self._lector = pq.ParquetFile(self.ruta)
+            self.columnas = tuple(self._lector.schema_arrow.names)
+            for i in range(self._lector.num_row_groups):
+                yield -1, self._leerParquet(i)
+        else:
+            with open(self.ruta, "rb") as f:
+                self.columnas = tuple(f.readline().decode().strip().split(","))
+                while True:
+                    posicion = f.tell()
+                    lineas = [linea for _, linea in zip(range(self.FILAS_CSV), f)]
+                    if not lineas:
+                        break
+                    yield posicion, self._parsearCSV(b"".join(lineas))
+
+    # Lectura -------------------------------------------------------------
+    def _leerParquet(self, i):
+        tabla = self._lector.read_row_group(i)
+        return np.vstack([c.to_numpy(zero_copy_only=False) for c in tabla.columns]).astype(np.float64)
+
+    def _parsearCSV(self, datos):
+        import io
+        return np.genfromtxt(io.BytesIO(datos), delimiter=",", dtype=np.float64).reshape(-1, len(self.columnas)).T
+
+    def leerBloque(self, i, f=None):
+        """
+        Lee el bloque `i` completo.
+
+        Parameters
+        ----------
+        i : int
+            Índice del bloque.
+        f : file, opcional
+            Archivo del registro ya abierto en modo binario (formatos comprimidos y CSV).
+
+        Returns
+        -------
+        numpy.ndarray
+            Bloque de forma (columnas, n). En NPY es un mapa de memoria de sólo lectura.
+        """
+        if self.formato == "npy":
+            return np.load(os.path.join(self.ruta, f"bloque_{i:06d}.npy"), mmap_mode="r")
+        if self.formato == "parquet":
+            if self._lector is None:
+                import pyarrow.parquet as pq
+                self._lector = pq.ParquetFile(self.ruta)
+            return self._leerParquet(i)
+        if f is None:
+            with open(self.ruta, "rb") as f:
+                return self.leerBloque(i, f)
+        if self.formato in FORMATOS_COMPRIMIDOS:
+            if self._lector is None:
+                self._lector = LectorComprimido(self.ruta)
+            return self._lector.leer(i, f)
+        f.seek(self._posiciones[i])
+        largo = self._posiciones[i + 1] - self._posiciones[i] if i + 1 < len(self) else -1
+        return self._parsearCSV(f.read(largo))
+
+    def bloquesEn(self, t_inicio=None, t_fin=None):
+        """
+        Bloques que tienen muestras entre `t_inicio` y `t_fin`.
+
+        Parameters
+        ----------
+        t_inicio, t_fin : float, opcional
+            Límites del intervalo (None: sin límite).
+
+        Returns
+        -------
+        numpy.ndarray
+            Índices de los bloques, en orden.
+        """
+        dentro = np.ones(len(self), dtype=bool)
+        if t_inicio is not None:
+            dentro &= self.t_fin >= t_inicio
+        if t_fin is not None:
+            dentro &= self.t_inicio <= t_fin
+        return np.flatnonzero(dentro)
+
+    def iterarIntervalo(self, t_inicio=None, t_fin=None):
+        """
+        Recorre, bloque a bloque, las muestras entre `t_inicio` y `t_fin`.
+
+        Parameters
+        ----------
+        t_inicio, t_fin : float, opcional
+            Límites del intervalo (None: sin límite).
+
+        Yields
+        ------
+        tuple
+            (t, bloque): tiempos (o números de muestra) de forma (n,) y muestras
+            de forma (columnas, n) de cada bloque dentro del intervalo.
+        """
+        i_t = self.columna_t
+        indices = self.bloquesEn(t_inicio, t_fin)
+        primeras = np.concatenate(([0], np.cumsum(self.muestras)))
+        with open(self.ruta, "rb") if self.formato in FORMATOS_COMPRIMIDOS + ("csv",) else nullcontext() as f:
+            for i in indices:
+                bloque = self.leerBloque(int(i), f)
+                if i_t is None:
+                    t = np.arange(primeras[i], primeras[i + 1], dtype=np.float64)
+                else:
+                    t = bloque[i_t]
+                dentro = np.ones(len(t), dtype=bool)
+                if t_inicio is not None and self.t_inicio[i] < t_inicio:
+                    dentro &= t >= t_inicio
+                if t_fin is not None and self.t_fin[i] > t_fin:
+                    dentro &= t <= t_fin
+                if dentro.all():
+                    yield t, np.asarray(bloque)
+                else:
+                    yield t[dentro], np.asarray(bloque[:, dentro])
+
+    def cargarIntervalo(self, t_inicio=None, t_fin=None, maximo=None):
+        """
+        Carga las muestras entre `t_inicio` y `t_fin`.
+
+        Si el intervalo tiene más de `maximo` muestras se devuelve en cambio el
+        resumen por bloque del índice (mínimo y máximo de cada columna en el
+        primer y último tiempo de cada bloque), sin leer el registro.
+
+        Parameters
+        ----------
+        t_inicio, t_fin : float, opcional
+            Límites del intervalo (None: sin límite).
+        maximo : int, opcional
+            Muestras a cargar como máximo. Por defecto sin límite.
+
+        Returns
+        -------
+        tuple
+            (t de forma (n,), datos de forma (columnas, n), True si es el resumen por bloque).
+        """
+        indices = self.bloquesEn(t_inicio, t_fin)
+        if maximo is not None and self.muestras[indices].sum() > maximo:
+            t = np.empty(2 * len(indices))
+            t[0::2], t[1::2] = self.t_inicio[indices], self.t_fin[indices]
+            resumen = np.empty((len(self.columnas), 2 * len(indices)))
+            resumen[:, 0::2] = self.minimos[indices].T
+            resumen[:, 1::2] = self.maximos[indices].T
+            return t, resumen, True
+        partes = list(self.iterarIntervalo(t_inicio, t_fin))
+        if not partes:
+            return np.empty(0), np.empty((len(self.columnas), 0)), False
+        return (np.concatenate([t for t, _ in partes]),
+                np.concatenate([bloque for _, bloque in partes], axis=1), False)
+
+
+class CatalogoCorridas:
+    """
+    Catálogo de los registros (corridas) guardados en un directorio.
+
+    Cada corrida se describe con su formato, columnas, número de muestras e
+    intervalo de tiempo, tomados de su `IndiceRegistro`. El catálogo se guarda
+    en "catalogo.json" dentro del directorio y sólo se vuelven a indexar las
+    corridas cuya firma cambió.
+
+    Atributos:
+    ----------
+    directorio : str
+        Directorio donde se buscan los registros.
+    corridas : list of dict
+        {"nombre", "ruta", "formato", "columnas", "n_muestras", "bloques",
+        "t_inicio", "t_fin", "firma"} de cada corrida, por tiempo de inicio.
+    """
+    ARCHIVO = "catalogo.json"
+
+    def __init__(self, directorio="."):
+        """
+        Parameters
+        ----------
+        directorio : str, opcional
+            Directorio de los registros. Por defecto el actual.
+        """
+        self.directorio = directorio
+        self.corridas = []
+        self.actualizar()
+
+    def _candidatos(self):
+        """(nombre, formato) de cada registro reconocible del directorio."""
+        for nombre in sorted(os.listdir(self.directorio)):
+            ruta = os.path.join(self.directorio, nombre)
+            if os.path.isdir(ruta):
+                if os.path.exists(os.path.join(ruta, "meta.json")):
+                    yield nombre, "npy"
+            else:
+                extension = os.path.splitext(nombre)[1].lower().lstrip(".")
+                if extension not in ("csv", "parquet") + FORMATOS_COMPRIMIDOS:
+                    continue
+                try:
+                    formato = detectarFormato(ruta)
+                except (OSError, ValueError):
+                    continue
+                if extension in FORMATOS_COMPRIMIDOS and formato not in FORMATOS_COMPRIMIDOS:
+                    continue        # Sin la cabecera del formato comprimido: dañado o ajeno
+                yield nombre, formato
+
+    def actualizar(self):
+        """
+        Vuelve a revisar el directorio e indexa las corridas nuevas o modificadas.
+
+        Returns
+        -------
+        list of dict
+            `corridas`.
+        """
+        ruta_catalogo = os.path.join(self.directorio, self.ARCHIVO)
+        try:
+            with open(ruta_catalogo) as f:
+                previas = {c["nombre"]: c for c in json.load(f)}
+        except (OSError, ValueError):
+            previas = {}
+        corridas = []
+        for nombre, formato in self._candidatos():
+            ruta = os.path.join(self.directorio, nombre)
+            try:
+                firma = firmaRegistro(ruta, formato)
+                previa = previas.get(nombre)
+                if previa is not None and previa["firma"] == firma and previa["formato"] == formato:
+                    corridas.append(previa)
+                    continue
+                indice = IndiceRegistro(ruta, formato)
+            except (OSError, ValueError, ImportError):
+                continue            # Registro ilegible o formato sin dependencias: no se lista
+            t_inicio, t_fin = indice.intervalo
+            corridas.append({"nombre": nombre, "ruta": ruta, "formato": formato, "columnas": list(indice.columnas),
+                             "n_muestras": indice.n_muestras, "bloques": len(indice),
+                             "t_inicio": t_inicio, "t_fin": t_fin, "firma": firma})
+        corridas.sort(key=lambda c: (np.nan_to_num(c["t_inicio"], nan=np.inf), c["nombre"]))
+        self.corridas = corridas
+        try:
+            with open(ruta_catalogo, "w") as f:
+                json.dump(corridas, f, indent=1)
+        except OSError:
+            pass
+        return corridas
+
+    def abrir(self, nombre):
+        """
+        Índice de una corrida del catálogo.
+
+        Parameters
+        ----------
+        nombre : str
+            Nombre de la corrida (archivo o directorio dentro de `directorio`).
+
+        Returns
+        -------
+        IndiceRegistro
+        """
+        for c in self.corridas:
+            if c["nombre"] == nombre:
+                return IndiceRegistro(c["ruta"], c["formato"])
+        raise KeyError(f"No hay una corrida {nombre} en {self.directorio}")
+
+
+""" Bitacora de recuperacion
+-----------------------------------------------------------------------------"""
+class BitacoraMmap:
+    """
+    Bitácora de sólo-agregar mapeada en memoria, una fila float64 por muestra.
+
+    Estructura del archivo: una cabecera de 4096 bytes (firma, número de
+    columnas, capacidad en filas, filas escritas, filas ya persistidas en el
+    registro normal y nombres de columna en JSON) seguida de las filas.
+    Escribir una muestra es copiar una fila al mapa y actualizar el contador,
+    sin llamadas al sistema; el contenido se sincroniza a disco (msync) cada
+    `intervalo_sync` segundos.
+
+    Atributos:
+    ----------
+    ruta : str
+        Archivo de la bitácora.
+    columnas : tuple of str
+        Nombres de las columnas de cada fila.
+    capacidad : int
+        Filas disponibles antes de que el archivo tenga que crecer.
+    intervalo_sync : float or None
+        Segundos entre sincronizaciones; 0 sincroniza en cada escritura y None
+        deja la sincronización al sistema operativo.
+    """
+    FIRMA = b"CMLOG001"
+    _CABECERA = struct.Struct("<8sIQQQ")     # firma, columnas, capacidad, n, persistidas
+    TAM_CABECERA = 4096
+
+    def __init__(self, ruta, columnas, capacidad=8192, intervalo_sync=1.0):
+        """
+        Abre (o crea) la bitácora.
+
+        Parameters
+        ----------
+        ruta : str
+            Archivo de la bitácora.
+        columnas : tuple of str
+            Nombres de las columnas.
+        capacidad : int, opcional
+            Filas iniciales del archivo. Por defecto 8192.
+        intervalo_sync : float or None, opcional
+            Segundos entre sincronizaciones a disco. Por defecto 1.0.
+        """
+        self.ruta = ruta
+        self.columnas = tuple(columnas)
+        self.intervalo_sync = intervalo_sync
+        self._t_sync = time.monotonic()
+        nueva = not os.path.exists(ruta) or os.path.getsize(ruta) < self.TAM_CABECERA
+        self._f = open(ruta, "w+b" if nueva else "r+b")
+        if nueva:
+            self.capacidad, self.n, self.persistidas = int(capacidad), 0, 0
+            self._f.truncate(self._tamArchivo(self.capacidad))
+            self._mapear()
+            self._escribirCabecera(nombres=True)
+        else:
+            self._mapear(leer=True)
+
+    def _tamArchivo(self, capacidad):
+        return self.TAM_CABECERA + capacidad * len(self.columnas) * 8
+
+    def _mapear(self, leer=False):
+        self._mm = mmap.mmap(self._f.fileno(), 0)
+        if leer:
+            firma, ncol, self.capacidad, self.n, self.persistidas = self._CABECERA.unpack_from(self._mm)
+            if firma != self.FIRMA:
+                raise ValueError(f"{self.ruta} no es una bitácora de registro")
+            fin = self._mm.find(b"\0", self._CABECERA.size)
+            self.columnas = tuple(json.loads(self._mm[self._CABECERA.size:fin]))
+            if len(self.columnas) != ncol:
+                raise ValueError(f"Cabecera inconsistente en {self.ruta}")
+        self._filas = np.ndarray((self.capacidad, len(self.columnas)), dtype="<f8",
+                                 buffer=self._mm, offset=self.TAM_CABECERA)
+
+    def _escribirCabecera(self, nombres=False):
+        self._CABECERA.pack_into(self._mm, 0, self.FIRMA, len(self.columnas), self.capacidad, self.n, self.persistidas)
+        if nombres:
+            texto = json.dumps(list(self.columnas)).encode()
+            if self._CABECERA.size + len(texto) >= self.TAM_CABECERA:
+                raise ValueError("Demasiadas columnas para la cabecera de la bitácora")
+            self._mm[self._CABECERA.size:self._CABECERA.size + len(texto) + 1] = texto + b"\0"
+
+    def _crecer(self, minimo):
+        capacidad = max(2 * self.capacidad, minimo)
+        del self._filas             # Liberar la vista antes de cerrar el mapa
+        self._mm.flush()
+        self._mm.close()
+        self._f.truncate(self._tamArchivo(capacidad))
+        self.capacidad = capacidad
+        self._mapear()
+        self._escribirCabecera()
+
+    def _sincronizarSiToca(self):
+        if self.intervalo_sync is not None and time.monotonic() - self._t_sync >= self.intervalo_sync:
+            self.sincronizar()
+
+    def agregar(self, fila):
+        """
+        Agrega una muestra (una fila con un valor por columna).
+
+        Parameters
+        ----------
+        fila : array_like
+        """
+        if self.n >= self.capacidad:
+            self._crecer(self.n + 1)
+        self._filas[self.n] = fila
+        self.n += 1
+        self._CABECERA.pack_into(self._mm, 0, self.FIRMA, len(self.columnas), self.capacidad, self.n, self.persistidas)
+        self._sincronizarSiToca()
+
+    def extender(self, filas):
+        """
+        Agrega varias muestras de una vez.
+
+        Parameters
+        ----------
+        filas : numpy.ndarray
+            Muestras de forma (n, columnas).
+        """
+        k = len(filas)
+        if self.n + k > self.capacidad:
+            self._crecer(self.n + k)
+        self._filas[self.n:self.n + k] = filas
+        self.n += k
+        self._escribirCabecera()
+        self._sincronizarSiToca()
+
+    def marcarPersistidas(self, k):
+        """
+        Indica que otras `k` filas ya quedaron guardadas en el registro normal.
+        Cuando todas lo están, la bitácora se rebobina al inicio.
+
+        Parameters
+        ----------
+        k : int
+        """
+        self.persistidas = min(self.n, self.persistidas + k)
+        if self.persistidas == self.n:
+            self.n = self.persistidas = 0
+        self._escribirCabecera()
+
+    def pendientes(self):
+        """
+        Filas escritas que aún no están en el registro normal.
+
+        Returns
+        -------
+        numpy.ndarray
+            Copia de forma (n, columnas).
+        """
+        return np.array(self._filas[self.persistidas:self.n])
+
+    def sincronizar(self):
+        """
+        Fuerza la escritura a disco (msync) del contenido de la bitácora.
+        """
+        self._mm.flush()
+        self._t_sync = time.monotonic()
+
+    def cerrar(self, borrar=False):
+        """
+        Sincroniza y cierra la bitácora.
+
+        Parameters
+        ----------
+        borrar : bool, opcional
+            Si es True se elimina el archivo (cierre limpio). Por defecto False.
+        """
+        if self._mm.closed:
+            return
+        self.sincronizar()
+        del self._filas
+        self._mm.close()
+        self._f.close()
+        if borrar:
+            os.remove(self.ruta)
+
+
+def recuperarBitacora(ruta_bitacora, formato, ruta_registro):
+    """
+    Pasa al registro normal las muestras pendientes de una bitácora que quedó
+    abierta tras un cierre inesperado, y elimina la bitácora.
+
+    Con un escritor no duradero (Parquet) la bitácora conserva todo lo escrito
+    desde que se abrió el registro, así que se agrega al archivo que quedó del
+    último cierre limpio (el ".parcial" sin pie se descarta).
+
+    Parameters
+    ----------
+    ruta_bitacora : str
+        Archivo de la bitácora.
+    formato : str
+        Formato del registro normal.
+    ruta_registro : str
+        Archivo o directorio del registro normal.
+
+    Returns
+    -------
+    int
+        Número de muestras recuperadas.
+    """
+    if not os.path.exists(ruta_bitacora):
+        return 0
+    bitacora = BitacoraMmap(ruta_bitacora, ())
+    pendientes = bitacora.pendientes()
+    if len(pendientes):
+        escritor = crearEscritor(formato, ruta_registro, bitacora.columnas)
+        escritor.escribir(pendientes.T)
+        escritor.cerrar()
+    bitacora.cerrar(borrar=True)
+    return len(pendientes)
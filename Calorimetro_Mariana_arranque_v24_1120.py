@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Nov 20th 2024
+
+@author: Triton Perea
+
+Lanzador de la interfaz gráfica con perfil de arranque.
+
+Importa cada componente por separado y mide cuánto tarda (módulos propios,
+customtkinter y la interfaz), construye la ventana y registra cuándo está
+visible, cuándo la recepción está escuchando y cuándo la gráfica está lista.
+El reporte se escribe en la consola de la interfaz y en stderr:
+
+    python Calorimetro_Mariana_arranque_v24_1120.py --escuchar
+    python Calorimetro_Mariana_arranque_v24_1120.py --solo-perfil     # abre, mide y cierra
+
+Para el detalle por módulo de terceros: python -X importtime ...
+"""
+# Importar librerias a usar
+import argparse
+import importlib
+import sys
+import time as tm
+
+_t0 = tm.perf_counter()
+import Calorimetro_Mariana_metricas_v24_1120 as mt     # incluye numpy
+mt.ARRANQUE.reiniciar()
+mt.ARRANQUE.t0 = _t0
+mt.ARRANQUE.etapas.append(("importar metricas (numpy)", 0.0, tm.perf_counter() - _t0))
+
+# Componentes en orden de dependencia: cada uno se mide sin lo ya importado
+COMPONENTES = (("protocolo", "Calorimetro_Mariana_protocoloUDP_v24_1120"),
+               ("almacenamiento", "Calorimetro_Mariana_almacenamiento_v24_1120"),
+               ("receptor", "Calorimetro_Mariana_receiverUDP_v24_1120"),
+               ("emisor", "Calorimetro_Mariana_senderUDP_v24_1120"),
+               ("customtkinter", "customtkinter"),
+               ("interfaz", "Calorimetro_Mariana_GUI_v24_1120"))
+
+
+def importarComponentes():
+    """
+    Importa los componentes de `COMPONENTES` midiendo cada uno en `ARRANQUE`.
+
+    Returns
+    -------
+    dict
+        {nombre: módulo}
+    """
+    modulos = {}
+    for nombre, modulo in COMPONENTES:
+        with mt.ARRANQUE.medir(f"importar {nombre}"):
+            modulos[nombre] = importlib.import_module(modulo)
+    return modulos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Interfaz grafica con perfil de arranque")
+    parser.add_argument("--motor", choices=("hilos", "asyncio"), default="hilos", help="Motor de recepcion")
+    parser.add_argument("--canales", nargs="+", default=["Temperatura"], help="Nombres de los canales")
+    parser.add_argument("--metricas", type=int, help="Publicar metricas Prometheus en 127.0.0.1:<puerto>")
+    parser.add_argument("--puertos", type=int, nargs="+", default=[8889], help="Puertos UDP de escucha")
+    parser.add_argument("--demultiplexar", choices=("ip", "direccion", "puerto"), help="Un registro y una grafica por dispositivo")
+    parser.add_argument("--proceso", action="store_true", help="Recibir y registrar en un proceso aparte")
+    parser.add_argument("--escuchar", action="store_true", help="Iniciar la recepcion al abrir la ventana")
+    parser.add_argument("--solo-perfil", action="store_true", help="Cerrar al quedar lista la grafica")
+    args = parser.parse_args(argv)
+
+    modulos = importarComponentes()
+    ctk, gui = modulos["customtkinter"], modulos["interfaz"]
+    with mt.ARRANQUE.medir("ventana principal"):
+        ctk.set_appearance_mode("Dark")
+        root = ctk.CTk()
+    with mt.ARRANQUE.medir("interfaz"):
+        app = gui.InterfazGrafica(root, motor=args.motor, canales=tuple(args.canales),
+                                  puerto_metricas=args.metricas, proceso=args.proceso,
+                                  puertos=tuple(args.puertos), demultiplexar=args.demultiplexar)
+    if args.escuchar:
+        with mt.ARRANQUE.medir("iniciar recepcion"):
+            app.iniciarRecepcion()
+    root.after_idle(mt.ARRANQUE.marcar, "ventana visible")
+
+    def reportar():
+        if app.grafica is None:
+            root.after(20, reportar)        # La grafica se crea despues de mostrar la ventana
+            return
+        reporte = mt.ARRANQUE.reporte()
+        gui.log.info("Perfil de arranque:\n%s", reporte)
+        print(reporte, file=sys.__stderr__)
+        if args.solo_perfil:
+            app.apagar()
+
+    root.after(20, reportar)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
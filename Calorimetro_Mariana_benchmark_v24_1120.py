@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Nov 20th 2024
+
+@author: Triton Perea
+
+Benchmark de extremo a extremo sender -> Recibir -> Registro sobre 127.0.0.1.
+
+Usa las clases reales sin la interfaz gráfica (no requiere Tk ni pantalla):
+para cada combinación de tasa de envío y formato de trama envía datos
+simulados, los recibe, verifica y registra, y mide la tasa sostenida, la
+fracción de datos perdidos, los percentiles de latencia de cada etapa (de
+las métricas de la cadena) y el crecimiento de memoria del proceso. Los
+resultados se guardan en JSON para compararlos entre versiones:
+
+    python Calorimetro_Mariana_benchmark_v24_1120.py --tasas 1000 10000 --salida base.json
+    python Calorimetro_Mariana_benchmark_v24_1120.py --tasas 1000 10000 --comparar base.json
+"""
+# Importar librerias a usar
+import argparse
+import json
+import os
+import platform
+import queue as qu
+import resource
+import shutil
+import tempfile
+import threading as th
+import time as tm
+import numpy as np
+import Calorimetro_Mariana_receiverUDP_v24_1120 as rc
+import Calorimetro_Mariana_senderUDP_v24_1120 as sd
+import Calorimetro_Mariana_metricas_v24_1120 as mt
+
+# Histogramas de las metricas reportados por etapa
+ETAPAS = {"verificacion": "verificacion_segundos",
+          "registro": "latencia_registro_segundos",
+          "guardado": "guardado_segundos"}
+
+
+def memoriaResidente():
+    """
+    Memoria residente actual del proceso en bytes (máxima histórica si no hay /proc).
+
+    Returns
+    -------
+    int
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _vaciarColas(colas, activo):
+    """Consume las colas hacia la interfaz gráfica, como lo haría la GUI."""
+    while activo.is_set():
+        for cola in colas:
+            try:
+                while True:
+                    cola.get_nowait()
+            except qu.Empty:
+                pass
+        tm.sleep(0.05)
+
+
+def corrida(tasa, formato, duracion=5.0, n_canales=1, bitacora=True, directorio=None):
+    """
+    Ejecuta una corrida del benchmark.
+
+    Parameters
+    ----------
+    tasa : float
+        Datos por segundo enviados.
+    formato : str
+        Formato de trama ("texto" o "binario").
+    duracion : float, opcional
+        Segundos de envío. Por defecto 5.
+    n_canales : int, opcional
+        Canales por dato. Por defecto 1.
+    bitacora : bool, opcional
+        Activar la bitácora de recuperación del registro. Por defecto True.
+    directorio : str, opcional
+        Directorio donde se escribe el registro. Por defecto uno temporal, que
+        se borra al terminar la corrida.
+
+    Returns
+    -------
+    dict
+        Parámetros y resultados de la corrida.
+    """
+    mt.METRICAS.reiniciar()
+    temporal = directorio is None
+    if temporal:
+        directorio = tempfile.mkdtemp(prefix="calorimetro_bench_")
+    canales = tuple(f"T{i}" for i in range(n_canales)) if n_canales > 1 else ('Temperatura',)
+    data_queue, data_queue_0, men_queue = qu.Queue(), qu.Queue(), qu.Queue()
+    recibir = rc.Recibir(None, data_queue, data_queue_0, UDP_IP="127.0.0.1", port=0,
+                         rcvbuf=8 * 1024 * 1024, canales=canales)
+    registro = rc.Registro(True, data_queue, data_queue_0, men_queue, canales=canales, bitacora=bitacora)
+    registro.ruta_registro = os.path.join(directorio, f"registro_{formato}_{int(tasa)}.npy")
+
+    activo = th.Event()
+    activo.set()
+    hilos = [th.Thread(target=recibir.recibirLotes), th.Thread(target=registro.registrarDatos),
+             th.Thread(target=_vaciarColas, args=((data_queue, men_queue), activo))]
+    memoria0 = memoriaResidente()
+    for hilo in hilos:
+        hilo.start()
+    while recibir.sock.getsockname()[1] == 0:       # Esperar a que el receptor vincule su puerto
+        tm.sleep(0.01)
+
+    n = int(tasa * duracion)
+    emisor = sd.sender(True, "simuladorRandom", "127.0.0.1", recibir.sock.getsockname()[1], n=n,
+                       formato=formato, n_canales=n_canales, tasa=tasa)
+    envio = th.Thread(target=emisor.send)       # send() repite la simulacion hasta detenerEnvio()
+    t0 = tm.perf_counter()
+    envio.start()
+    tm.sleep(duracion)
+    emisor.detenerEnvio()
+    envio.join()
+    # Esperar a que el registro deje de crecer (datos en vuelo)
+    registradas, limite = -1, tm.perf_counter() + 10.0
+    t_ultima = tm.perf_counter()
+    while tm.perf_counter() < limite:
+        actual = mt.METRICAS.resumen().get("muestras_registradas_total", 0)
+        if actual == registradas and data_queue_0.empty():
+            break
+        if actual != registradas:
+            t_ultima = tm.perf_counter()
+        registradas = actual
+        tm.sleep(0.05)
+    t_total = max(t_ultima - t0, emisor.reporte()["duracion"])     # Hasta la ultima muestra registrada
+
+    recibir.detenerRecepcion()
+    hilos[0].join(2)
+    registro.detenerRegistro()
+    hilos[1].join(2)
+    memoria1 = memoriaResidente()
+    activo.clear()
+    hilos[2].join(1)
+    if temporal:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    m = mt.METRICAS.resumen()
+    registradas = int(m.get("muestras_registradas_total", 0))
+    enviados = emisor.reporte()
+    resultado = {
+        "tasa_objetivo": tasa, "formato": formato, "n_canales": n_canales, "bitacora": bitacora,
+        "enviados": enviados["enviados"], "tasa_envio": enviados["tasa_lograda"],
+        "recibidos": int(m.get("datagramas_recibidos_total", 0)), "registrados": registradas,
+        "invalidos": int(m.get("datagramas_invalidos_total", 0)),
+        "perdidos_secuencia": int(m.get("secuencia_perdidos_total", 0)),
+        "fraccion_perdida": 1.0 - registradas / enviados["enviados"] if enviados["enviados"] else 0.0,
+        "tasa_sostenida": registradas / t_total if t_total > 0 else 0.0,
+        "memoria_inicial": memoria0, "crecimiento_memoria": memoria1 - memoria0,
+        "memoria_serie_viva": int(registro.serie._datos.nbytes),
+    }
+    for etapa, nombre in ETAPAS.items():
+        cuenta, media, p50, p99 = m.get(nombre, (0, np.nan, np.nan, np.nan))
+        resultado[f"{etapa}_p50"], resultado[f"{etapa}_p99"] = p50, p99
+    return resultado
+
+
+def comparar(resultados, base):
+    """
+    Compara los resultados con los de una corrida anterior (mismas tasa y formato).
+
+    Parameters
+    ----------
+    resultados : list of dict
+        Resultados actuales.
+    base : list of dict
+        Resultados de referencia.
+
+    Returns
+    -------
+    list of str
+        Una línea por combinación presente en ambas.
+    """
+    def clave(r):
+        return r["tasa_objetivo"], r["formato"], r["n_canales"], r["bitacora"]
+
+    previos = {clave(r): r for r in base}
+    lineas = []
+    for r in resultados:
+        b = previos.get(clave(r))
+        if b is None:
+            continue
+        cambio = (r["tasa_sostenida"] / b["tasa_sostenida"] - 1) * 100 if b["tasa_sostenida"] else float("nan")
+        lineas.append(f"{r['formato']:>8} {r['tasa_objetivo']:>9.0f}/s  tasa {cambio:+6.1f}%  "
+                      f"perdida {b['fraccion_perdida']:.2%} -> {r['fraccion_perdida']:.2%}  "
+                      f"p99 registro {1000 * b['registro_p99']:.2f} -> {1000 * r['registro_p99']:.2f} ms")
+    return lineas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark sender -> Recibir -> Registro por 127.0.0.1")
+    parser.add_argument("--tasas", type=float, nargs="+", default=[100, 1000, 10000], help="Datos por segundo")
+    parser.add_argument("--formatos", nargs="+", choices=sd.pr.FORMATOS, default=list(sd.pr.FORMATOS))
+    parser.add_argument("--duracion", type=float, default=5.0, help="Segundos de envio por corrida")
+    parser.add_argument("--canales", type=int, default=1, help="Canales por dato")
+    parser.add_argument("--sin-bitacora", action="store_true", help="Desactivar la bitacora de recuperacion")
+    parser.add_argument("--salida", default="benchmark.json", help="Archivo JSON de resultados")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args(argv)
+
+    directorio = tempfile.mkdtemp(prefix="calorimetro_bench_")
+    resultados = []
+    try:
+        for formato in args.formatos:
+            for tasa in args.tasas:
+                r = corrida(tasa, formato, args.duracion, args.canales, not args.sin_bitacora, directorio)
+                resultados.append(r)
+                print(f"{formato:>8} {tasa:>9.0f}/s  sostenida {r['tasa_sostenida']:>9.0f}/s  "
+                      f"perdida {r['fraccion_perdida']:6.2%}  p99 verif {1000 * r['verificacion_p99']:.2f} ms  "
+                      f"registro {1000 * r['registro_p99']:.2f} ms  memoria +{r['crecimiento_memoria'] / 2**20:.1f} MiB")
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    with open(args.salida, "w") as f:
+        json.dump({"fecha": tm.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                   "numpy": np.__version__, "plataforma": platform.platform(),
+                   "resultados": resultados}, f, indent=2)
+    if args.comparar:
+        with open(args.comparar) as f:
+            base = json.load(f)["resultados"]
+        print("\n".join(comparar(resultados, base)))
+
+
+if __name__ == "__main__":
+    main()
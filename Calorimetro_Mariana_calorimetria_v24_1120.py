@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Nov 20th 2024
+
+@author: Triton Perea
+
+Cálculos calorimétricos vectorizados sobre arreglos de muestras.
+
+A partir de las marcas de tiempo reales de cada muestra y de los parámetros
+eléctricos del calentador (corriente y resistencia) se obtienen:
+
+- el calor aplicado en cada intervalo, q_i = I² R (t_i - t_{i-1});
+- la energía acumulada, E = Σ q;
+- la razón de calentamiento dT/dt, como pendiente de una regresión lineal de
+  T contra t sobre una ventana deslizante de muestras;
+- la capacidad calorífica C = dE/dT, como pendiente de la regresión de E
+  contra T sobre la misma ventana.
+
+`Calorimetro` procesa el flujo por lotes y conserva sólo la cola de la
+ventana anterior, así que los resultados son idénticos a procesar toda la
+serie de una vez.
+"""
+# Importar librerias a usar
+from collections import namedtuple
+import numpy as np
+
+ResultadoCalorimetria = namedtuple("ResultadoCalorimetria", "t temperatura calor energia dTdt capacidad")
+""" Resultado de `Calorimetro.actualizar`: arreglos alineados con las muestras del lote.
+
+t : tiempos de las muestras (s).
+temperatura : temperaturas de las muestras (NaN donde son inválidas).
+calor : calor aplicado desde la muestra anterior (J).
+energia : energía acumulada desde el inicio (J).
+dTdt : razón de calentamiento sobre la ventana (K/s), NaN con menos de dos muestras válidas.
+capacidad : capacidad calorífica dE/dT sobre la ventana (J/K).
+"""
+
+
+def potencia(intensidad, resistencia):
+    """
+    Potencia disipada por el calentador, P = I² R.
+
+    Parameters
+    ----------
+    intensidad : float or numpy.ndarray
+        Corriente (A), constante o una por muestra.
+    resistencia : float or numpy.ndarray
+        Resistencia (ohm).
+
+    Returns
+    -------
+    float or numpy.ndarray
+        Potencia (W).
+    """
+    return np.square(intensidad) * resistencia
+
+
+def calorAplicado(t, intensidad, resistencia, t_previo=None):
+    """
+    Calor aplicado en cada intervalo entre muestras, con los tiempos reales.
+
+    Parameters
+    ----------
+    t : numpy.ndarray
+        Tiempos de las muestras (s), forma (n,).
+    intensidad : float or numpy.ndarray
+        Corriente (A), constante o una por muestra.
+    resistencia : float or numpy.ndarray
+        Resistencia (ohm).
+    t_previo : float, opcional
+        Tiempo de la muestra anterior al arreglo. Si es None el primer intervalo es 0.
+
+    Returns
+    -------
+    numpy.ndarray
+        Calor (J) de cada intervalo, forma (n,).
+    """
+    t = np.asarray(t, dtype=np.float64)
+    dt = np.diff(t, prepend=t[:1] if t_previo is None else t_previo)
+    return potencia(intensidad, resistencia) * dt
+
+
+def pendienteVentana(x, y, ventana):
+    """
+    Pendiente de la regresión lineal de y contra x sobre una ventana deslizante.
+
+    Las sumas de cada ventana se obtienen de sumas acumuladas (sin recorrer
+    cada ventana) sobre datos centrados, para evitar la cancelación numérica.
+    Las muestras con NaN en x o y se excluyen.
+
+    Parameters
+    ----------
+    x, y : numpy.ndarray
+        Serie, forma (n,).
+    ventana : int
+        Número de muestras de la ventana que termina en cada muestra.
+
+    Returns
+    -------
+    numpy.ndarray
+        Pendiente en cada muestra, forma (n,); NaN si la ventana no tiene al
+        menos dos muestras válidas con x distintas.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    validos = np.isfinite(x) & np.isfinite(y)
+    if not validos.any():
+        return np.full(len(x), np.nan)
+    xc = np.where(validos, x - x[validos][0], 0.0)
+    yc = np.where(validos, y - y[validos][0], 0.0)
+
+    def sumaVentana(a):
+        acumulada = np.concatenate(([0.0], np.cumsum(a)))
+        inicio = np.maximum(np.arange(1, len(a) + 1) - ventana, 0)
+        return acumulada[1:] - acumulada[inicio]
+
+    n = sumaVentana(validos.astype(np.float64))
+    sx, sy = sumaVentana(xc), sumaVentana(yc)
+    sxx, sxy = sumaVentana(xc * xc), sumaVentana(xc * yc)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        den = n * sxx - sx * sx
+        pendiente = (n * sxy - sx * sy) / den
+    return np.where((n >= 2) & (den > 0), pendiente, np.nan)
+
+
+class Calorimetro:
+    """
+    Cálculo calorimétrico incremental sobre el flujo de muestras.
+
+    Atributos:
+    ----------
+    intensidad : float
+        Corriente del calentador (A).
+    resistencia : float
+        Resistencia del calentador (ohm).
+    ventana : int
+        Muestras de la ventana de regresión para dT/dt y la capacidad calorífica.
+    energia : float
+        Energía acumulada desde el inicio (J).
+    ultimo : ResultadoCalorimetria or None
+        Valores de la última muestra procesada (escalares).
+    """
+    def __init__(self, intensidad=0.569, resistencia=1.4, ventana=60):
+        """
+        Parameters
+        ----------
+        intensidad : float, opcional
+            Corriente del calentador (A). Por defecto 0.569.
+        resistencia : float, opcional
+            Resistencia del calentador (ohm). Por defecto 1.4.
+        ventana : int, opcional
+            Muestras de la ventana de regresión. Por defecto 60.
+        """
+        self.intensidad = intensidad
+        self.resistencia = resistencia
+        self.ventana = int(ventana)
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Reinicia la energía acumulada y la ventana de regresión."""
+        self.energia = 0.0
+        self.ultimo = None
+        self._t_previo = None
+        self._cola = np.empty((3, 0))      # t, T y E de las últimas ventana-1 muestras
+
+    @property
+    def potencia(self):
+        """float: Potencia aplicada (W)."""
+        return potencia(self.intensidad, self.resistencia)
+
+    def actualizar(self, t, temperatura, intensidad=None):
+        """
+        Procesa un lote de muestras.
+
+        Parameters
+        ----------
+        t : numpy.ndarray
+            Tiempos de las muestras (s), forma (n,).
+        temperatura : numpy.ndarray
+            Temperaturas, forma (n,). Las inválidas (NaN) no entran en las regresiones.
+        intensidad : numpy.ndarray, opcional
+            Corriente medida en cada muestra. Por defecto la corriente configurada.
+
+        Returns
+        -------
+        ResultadoCalorimetria
+            Arreglos del lote.
+        """
+        t = np.atleast_1d(np.asarray(t, dtype=np.float64))
+        temperatura = np.atleast_1d(np.asarray(temperatura, dtype=np.float64))
+        q = calorAplicado(t, self.intensidad if intensidad is None else intensidad,
+                          self.resistencia, self._t_previo)
+        energia = self.energia + np.cumsum(q)
+        # Regresiones sobre la cola de la ventana anterior + el lote
+        k = self._cola.shape[1]
+        tt = np.concatenate((self._cola[0], t))
+        TT = np.concatenate((self._cola[1], temperatura))
+        EE = np.concatenate((self._cola[2], energia))
+        dTdt = pendienteVentana(tt, TT, self.ventana)[k:]
+        capacidad = pendienteVentana(TT, EE, self.ventana)[k:]
+
+        if len(t):
+            self.energia = float(energia[-1])
+            self._t_previo = t[-1]
+            self._cola = np.vstack((tt, TT, EE))[:, -(self.ventana - 1):] if self.ventana > 1 else np.empty((3, 0))
+            self.ultimo = ResultadoCalorimetria(t[-1], temperatura[-1], q[-1], energia[-1], dTdt[-1], capacidad[-1])
+        return ResultadoCalorimetria(t, temperatura, q, energia, dTdt, capacidad)
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Nov 20th 2024
+
+@author: Triton Perea
+
+Consola de mensajes compartida entre los hilos de trabajo y la interfaz gráfica.
+
+Los hilos (recepción, registro, envío) nunca tocan widgets: sus mensajes de
+`logging` y lo que imprimen con `print` se guardan en un anillo acotado en
+memoria (`ColaMensajes`). La interfaz gráfica lo drena por lotes con un
+temporizador, de modo que el costo de la consola no depende de la tasa de
+paquetes: si llegan más mensajes de los que caben, se descartan los más
+antiguos y se informa cuántos se perdieron.
+"""
+# Importar librerias a usar
+import io
+import logging
+import threading as th
+from collections import deque
+
+NOMBRE_LOGGER = "calorimetro"
+NIVELES = ("DEBUG", "INFO", "WARNING", "ERROR")
+
+
+def obtenerLogger(nombre=None):
+    """
+    Logger de la aplicación (o uno de sus hijos, p. ej. "receptor").
+
+    Parameters
+    ----------
+    nombre : str, opcional
+        Sufijo del logger hijo. Por defecto el logger raíz de la aplicación.
+
+    Returns
+    -------
+    logging.Logger
+    """
+    return logging.getLogger(NOMBRE_LOGGER if not nombre else f"{NOMBRE_LOGGER}.{nombre}")
+
+
+class ColaMensajes:
+    """
+    Anillo acotado de mensajes (nivel, texto), seguro entre hilos.
+
+    Atributos:
+    ----------
+    capacidad : int
+        Máximo de mensajes retenidos; al llenarse se descartan los más antiguos.
+    descartados : int
+        Mensajes descartados desde el último `drenar`.
+    """
+    def __init__(self, capacidad=5000):
+        """
+        Parameters
+        ----------
+        capacidad : int, opcional
+            Máximo de mensajes retenidos. Por defecto 5000.
+        """
+        self.capacidad = capacidad
+        self._mensajes = deque(maxlen=capacidad)
+        self._candado = th.Lock()
+        self.descartados = 0
+
+    def agregar(self, nivel, texto):
+        """
+        Agrega un mensaje. Costo O(1), nunca bloquea por el consumidor.
+
+        Parameters
+        ----------
+        nivel : int
+            Nivel de logging del mensaje.
+        texto : str
+            Texto del mensaje.
+        """
+        with self._candado:
+            if len(self._mensajes) == self.capacidad:
+                self.descartados += 1
+            self._mensajes.append((nivel, texto))
+
+    def drenar(self, maximo=None):
+        """
+        Extrae los mensajes pendientes, en orden de llegada.
+
+        Parameters
+        ----------
+        maximo : int, opcional
+            Máximo de mensajes a extraer. Por defecto todos.
+
+        Returns
+        -------
+        tuple
+            (lista de (nivel, texto), mensajes descartados desde el último drenado).
+        """
+        with self._candado:
+            k = len(self._mensajes) if maximo is None else min(maximo, len(self._mensajes))
+            lote = [self._mensajes.popleft() for _ in range(k)]
+            descartados, self.descartados = self.descartados, 0
+        return lote, descartados
+
+    def __len__(self):
+        return len(self._mensajes)
+
+
+class ManejadorCola(logging.Handler):
+    """
+    Manejador de logging que deposita cada registro formateado en una `ColaMensajes`.
+    """
+    def __init__(self, cola, nivel=logging.INFO):
+        super().__init__(nivel)
+        self.cola = cola
+        self.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s", "%H:%M:%S"))
+
+    def emit(self, record):
+        try:
+            self.cola.agregar(record.levelno, self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
+class SalidaCola(io.TextIOBase):
+    """
+    Sustituto de sys.stdout que envía lo impreso a una `ColaMensajes` (nivel INFO),
+    línea por línea, desde cualquier hilo.
+    """
+    def __init__(self, cola, nivel=logging.INFO):
+        super().__init__()
+        self.cola, self.nivel = cola, nivel
+        self._local = th.local()        # Linea parcial por hilo
+
+    def writable(self):
+        return True
+
+    def write(self, texto):
+        parcial = getattr(self._local, "parcial", "") + texto
+        *lineas, self._local.parcial = parcial.split("\n")
+        for linea in lineas:
+            if linea.strip():
+                self.cola.agregar(self.nivel, linea)
+        return len(texto)
+
+    def flush(self):
+        parcial = getattr(self._local, "parcial", "")
+        if parcial.strip():
+            self.cola.agregar(self.nivel, parcial)
+        self._local.parcial = ""
+
+
+def configurarConsola(cola, nivel=logging.INFO):
+    """
+    Conecta el logger de la aplicación a una `ColaMensajes`.
+
+    Parameters
+    ----------
+    cola : ColaMensajes
+        Anillo de destino.
+    nivel : int or str, opcional
+        Nivel mínimo registrado. Por defecto INFO (los mensajes por paquete,
+        de nivel DEBUG, no se formatean).
+
+    Returns
+    -------
+    ManejadorCola
+        El manejador instalado.
+    """
+    logger = obtenerLogger()
+    manejador = ManejadorCola(cola, logging.DEBUG)
+    logger.addHandler(manejador)
+    logger.setLevel(nivel)
+    logger.propagate = False
+    return manejador
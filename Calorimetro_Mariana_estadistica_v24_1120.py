@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Nov 20th 2024
+
+@author: Triton Perea
+
+Estadísticas incrementales sobre el flujo de muestras recibidas.
+
+Todas las clases se actualizan por lotes de forma (n, canales) con operaciones
+vectorizadas y un costo O(1) por muestra, sin recorrer de nuevo el historial:
+media y varianza acumuladas (Welford, combinando lotes con la fórmula de
+Chan), promedio móvil exponencial (EWMA), mínimo/máximo y estadísticas sobre
+ventanas deslizantes. Los datos inválidos (NaN) se ignoran canal por canal.
+"""
+# Importar librerias a usar
+import threading as th
+import numpy as np
+
+
+def _comoMatriz(valores, n_canales):
+    """Convierte un lote (n,), (n, canales) o una sola muestra en una matriz (n, canales)."""
+    return np.asarray(valores, dtype=np.float64).reshape(-1, n_canales)
+
+
+class EstadisticaAcumulada:
+    """
+    Media, varianza, mínimo, máximo y EWMA de todas las muestras vistas.
+
+    Atributos:
+    ----------
+    canales : tuple of str
+        Nombres de los canales.
+    alfa : float
+        Factor de suavizado del EWMA (0 < alfa <= 1).
+    n : numpy.ndarray
+        Muestras válidas por canal.
+    media, minimo, maximo, ewma : numpy.ndarray
+        Estadísticos por canal (NaN mientras no haya muestras válidas).
+    """
+    def __init__(self, canales=('Temperatura',), alfa=0.1):
+        """
+        Parameters
+        ----------
+        canales : tuple of str, opcional
+            Nombres de los canales. Por defecto ('Temperatura',).
+        alfa : float, opcional
+            Factor de suavizado del EWMA. Por defecto 0.1.
+        """
+        self.canales = tuple(canales)
+        self.alfa = alfa
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Descarta todas las muestras vistas."""
+        c = len(self.canales)
+        self.n = np.zeros(c, dtype=np.int64)
+        self.media = np.zeros(c)
+        self._m2 = np.zeros(c)
+        self.minimo = np.full(c, np.inf)
+        self.maximo = np.full(c, -np.inf)
+        self.ewma = np.full(c, np.nan)
+
+    def actualizar(self, valores):
+        """
+        Incorpora un lote de muestras.
+
+        Parameters
+        ----------
+        valores : array_like
+            Muestras de forma (n, canales), (n,) con un solo canal, o una sola muestra.
+        """
+        v = _comoMatriz(valores, len(self.canales))
+        validos = np.isfinite(v)
+        k = validos.sum(axis=0)
+        if not k.any():
+            return
+        ceros = np.where(validos, v, 0.0)
+        k_ = np.maximum(k, 1)
+        media_lote = ceros.sum(axis=0) / k_
+        m2_lote = (np.where(validos, v - media_lote, 0.0) ** 2).sum(axis=0)
+        # Combinacion de Welford/Chan del acumulado con el lote
+        n = self.n + k
+        n_ = np.maximum(n, 1)
+        delta = media_lote - self.media
+        self.media = self.media + delta * k / n_
+        self._m2 = self._m2 + m2_lote + delta ** 2 * self.n * k / n_
+        self.n = n
+        self.minimo = np.minimum(self.minimo, np.where(validos, v, np.inf).min(axis=0))
+        self.maximo = np.maximum(self.maximo, np.where(validos, v, -np.inf).max(axis=0))
+        self._actualizarEwma(ceros, validos, k)
+
+    def _actualizarEwma(self, ceros, validos, k):
+        """
+        EWMA de un lote en forma cerrada: e = (1-a)^k e0 + sum a (1-a)^(k-j) x_j.
+        Si el canal aún no tiene EWMA, la primera muestra válida lo inicializa.
+        """
+        a = self.alfa
+        posicion = np.cumsum(validos, axis=0)            # 1..k entre las muestras validas
+        exponente = (k - posicion).astype(np.float64)
+        pesos = np.where(validos, a * (1.0 - a) ** exponente, 0.0)
+        nuevos = np.isnan(self.ewma) & (k > 0)
+        if nuevos.any():
+            primera = validos & (posicion == 1) & nuevos
+            pesos = np.where(primera, (1.0 - a) ** exponente, pesos)
+        previo = np.where(np.isnan(self.ewma), 0.0, self.ewma) * (1.0 - a) ** k
+        self.ewma = np.where(k > 0, previo + (pesos * ceros).sum(axis=0), self.ewma)
+
+    @property
+    def varianza(self):
+        """numpy.ndarray: Varianza muestral por canal (NaN con menos de dos muestras)."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.n > 1, self._m2 / (self.n - 1), np.nan)
+
+    @property
+    def desviacion(self):
+        """numpy.ndarray: Desviación estándar muestral por canal."""
+        return np.sqrt(self.varianza)
+
+
+class VentanaDeslizante:
+    """
+    Media, desviación, mínimo y máximo de las últimas `ventana` muestras.
+
+    Las sumas de la ventana se actualizan restando las muestras que salen y
+    sumando las que entran (O(1) por muestra), respecto a un valor de referencia
+    para evitar la cancelación numérica, y se recalculan de forma exacta cada
+    vez que la ventana se renueva por completo. El mínimo y el máximo se
+    calculan al consultarlos, a la tasa de la interfaz y no a la de los datos.
+
+    Atributos:
+    ----------
+    canales : tuple of str
+        Nombres de los canales.
+    ventana : int
+        Número de muestras de la ventana.
+    """
+    def __init__(self, canales=('Temperatura',), ventana=600):
+        """
+        Parameters
+        ----------
+        canales : tuple of str, opcional
+            Nombres de los canales. Por defecto ('Temperatura',).
+        ventana : int, opcional
+            Número de muestras de la ventana. Por defecto 600.
+        """
+        self.canales = tuple(canales)
+        self.ventana = int(ventana)
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Vacía la ventana."""
+        c = len(self.canales)
+        self._anillo = np.full((self.ventana, c), np.nan)
+        self._pos = 0               # Siguiente fila a escribir
+        self._llenas = 0
+        self._desde_recalculo = 0
+        self._ref = None
+        self._suma = np.zeros(c)
+        self._suma2 = np.zeros(c)
+        self._cuenta = np.zeros(c, dtype=np.int64)
+
+    def _acumular(self, bloque, signo):
+        validos = np.isfinite(bloque)
+        d = np.where(validos, bloque - self._ref, 0.0)
+        self._suma += signo * d.sum(axis=0)
+        self._suma2 += signo * (d ** 2).sum(axis=0)
+        self._cuenta += signo * validos.sum(axis=0)
+
+    def _recalcular(self):
+        self._suma[:] = 0.0
+        self._suma2[:] = 0.0
+        self._cuenta[:] = 0
+        self._acumular(self._anillo, 1)
+        self._desde_recalculo = 0
+
+    def actualizar(self, valores):
+        """
+        Incorpora un lote de muestras, descartando las que salen de la ventana.
+
+        Parameters
+        ----------
+        valores : array_like
+            Muestras de forma (n, canales), (n,) con un solo canal, o una sola muestra.
+        """
+        v = _comoMatriz(valores, len(self.canales))[-self.ventana:]
+        k = len(v)
+        if not k:
+            return
+        if self._ref is None:
+            with np.errstate(invalid="ignore"):
+                self._ref = np.nan_to_num(np.nanmean(v, axis=0))
+        filas = (self._pos + np.arange(k)) % self.ventana
+        if self._llenas == self.ventana:
+            self._acumular(self._anillo[filas], -1)
+        self._anillo[filas] = v
+        self._acumular(v, 1)
+        self._pos = (self._pos + k) % self.ventana
+        self._llenas = min(self._llenas + k, self.ventana)
+        self._desde_recalculo += k
+        if self._desde_recalculo >= self.ventana:
+            self._recalcular()
+
+    def __len__(self):
+        return self._llenas
+
+    @property
+    def media(self):
+        """numpy.ndarray: Media de la ventana por canal."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self._cuenta > 0, (self._ref if self._ref is not None else 0.0)
+                            + self._suma / self._cuenta, np.nan)
+
+    @property
+    def desviacion(self):
+        """numpy.ndarray: Desviación estándar muestral de la ventana por canal."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = (self._suma2 - self._suma ** 2 / self._cuenta) / (self._cuenta - 1)
+            return np.where(self._cuenta > 1, np.sqrt(np.maximum(var, 0.0)), np.nan)
+
+    @property
+    def minimo(self):
+        """numpy.ndarray: Mínimo de la ventana por canal."""
+        return np.fmin.reduce(self._anillo, axis=0)
+
+    @property
+    def maximo(self):
+        """numpy.ndarray: Máximo de la ventana por canal."""
+        return np.fmax.reduce(self._anillo, axis=0)
+
+
+class EstadisticasCanales:
+    """
+    Estadísticas en vivo de un flujo multicanal: acumuladas y por ventanas.
+
+    Se actualiza desde el hilo de registro y se consulta desde la interfaz
+    gráfica; un candado protege cada actualización y cada consulta.
+
+    Atributos:
+    ----------
+    canales : tuple of str
+        Nombres de los canales.
+    acumulada : EstadisticaAcumulada
+        Estadísticas de todas las muestras.
+    ventanas : dict
+        {tamaño: VentanaDeslizante}
+    """
+    def __init__(self, canales=('Temperatura',), ventanas=(60, 600), alfa=0.1):
+        """
+        Parameters
+        ----------
+        canales : tuple of str, opcional
+            Nombres de los canales. Por defecto ('Temperatura',).
+        ventanas : tuple of int, opcional
+            Tamaños (en muestras) de las ventanas deslizantes. Por defecto (60, 600).
+        alfa : float, opcional
+            Factor de suavizado del EWMA. Por defecto 0.1.
+        """
+        self.canales = tuple(canales)
+        self.acumulada = EstadisticaAcumulada(self.canales, alfa)
+        self.ventanas = {int(w): VentanaDeslizante(self.canales, w) for w in ventanas}
+        self._candado = th.Lock()
+
+    def reiniciar(self):
+        """Descarta todas las muestras vistas."""
+        with self._candado:
+            self.acumulada.reiniciar()
+            for ventana in self.ventanas.values():
+                ventana.reiniciar()
+
+    def actualizar(self, valores):
+        """
+        Incorpora un lote de muestras.
+
+        Parameters
+        ----------
+        valores : array_like
+            Muestras de forma (n, canales), (n,) con un solo canal, o una sola muestra.
+        """
+        v = _comoMatriz(valores, len(self.canales))
+        with self._candado:
+            self.acumulada.actualizar(v)
+            for ventana in self.ventanas.values():
+                ventana.actualizar(v)
+
+    def resumen(self):
+        """
+        Estadísticos actuales de cada canal.
+
+        Returns
+        -------
+        dict
+            {canal: {"n", "media", "desviacion", "minimo", "maximo", "ewma",
+            "ventanas": {tamaño: {"media", "desviacion", "minimo", "maximo"}}}}
+        """
+        with self._candado:
+            a = self.acumulada
+            acum = (a.n, a.media, a.desviacion, a.minimo, a.maximo, a.ewma)
+            vent = {w: (v.media, v.desviacion, v.minimo, v.maximo) for w, v in self.ventanas.items()}
+        resumen = {}
+        for i, canal in enumerate(self.canales):
+            n, media, desv, minimo, maximo, ewma = (float(x[i]) for x in acum)
+            resumen[canal] = {
+                "n": int(n), "media": media if n else np.nan, "desviacion": desv,
+                "minimo": minimo if n else np.nan, "maximo": maximo if n else np.nan, "ewma": ewma,
+                "ventanas": {w: dict(zip(("media", "desviacion", "minimo", "maximo"),
+                                         (float(x[i]) for x in est)))
+                             for w, est in vent.items()},
+            }
+        return resumen
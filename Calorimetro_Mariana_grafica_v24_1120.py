@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Nov 20th 2024
+
+@author: Triton Perea
+
+Gráfica en vivo de series de tiempo para la interfaz gráfica.
+
+La gráfica se actualiza con blitting: el fondo (ejes, etiquetas, rejilla) se
+dibuja una sola vez y en cada cuadro sólo se redibujan las líneas. Cada serie
+se decima por mínimo/máximo al ancho en píxeles del eje, así que el costo de un
+cuadro no depende de la duración del registro, y la tasa de cuadros se adapta
+al costo medido de dibujar.
+"""
+# Importar librerias a usar
+import time as tm
+import numpy as np
+
+
+def decimarMinMax(x, y, n_pixeles):
+    """
+    Reduce una serie a, como máximo, dos puntos (mínimo y máximo) por píxel.
+
+    Los extremos de cada intervalo se conservan en su orden original, de modo
+    que los picos siguen viéndose igual que con la serie completa.
+
+    Parameters
+    ----------
+    x, y : numpy.ndarray
+        Serie a decimar (misma longitud). `y` puede contener NaN.
+    n_pixeles : int
+        Número de intervalos (ancho del eje en píxeles).
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        (x, y) decimados.
+    """
+    n = len(y)
+    n_pixeles = max(int(n_pixeles), 1)
+    if n <= 2 * n_pixeles:
+        return x, y
+    paso = n // n_pixeles
+    m = paso * n_pixeles
+    tramos = y[:m].reshape(n_pixeles, paso)
+    nulos = np.isnan(tramos)
+    i_min = np.where(nulos, np.inf, tramos).argmin(axis=1)
+    i_max = np.where(nulos, -np.inf, tramos).argmax(axis=1)
+    base = np.arange(n_pixeles) * paso
+    indices = np.empty(2 * n_pixeles, dtype=np.intp)
+    indices[0::2] = base + np.minimum(i_min, i_max)
+    indices[1::2] = base + np.maximum(i_min, i_max)
+    if m < n:
+        indices = np.concatenate((indices, np.arange(m, n)))
+    return x[indices], y[indices]
+
+
+class ProgramadorCuadros:
+    """
+    Tasa de cuadros adaptativa para la gráfica en vivo.
+
+    El costo de cada cuadro se promedia (EWMA) y el periodo entre cuadros se
+    ajusta para que dibujar no ocupe más de `carga` del hilo de la interfaz.
+    Las muestras que llegan entre dos cuadros se dibujan juntas en el siguiente.
+
+    Atributos:
+    ----------
+    fps_max, fps_min : float
+        Límites de la tasa de cuadros.
+    carga : float
+        Fracción máxima del tiempo del hilo de Tk dedicada a dibujar.
+    costo : float
+        Costo promedio de un cuadro en segundos.
+    """
+    def __init__(self, fps_max=20.0, fps_min=1.0, carga=0.3):
+        """
+        Parameters
+        ----------
+        fps_max : float, opcional
+            Tasa máxima de cuadros. Por defecto 20.
+        fps_min : float, opcional
+            Tasa mínima de cuadros, aún bajo carga. Por defecto 1.
+        carga : float, opcional
+            Fracción del hilo de Tk dedicada a dibujar. Por defecto 0.3.
+        """
+        self.fps_max, self.fps_min, self.carga = fps_max, fps_min, carga
+        self.costo = 0.0
+
+    def registrar(self, duracion):
+        """
+        Registra la duración de un cuadro dibujado.
+
+        Parameters
+        ----------
+        duracion : float
+            Segundos que tomó dibujar el cuadro.
+        """
+        self.costo = duracion if not self.costo else 0.8 * self.costo + 0.2 * duracion
+
+    def intervalo(self):
+        """
+        Milisegundos hasta el siguiente cuadro.
+
+        Returns
+        -------
+        int
+        """
+        periodo = min(max(self.costo / self.carga, 1.0 / self.fps_max), 1.0 / self.fps_min)
+        return int(periodo * 1000)
+
+
+class GraficaViva:
+    """
+    Series de tiempo en vivo (una línea por canal) dibujadas con blitting.
+
+    Atributos:
+    ----------
+    canvas : FigureCanvasTkAgg
+        Lienzo de la gráfica.
+    ax : matplotlib.axes.Axes
+        Ejes donde se dibujan las series.
+    lineas : dict
+        {canal: matplotlib.lines.Line2D}
+    margen : float
+        Fracción de holgura que se agrega al ampliar los límites de los ejes.
+    """
+    def __init__(self, canvas, ax, canales, margen=0.1):
+        """
+        Parameters
+        ----------
+        canvas : FigureCanvasTkAgg
+            Lienzo de la gráfica.
+        ax : matplotlib.axes.Axes
+            Ejes donde se dibujan las series.
+        canales : tuple of str
+            Nombres de los canales (una línea por canal).
+        margen : float, opcional
+            Holgura al ampliar los límites. Por defecto 0.1.
+        """
+        self.canvas, self.ax, self.margen = canvas, ax, margen
+        self.lineas = {canal: ax.plot([], [], animated=True, label=canal)[0] for canal in canales}
+        if len(self.lineas) > 1:
+            ax.legend(loc="upper left")
+        self._fondo = None
+        self.canvas.mpl_connect("draw_event", self._alDibujar)
+
+    def _alDibujar(self, evento):
+        """Guarda el fondo tras un dibujado completo y pinta las líneas encima."""
+        self._fondo = self.canvas.copy_from_bbox(self.ax.bbox)
+        for linea in self.lineas.values():
+            self.ax.draw_artist(linea)
+
+    def _ajustarLimites(self, t, valores):
+        """
+        Amplía los límites de los ejes si los datos se salen de ellos.
+
+        Returns
+        -------
+        bool
+            True si cambiaron los límites (hace falta un dibujado completo).
+        """
+        cambio = False
+        x0, x1 = self.ax.get_xlim()
+        if t[-1] > x1 or t[0] < x0:
+            ancho = max(t[-1] - t[0], 1.0)
+            self.ax.set_xlim(t[0], t[-1] + self.margen * ancho)
+            cambio = True
+        finitos = valores[np.isfinite(valores)]
+        if finitos.size:
+            y_min, y_max = finitos.min(), finitos.max()
+            y0, y1 = self.ax.get_ylim()
+            if y_min < y0 or y_max > y1:
+                holgura = self.margen * max(y_max - y_min, 1.0)
+                self.ax.set_ylim(min(y0, y_min - holgura), max(y1, y_max + holgura))
+                cambio = True
+        return cambio
+
+    def actualizar(self, t, valores):
+        """
+        Dibuja las series completas, decimadas al ancho del eje.
+
+        Parameters
+        ----------
+        t : numpy.ndarray
+            Tiempos de las muestras (s), forma (n,).
+        valores : numpy.ndarray
+            Muestras de forma (canales, n), en el orden de `lineas`.
+
+        Returns
+        -------
+        float
+            Segundos que tomó dibujar el cuadro.
+        """
+        t0 = tm.perf_counter()
+        if not len(t):
+            return 0.0
+        ancho = self.ax.bbox.width
+        for linea, y in zip(self.lineas.values(), valores):
+            linea.set_data(*decimarMinMax(t, y, ancho))
+        if self._ajustarLimites(t, valores) or self._fondo is None:
+            self.canvas.draw()          # Redibuja ejes; _alDibujar guarda el fondo nuevo
+        else:
+            self.canvas.restore_region(self._fondo)
+            for linea in self.lineas.values():
+                self.ax.draw_artist(linea)
+            self.canvas.blit(self.ax.bbox)
+        return tm.perf_counter() - t0
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Nov 20th 2024
+
+@author: Triton Perea
+
+Visor de corridas anteriores para la interfaz gráfica.
+
+Las corridas de un directorio se listan con `almacenamiento.CatalogoCorridas`
+y cada una se abre con su `IndiceRegistro`, así que nunca se lee el registro
+completo: la vista general se dibuja con el resumen por bloque del índice y,
+al acercar (barra de herramientas de matplotlib o "Desde"/"Hasta"), se cargan
+sólo los bloques del intervalo visible.
+"""
+# Importar librerias a usar
+import os
+import time as tm
+import customtkinter as ctk
+import numpy as np
+import Calorimetro_Mariana_almacenamiento_v24_1120 as alm
+import Calorimetro_Mariana_consola_v24_1120 as cs
+import Calorimetro_Mariana_grafica_v24_1120 as gr
+
+log = cs.obtenerLogger("historial")
+
+
+class VentanaHistorial:
+    """
+    Ventana para abrir una corrida guardada y recorrerla por intervalos de tiempo.
+
+    Atributos:
+    ----------
+    ventana : customtkinter.CTkToplevel
+        Ventana del visor.
+    catalogo : CatalogoCorridas
+        Corridas del directorio elegido.
+    indice : IndiceRegistro or None
+        Índice de la corrida abierta.
+    maximo : int
+        Muestras cargadas como máximo; un intervalo más largo se dibuja con el
+        resumen por bloque del índice.
+    """
+    def __init__(self, master, directorio=".", maximo=500_000):
+        """
+        Parameters
+        ----------
+        master : tkinter.Misc
+            Ventana principal.
+        directorio : str, opcional
+            Directorio de los registros. Por defecto el actual.
+        maximo : int, opcional
+            Muestras cargadas como máximo. Por defecto 500000.
+        """
+        self.maximo = maximo
+        self.indice = None
+        self.t0 = 0.0                   # Inicio de la corrida: el eje x es relativo a el
+        self._ajustando = False         # Evita recargar por los cambios de limites propios
+        self._recarga = None
+        self.ventana = ctk.CTkToplevel(master)
+        self.ventana.title("Historial de corridas")
+        self.ventana.geometry("900x600")
+        self.ventana.protocol("WM_DELETE_WINDOW", self.cerrar)
+        self._crearElementos()
+        self.abrirDirectorio(directorio)
+
+    def _crearElementos(self):
+        """
+        Barra de controles (corrida, carpeta, intervalo) y gráfica con barra de herramientas.
+        """
+        from matplotlib.figure import Figure     # Sin pyplot: la figura vive solo en Tk
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+        barra = ctk.CTkFrame(self.ventana)
+        barra.pack(side="top", fill="x")
+        self.corrida = ctk.StringVar(value="")
+        self.menu_corridas = ctk.CTkOptionMenu(barra, values=[""], variable=self.corrida, command=self.abrirCorrida,
+                                               width=220)
+        self.menu_corridas.pack(side="left", padx=5, pady=5)
+        ctk.CTkButton(barra, text="Carpeta", width=70, command=self._elegirDirectorio).pack(side="left", padx=5)
+        ctk.CTkButton(barra, text="Actualizar", width=80,
+                      command=lambda: self.abrirDirectorio(self.catalogo.directorio)).pack(side="left", padx=5)
+        self.desde = ctk.CTkEntry(barra, width=80, placeholder_text="Desde (s)")
+        self.desde.pack(side="left", padx=5)
+        self.hasta = ctk.CTkEntry(barra, width=80, placeholder_text="Hasta (s)")
+        self.hasta.pack(side="left", padx=5)
+        ctk.CTkButton(barra, text="Cargar", width=70, command=self._cargarEntradas).pack(side="left", padx=5)
+        ctk.CTkButton(barra, text="Todo", width=60, command=lambda: self.mostrar(None, None)).pack(side="left", padx=5)
+        self.etiqueta = ctk.CTkLabel(self.ventana, text="", font=('Verdana', 10), justify="left")
+        self.etiqueta.pack(side="bottom", fill="x")
+
+        fig = Figure(facecolor="0.55", figsize=(10, 6), dpi=100)
+        self.ax = fig.add_subplot()
+        self.ax.set_xlabel("Tiempo desde el inicio (s)")
+        self.ax.set_ylabel("Temperatura")
+        self.canvas = FigureCanvasTkAgg(fig, master=self.ventana)
+        NavigationToolbar2Tk(self.canvas, self.ventana).update()
+        self.canvas.get_tk_widget().pack(side="top", fill="both", expand=True)
+        self.ax.callbacks.connect("xlim_changed", self._alCambiarLimites)
+        self.lineas = {}
+
+    def _elegirDirectorio(self):
+        from tkinter import filedialog
+        directorio = filedialog.askdirectory(parent=self.ventana, initialdir=self.catalogo.directorio)
+        if directorio:
+            self.abrirDirectorio(directorio)
+
+    def abrirDirectorio(self, directorio):
+        """
+        Lista las corridas de `directorio` y abre la más reciente.
+
+        Parameters
+        ----------
+        directorio : str
+            Directorio de los registros.
+        """
+        self.catalogo = alm.CatalogoCorridas(directorio)
+        nombres = [c["nombre"] for c in self.catalogo.corridas]
+        self.menu_corridas.configure(values=nombres or [""])
+        if not nombres:
+            self.etiqueta.configure(text=f"No hay registros en {os.path.abspath(directorio)}")
+            return
+        self.corrida.set(nombres[-1])
+        self.abrirCorrida(nombres[-1])
+
+    def abrirCorrida(self, nombre):
+        """
+        Abre una corrida del catálogo y muestra la vista general.
+
+        Parameters
+        ----------
+        nombre : str
+            Nombre de la corrida.
+        """
+        if not nombre:
+            return
+        t_abrir = tm.perf_counter()
+        self.indice = self.catalogo.abrir(nombre)
+        self.t0 = np.nan_to_num(self.indice.intervalo[0])
+        canales = [c for c in self.indice.columnas if c != "t"]
+        for linea in self.lineas.values():
+            linea.remove()
+        self.lineas = {canal: self.ax.plot([], [], label=canal)[0] for canal in canales}
+        if self.ax.get_legend() is not None:
+            self.ax.get_legend().remove()
+        if len(canales) > 1:
+            self.ax.legend(loc="upper left")
+        self.ax.set_title(nombre, color='red', size=14, family="Tahoma")
+        log.info("Corrida %s abierta en %.1f ms (%d datos, %d bloques)", nombre,
+                 1000 * (tm.perf_counter() - t_abrir), self.indice.n_muestras, len(self.indice))
+        self.mostrar(None, None)
+
+    def _cargarEntradas(self):
+        """Muestra el intervalo escrito en "Desde"/"Hasta" (vacío: sin límite)."""
+        try:
+            desde = float(self.desde.get()) if self.desde.get().strip() else None
+            hasta = float(self.hasta.get()) if self.hasta.get().strip() else None
+        except ValueError:
+            self.etiqueta.configure(text="Desde/Hasta deben ser segundos desde el inicio de la corrida")
+            return
+        self.mostrar(desde, hasta)
+
+    def mostrar(self, desde, hasta, ajustar=True):
+        """
+        Carga y dibuja las muestras de un intervalo.
+
+        Parameters
+        ----------
+        desde, hasta : float or None
+            Límites en segundos desde el inicio de la corrida (None: sin límite).
+        ajustar : bool, opcional
+            Ajustar los límites de los ejes al intervalo. Por defecto True.
+        """
+        if self.indice is None:
+            return
+        t_carga = tm.perf_counter()
+        t_inicio = None if desde is None else self.t0 + desde
+        t_fin = None if hasta is None else self.t0 + hasta
+        t, datos, resumido = self.indice.cargarIntervalo(t_inicio, t_fin, maximo=self.maximo)
+        t = t - self.t0
+        i_t = self.indice.columna_t
+        valores = [fila for j, fila in enumerate(datos) if j != i_t]
+        ancho = self.ax.bbox.width
+        for linea, y in zip(self.lineas.values(), valores):
+            linea.set_data(*gr.decimarMinMax(t, y, ancho))
+        if ajustar and len(t):
+            self._ajustando = True
+            self.ax.set_xlim(desde if desde is not None else t[0], hasta if hasta is not None else t[-1])
+            todos = np.concatenate(valores) if valores else np.empty(0)
+            finitos = todos[np.isfinite(todos)]
+            if finitos.size:
+                holgura = 0.05 * max(finitos.max() - finitos.min(), 0.1)
+                self.ax.set_ylim(finitos.min() - holgura, finitos.max() + holgura)
+            self._ajustando = False
+        self.canvas.draw_idle()
+        self.etiqueta.configure(text=(f"{len(t)} {'puntos de resumen' if resumido else 'datos'} "
+                                      f"en {1000 * (tm.perf_counter() - t_carga):.1f} ms  "
+                                      f"(corrida: {self.indice.n_muestras} datos, {len(self.indice)} bloques)"))
+
+    def _alCambiarLimites(self, ax):
+        """
+        Al acercar o desplazar con la barra de herramientas, recarga el intervalo
+        visible (una vez que los límites dejan de cambiar).
+        """
+        if self._ajustando:
+            return
+        if self._recarga is not None:
+            self.ventana.after_cancel(self._recarga)
+        self._recarga = self.ventana.after(150, self._recargarVisible)
+
+    def _recargarVisible(self):
+        self._recarga = None
+        x0, x1 = self.ax.get_xlim()
+        self.mostrar(x0, x1, ajustar=False)
+
+    def cerrar(self):
+        """Cierra la ventana, cancelando una recarga pendiente."""
+        if self._recarga is not None:
+            self.ventana.after_cancel(self._recarga)
+            self._recarga = None
+        self.ventana.destroy()
@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Nov 20th 2024
+
+@author: Triton Perea
+
+Métricas de la cadena de adquisición: contadores, medidores (gauges) e
+histogramas de latencia en cada etapa (recepción, verificación, cola,
+registro y gráfica).
+
+Las etapas registran sus métricas en `METRICAS`, el registro global del
+proceso. La interfaz gráfica muestra `METRICAS.resumen()` y, opcionalmente,
+`ServidorMetricas` publica `METRICAS.texto()` en formato de texto de
+Prometheus en un puerto HTTP local.
+
+`ARRANQUE` mide el tiempo de importación y de construcción de cada componente
+al abrir la aplicación (ver `Calorimetro_Mariana_arranque_v24_1120`).
+"""
+# Importar librerias a usar
+from contextlib import contextmanager
+import threading as th
+import time as tm
+import numpy as np
+
+# Limites (s) de los histogramas de latencia y duracion
+LIMITES_LATENCIA = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Contador:
+    """
+    Contador monótono (p. ej. datagramas recibidos).
+
+    Atributos:
+    ----------
+    nombre, ayuda : str
+        Nombre de la métrica y su descripción.
+    valor : float
+        Valor acumulado.
+    """
+    tipo = "counter"
+
+    def __init__(self, nombre, ayuda=""):
+        self.nombre, self.ayuda = nombre, ayuda
+        self.valor = 0
+        self._candado = th.Lock()
+
+    def incrementar(self, n=1):
+        """Suma `n` al contador."""
+        with self._candado:
+            self.valor += n
+
+    def reiniciar(self):
+        """Vuelve el contador a cero."""
+        with self._candado:
+            self.valor = 0
+
+    def muestras(self):
+        return [(self.nombre, self.valor)]
+
+
+class Medidor:
+    """
+    Valor instantáneo (p. ej. profundidad de una cola).
+
+    El valor se fija con `fijar` o se obtiene al consultarlo de una función,
+    lo que permite medir p. ej. `queue.qsize` sin tocar el código de la cola.
+    """
+    tipo = "gauge"
+
+    def __init__(self, nombre, ayuda="", funcion=None):
+        self.nombre, self.ayuda = nombre, ayuda
+        self.funcion = funcion
+        self._valor = 0.0
+
+    def fijar(self, valor):
+        """Fija el valor del medidor."""
+        self._valor = valor
+
+    def reiniciar(self):
+        """Vuelve a cero el valor fijado (no afecta a un medidor con función)."""
+        self._valor = 0.0
+
+    @property
+    def valor(self):
+        if self.funcion is not None:
+            try:
+                return float(self.funcion())
+            except Exception:
+                return float("nan")
+        return self._valor
+
+    def muestras(self):
+        return [(self.nombre, self.valor)]
+
+
+class Histograma:
+    """
+    Histograma acumulado con límites fijos (p. ej. latencias en segundos).
+
+    Atributos:
+    ----------
+    limites : numpy.ndarray
+        Límites superiores de las cubetas (sin incluir +Inf).
+    cuenta : int
+        Observaciones registradas.
+    suma : float
+        Suma de las observaciones.
+    """
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda="", limites=LIMITES_LATENCIA):
+        self.nombre, self.ayuda = nombre, ayuda
+        self.limites = np.asarray(limites, dtype=np.float64)
+        self._cubetas = np.zeros(len(self.limites) + 1, dtype=np.int64)
+        self.cuenta = 0
+        self.suma = 0.0
+        self._candado = th.Lock()
+
+    def reiniciar(self):
+        """Descarta todas las observaciones."""
+        with self._candado:
+            self._cubetas[:] = 0
+            self.cuenta = 0
+            self.suma = 0.0
+
+    def observar(self, valor):
+        """Registra una observación."""
+        i = int(np.searchsorted(self.limites, valor))
+        with self._candado:
+            self._cubetas[i] += 1
+            self.cuenta += 1
+            self.suma += valor
+
+    def observarLote(self, valores):
+        """Registra un arreglo de observaciones en un solo paso."""
+        valores = np.asarray(valores, dtype=np.float64).ravel()
+        if not valores.size:
+            return
+        conteo = np.bincount(np.searchsorted(self.limites, valores), minlength=len(self._cubetas))
+        with self._candado:
+            self._cubetas += conteo
+            self.cuenta += valores.size
+            self.suma += float(valores.sum())
+
+    def cuantil(self, q):
+        """
+        Estima un cuantil interpolando dentro de la cubeta que lo contiene.
+
+        Parameters
+        ----------
+        q : float
+            Cuantil entre 0 y 1.
+
+        Returns
+        -------
+        float
+            NaN si no hay observaciones.
+        """
+        with self._candado:
+            cubetas, cuenta = self._cubetas.copy(), self.cuenta
+        if not cuenta:
+            return float("nan")
+        acumuladas = np.cumsum(cubetas)
+        i = int(np.searchsorted(acumuladas, q * cuenta))
+        if i >= len(self.limites):
+            return float(self.limites[-1])
+        inferior = self.limites[i - 1] if i else 0.0
+        previas = acumuladas[i - 1] if i else 0
+        fraccion = (q * cuenta - previas) / max(cubetas[i], 1)
+        return float(inferior + fraccion * (self.limites[i] - inferior))
+
+    def muestras(self):
+        with self._candado:
+            acumuladas = np.cumsum(self._cubetas)
+            cuenta, suma = self.cuenta, self.suma
+        filas = [(f'{self.nombre}_bucket{{le="{limite:g}"}}', int(n))
+                 for limite, n in zip(self.limites, acumuladas)]
+        filas.append((f'{self.nombre}_bucket{{le="+Inf"}}', int(cuenta)))
+        filas += [(f"{self.nombre}_sum", suma), (f"{self.nombre}_count", int(cuenta))]
+        return filas
+
+
+class RegistroMetricas:
+    """
+    Conjunto de métricas con nombre; pedir una métrica existente la devuelve
+    en lugar de crear otra, así que cada etapa puede declararlas donde las usa.
+    """
+    def __init__(self, prefijo="calorimetro_"):
+        self.prefijo = prefijo
+        self._metricas = {}
+        self._candado = th.Lock()
+
+    def _obtener(self, clase, nombre, ayuda, **kwargs):
+        nombre = self.prefijo + nombre
+        with self._candado:
+            metrica = self._metricas.get(nombre)
+            if metrica is None:
+                metrica = self._metricas[nombre] = clase(nombre, ayuda, **kwargs)
+            elif kwargs.get("funcion") is not None:
+                metrica.funcion = kwargs["funcion"]     # La fuente mas reciente reemplaza a la anterior
+        return metrica
+
+    def contador(self, nombre, ayuda=""):
+        """Devuelve (creándolo si hace falta) el contador `nombre`."""
+        return self._obtener(Contador, nombre, ayuda)
+
+    def medidor(self, nombre, ayuda="", funcion=None):
+        """Devuelve (creándolo si hace falta) el medidor `nombre`."""
+        return self._obtener(Medidor, nombre, ayuda, funcion=funcion)
+
+    def histograma(self, nombre, ayuda="", limites=LIMITES_LATENCIA):
+        """Devuelve (creándolo si hace falta) el histograma `nombre`."""
+        return self._obtener(Histograma, nombre, ayuda, limites=limites)
+
+    def reiniciar(self):
+        """Vuelve a cero todas las métricas (p. ej. entre corridas de un benchmark)."""
+        with self._candado:
+            metricas = list(self._metricas.values())
+        for m in metricas:
+            m.reiniciar()
+
+    def texto(self):
+        """
+        Métricas en el formato de texto de exposición de Prometheus.
+
+        Returns
+        -------
+        str
+        """
+        with self._candado:
+            metricas = list(self._metricas.values())
+        lineas = []
+        for m in metricas:
+            lineas += [f"# HELP {m.nombre} {m.ayuda}", f"# TYPE {m.nombre} {m.tipo}"]
+            lineas += [f"{nombre} {valor:.9g}" for nombre, valor in m.muestras()]
+        return "\n".join(lineas) + "\n"
+
+    def resumen(self):
+        """
+        Valores actuales para la interfaz gráfica.
+
+        Returns
+        -------
+        dict
+            {nombre sin prefijo: valor} para contadores y medidores, y
+            {nombre sin prefijo: (cuenta, media, p50, p99)} para histogramas.
+        """
+        with self._candado:
+            metricas = list(self._metricas.items())
+        resumen = {}
+        for nombre, m in metricas:
+            nombre = nombre[len(self.prefijo):]
+            if isinstance(m, Histograma):
+                media = m.suma / m.cuenta if m.cuenta else float("nan")
+                resumen[nombre] = (m.cuenta, media, m.cuantil(0.5), m.cuantil(0.99))
+            else:
+                resumen[nombre] = m.valor
+        return resumen
+
+
+METRICAS = RegistroMetricas()
+
+
+class PerfilArranque:
+    """
+    Tiempos del arranque de la aplicación, por etapa (importar un módulo,
+    construir la ventana, crear la gráfica...).
+
+    Atributos:
+    ----------
+    t0 : float
+        Instante de referencia (`time.perf_counter`).
+    etapas : list of tuple
+        (nombre, inicio desde t0, duración) de cada etapa medida, en segundos.
+    """
+    def __init__(self):
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Descarta las etapas medidas y toma el instante actual como referencia."""
+        self.t0 = tm.perf_counter()
+        self.etapas = []
+
+    @contextmanager
+    def medir(self, nombre):
+        """
+        Mide el bloque `with` como una etapa.
+
+        Parameters
+        ----------
+        nombre : str
+            Nombre de la etapa.
+        """
+        inicio = tm.perf_counter()
+        try:
+            yield
+        finally:
+            fin = tm.perf_counter()
+            self.etapas.append((nombre, inicio - self.t0, fin - inicio))
+
+    def marcar(self, nombre):
+        """Registra un instante (etapa de duración cero), p. ej. "ventana visible"."""
+        self.etapas.append((nombre, tm.perf_counter() - self.t0, 0.0))
+
+    def total(self):
+        """float: Segundos desde `t0` hasta el final de la última etapa."""
+        return max((inicio + duracion for _, inicio, duracion in self.etapas), default=0.0)
+
+    def reporte(self):
+        """
+        Tabla de las etapas en orden de inicio.
+
+        Returns
+        -------
+        str
+        """
+        lineas = [f"{'etapa':<32}{'inicio (ms)':>12}{'duracion (ms)':>15}"]
+        for nombre, inicio, duracion in sorted(self.etapas, key=lambda e: e[1]):
+            lineas.append(f"{nombre:<32}{1000 * inicio:>12.1f}{1000 * duracion:>15.1f}")
+        lineas.append(f"{'total':<32}{'':>12}{1000 * self.total():>15.1f}")
+        return "\n".join(lineas)
+
+
+ARRANQUE = PerfilArranque()
+
+
+class ServidorMetricas:
+    """
+    Servidor HTTP local que publica las métricas para Prometheus (GET /metrics).
+
+    Atributos:
+    ----------
+    metricas : RegistroMetricas
+        Métricas publicadas.
+    host : str
+        Dirección de escucha. Por defecto sólo la máquina local.
+    puerto : int
+        Puerto HTTP.
+    """
+    def __init__(self, metricas=METRICAS, puerto=9464, host="127.0.0.1"):
+        self.metricas, self.puerto, self.host = metricas, puerto, host
+        self._servidor = None
+        self._hilo = None
+
+    def iniciar(self):
+        """Abre el puerto y atiende peticiones en un hilo de fondo."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer     # Solo si se publica
+        metricas = self.metricas
+
+        class _Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                cuerpo = metricas.texto().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass        # Sin una linea de consola por consulta
+
+        self._servidor = ThreadingHTTPServer((self.host, self.puerto), _Manejador)
+        self.puerto = self._servidor.server_address[1]
+        self._hilo = th.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        """Cierra el servidor."""
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
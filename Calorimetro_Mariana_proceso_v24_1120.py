@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Nov 20th 2024
+
+@author: Triton Perea
+
+Recepción, verificación y registro en un proceso aparte de la interfaz gráfica.
+
+Con los hilos, `Recibir`, `Registro` y el ciclo de Tk/matplotlib comparten el
+GIL: un `canvas.draw()` lento detiene el ciclo de recepción y los datagramas se
+acumulan en el kernel. `AdquisicionProceso` lanza un proceso hijo que recibe y
+registra, y que publica cada muestra (t + canales) en un `AnilloCompartido`
+sobre `multiprocessing.shared_memory`. La interfaz lee vistas sin copia del
+anillo, y recibe por una cola los mensajes de consola, las estadísticas en
+vivo, el último resultado calorimétrico y las métricas del hijo.
+
+    proceso = AdquisicionProceso(canales=("T1", "T2"))
+    proceso.iniciar()
+    proceso.iniciarRecepcion(); proceso.iniciarRegistro()
+    ...
+    serie = proceso.anillo.vista()      # (t + canales, n), sin copia
+    proceso.sondear()                   # estadisticas, calor, metricas
+    proceso.cerrar()
+"""
+# Importar librerias a usar
+import multiprocessing as mp
+import queue as qu
+import sys
+import threading as th
+import time as tm
+from multiprocessing import shared_memory
+import numpy as np
+import Calorimetro_Mariana_consola_v24_1120 as cs
+
+log = cs.obtenerLogger("proceso")
+
+
+class AnilloCompartido:
+    """
+    Anillo de muestras en memoria compartida, con un escritor y varios lectores.
+
+    Cada muestra se guarda dos veces (en `i % capacidad` y en `i % capacidad +
+    capacidad`), así las últimas `capacidad` muestras siempre forman un tramo
+    contiguo y `vista()` no copia. El escritor copia las muestras y después
+    publica el total escrito; un lector nunca ve muestras a medio escribir,
+    aunque las más antiguas de una vista pueden sobrescribirse si el escritor
+    avanza casi una vuelta completa mientras se usa.
+
+    Atributos:
+    ----------
+    canales : tuple of str
+        Nombres de las columnas (una fila por columna, 't' primero).
+    capacidad : int
+        Máximo de muestras visibles.
+    nombre : str
+        Nombre del bloque de memoria compartida, para abrirlo desde otro proceso.
+    """
+    _ENCABEZADO = 4         # int64: escritas, generacion + float64: t0, reservado
+
+    def __init__(self, canales=('t', 'Temperatura'), capacidad=2 ** 18, nombre=None):
+        """
+        Parameters
+        ----------
+        canales : tuple of str, opcional
+            Nombres de las columnas. Por defecto ('t', 'Temperatura').
+        capacidad : int, opcional
+            Muestras retenidas. Por defecto 2**18 (36 h a 2 datos/s).
+        nombre : str, opcional
+            Si se indica, abre el bloque existente creado por otro proceso en
+            lugar de crear uno nuevo.
+        """
+        self.canales = tuple(canales)
+        self.capacidad = int(capacidad)
+        tamano = 8 * (self._ENCABEZADO + 2 * len(self.canales) * self.capacidad)
+        self._propietario = nombre is None
+        if self._propietario:
+            self._shm = shared_memory.SharedMemory(create=True, size=tamano)
+        else:
+            self._shm = shared_memory.SharedMemory(name=nombre)     # El hijo comparte el rastreador de recursos
+        self.nombre = self._shm.name
+        self._enteros = np.ndarray((2,), dtype=np.int64, buffer=self._shm.buf)
+        self._flotantes = np.ndarray((2,), dtype=np.float64, buffer=self._shm.buf, offset=16)
+        self._datos = np.ndarray((len(self.canales), 2 * self.capacidad), dtype=np.float64,
+                                 buffer=self._shm.buf, offset=8 * self._ENCABEZADO)
+        if self._propietario:
+            self._enteros[:] = 0
+            self._flotantes[:] = np.nan
+
+    def __len__(self):
+        return int(self._enteros[0])
+
+    @property
+    def n(self):
+        """int: Total de muestras escritas desde el último `reiniciar`."""
+        return int(self._enteros[0])
+
+    @property
+    def generacion(self):
+        """int: Número de reinicios; cambia al empezar un registro nuevo."""
+        return int(self._enteros[1])
+
+    @property
+    def t0(self):
+        """float: Marca de tiempo de la primera muestra (NaN si no hay)."""
+        return float(self._flotantes[0])
+
+    def reiniciar(self):
+        """Descarta las muestras y comienza una generación nueva (sólo el escritor)."""
+        self._enteros[0] = 0
+        self._flotantes[0] = np.nan
+        self._enteros[1] += 1
+
+    def extender(self, valores):
+        """
+        Agrega muestras al anillo (sólo el escritor).
+
+        Parameters
+        ----------
+        valores : numpy.ndarray
+            Muestras de forma (n, columnas).
+        """
+        valores = np.asarray(valores)
+        escritas, k = self.n, len(valores)
+        if not k:
+            return
+        if not escritas:
+            self._flotantes[0] = valores[0, 0]
+        cap = self.capacidad
+        nuevas = valores[-cap:].T               # Si llegan más de una vuelta sólo quedan las últimas
+        pos = (escritas + k - nuevas.shape[1]) % cap
+        fin = pos + nuevas.shape[1]
+        self._datos[:, pos:fin] = nuevas        # Copia principal (y espejo de lo que pasa de cap)
+        dentro = min(fin, cap) - pos
+        self._datos[:, pos + cap:pos + cap + dentro] = nuevas[:, :dentro]
+        self._datos[:, :nuevas.shape[1] - dentro] = nuevas[:, dentro:]     # Lo que dio la vuelta
+        self._enteros[0] = escritas + k         # Publicar sólo después de copiar
+
+    def vista(self):
+        """
+        Vista (sin copia) de las últimas muestras publicadas, en orden.
+
+        Returns
+        -------
+        numpy.ndarray
+            Arreglo de sólo lectura de forma (columnas, min(n, capacidad)).
+        """
+        escritas = self.n
+        m = min(escritas, self.capacidad)
+        fin = escritas % self.capacidad + self.capacidad
+        vista = self._datos[:, fin - m:fin]
+        vista.flags.writeable = False
+        return vista
+
+    def cerrar(self):
+        """Libera la vista local; el propietario además destruye el bloque."""
+        self._enteros = self._flotantes = self._datos = None
+        self._shm.close()
+        if self._propietario:
+            self._shm.unlink()
+
+
+class _ColaEventos:
+    """
+    Adaptador con la interfaz de `ColaMensajes.agregar` que reenvía los
+    mensajes del hijo a la cola de eventos, sin bloquear si está llena.
+    """
+    def __init__(self, eventos):
+        self.eventos = eventos
+
+    def agregar(self, nivel, texto):
+        try:
+            self.eventos.put_nowait(("mensaje", nivel, texto))
+        except qu.Full:
+            pass
+
+
+def _principal(config, nombre_anillo, comandos, eventos):
+    """
+    Cuerpo del proceso hijo: atiende comandos y publica su estado cada `periodo_estado` s.
+    """
+    import Calorimetro_Mariana_receiverUDP_v24_1120 as rc
+    import Calorimetro_Mariana_metricas_v24_1120 as mt
+
+    salida = _ColaEventos(eventos)
+    sys.stdout = cs.SalidaCola(salida)
+    cs.configurarConsola(salida, config["nivel"])
+    canales = tuple(config["canales"])
+    data_queue, data_queue_0, men_queue = qu.Queue(), qu.Queue(), qu.Queue()
+
+    def crearReceptor():
+        if config["motor"] == "asyncio":
+            return rc.MotorAsincrono(None, data_queue, data_queue_0, puertos=(config["puerto"],), canales=canales)
+        return rc.Recibir(None, data_queue, data_queue_0, port=config["puerto"], canales=canales)
+
+    registro = rc.Registro(False, data_queue, data_queue_0, men_queue, canales=canales,
+                           formato=config["formato"], bitacora=config["bitacora"], serie_viva=False)
+    if config["ruta"]:
+        registro.ruta_registro = config["ruta"]
+    anillo = AnilloCompartido(('t',) + canales, config["capacidad"], nombre=nombre_anillo)
+    registro.serie = anillo             # Registro publica cada muestra en el anillo
+    recibir, hilos = None, {}
+
+    def publicarEstado():
+        for cola in (data_queue, men_queue):    # Bloques para la grafica de hilos: aqui nadie los consume
+            while not cola.empty():
+                cola.get_nowait()
+        try:
+            eventos.put_nowait(("estado", registro.estadisticas.resumen(),
+                                registro.calorimetro.ultimo, mt.METRICAS.resumen()))
+        except qu.Full:
+            pass
+
+    t_estado = tm.monotonic()
+    while True:
+        try:
+            comando = comandos.get(timeout=config["periodo_estado"])
+        except qu.Empty:
+            comando = None
+        if comando == "recepcion" and recibir is None:
+            recibir = crearReceptor()
+            hilos["recepcion"] = th.Thread(target=recibir.recibirLotes, daemon=True)
+            hilos["recepcion"].start()
+        elif comando == "detener_recepcion" and recibir is not None:
+            recibir.detenerRecepcion()
+            hilos.pop("recepcion").join(2)
+            recibir = None              # Un socket cerrado no se reabre: se crea otro receptor
+        elif comando == "registro" and not registro.isWriting:
+            registro.isWriting = True
+            hilos["registro"] = th.Thread(target=registro.registrarDatos, daemon=True)
+            hilos["registro"].start()
+        elif comando == "detener_registro" and registro.isWriting:
+            registro.detenerRegistro()
+            hilos.pop("registro").join(2)
+        elif comando == "salir":
+            break
+        if tm.monotonic() - t_estado >= config["periodo_estado"]:
+            t_estado = tm.monotonic()
+            publicarEstado()
+
+    if recibir is not None:
+        recibir.detenerRecepcion()
+    if registro.isWriting:
+        registro.detenerRegistro()
+    for hilo in hilos.values():
+        hilo.join(2)
+    publicarEstado()
+    anillo.cerrar()
+    sys.stdout.flush()
+
+
+class AdquisicionProceso:
+    """
+    Recepción y registro en un proceso hijo, con las muestras en memoria compartida.
+
+    Atributos:
+    ----------
+    anillo : AnilloCompartido
+        Muestras (t + canales) escritas por el hijo, para leerlas sin copia.
+    estadisticas : dict
+        Último `EstadisticasCanales.resumen()` del hijo ({} hasta el primer estado).
+    calor : ResultadoCalorimetria or None
+        Último resultado calorimétrico del hijo.
+    metricas : dict
+        Último `METRICAS.resumen()` del hijo.
+    """
+    def __init__(self, canales=('Temperatura',), puerto=8889, motor="hilos", formato="npy", ruta=None,
+                 bitacora=True, capacidad=2 ** 18, periodo_estado=0.5, nivel="INFO"):
+        """
+        Crea el anillo compartido; el proceso hijo se lanza con `iniciar`.
+
+        Parameters
+        ----------
+        canales : tuple of str, opcional
+            Nombres de los canales. Por defecto ('Temperatura',).
+        puerto : int, opcional
+            Puerto UDP de escucha. Por defecto 8889.
+        motor : str, opcional
+            "hilos" (Recibir) o "asyncio" (MotorAsincrono). Por defecto "hilos".
+        formato : str, opcional
+            Formato del registro (uno de `FORMATOS_REGISTRO` del módulo de almacenamiento). Por defecto "npy".
+        ruta : str, opcional
+            Ruta del registro. Por defecto la de `Registro.rutaRegistro()`.
+        bitacora : bool, opcional
+            Escribir la bitácora de recuperación. Por defecto True.
+        capacidad : int, opcional
+            Muestras retenidas en el anillo. Por defecto 2**18.
+        periodo_estado : float, opcional
+            Segundos entre envíos de estadísticas y métricas. Por defecto 0.5.
+        nivel : str, opcional
+            Nivel mínimo de los mensajes reenviados. Por defecto "INFO".
+        """
+        canales = tuple(canales)
+        self.config = {"canales": canales, "puerto": puerto, "motor": motor, "formato": formato, "ruta": ruta,
+                       "bitacora": bitacora, "capacidad": capacidad, "periodo_estado": periodo_estado,
+                       "nivel": nivel}
+        self.anillo = AnilloCompartido(('t',) + canales, capacidad)
+        contexto = mp.get_context("spawn")      # Sin heredar Tk ni los hilos de la interfaz
+        self.comandos = contexto.Queue()
+        self.eventos = contexto.Queue(maxsize=10000)
+        self.proceso = contexto.Process(target=_principal, name="adquisicion",
+                                        args=(self.config, self.anillo.nombre, self.comandos, self.eventos),
+                                        daemon=True)
+        self.estadisticas, self.calor, self.metricas = {}, None, {}
+
+    def iniciar(self):
+        """Lanza el proceso hijo (todavía sin recibir ni registrar)."""
+        self.proceso.start()
+
+    def iniciarRecepcion(self):
+        """Abre el socket y empieza a recibir en el hijo."""
+        self.comandos.put("recepcion")
+
+    def detenerRecepcion(self):
+        """Cierra el socket del hijo."""
+        self.comandos.put("detener_recepcion")
+
+    def iniciarRegistro(self):
+        """Empieza un registro nuevo en el hijo (reinicia el anillo)."""
+        self.comandos.put("registro")
+
+    def detenerRegistro(self):
+        """Guarda lo pendiente y cierra el registro del hijo."""
+        self.comandos.put("detener_registro")
+
+    def sondear(self, consola=None, maximo=1000):
+        """
+        Atiende los eventos pendientes del hijo sin bloquear.
+
+        Parameters
+        ----------
+        consola : ColaMensajes, opcional
+            Destino de los mensajes del hijo. Por defecto se registran en `log`.
+        maximo : int, opcional
+            Eventos atendidos como máximo por llamada. Por defecto 1000.
+
+        Returns
+        -------
+        int
+            Eventos atendidos.
+        """
+        for i in range(maximo):
+            try:
+                evento = self.eventos.get_nowait()
+            except qu.Empty:
+                return i
+            if evento[0] == "mensaje":
+                if consola is not None:
+                    consola.agregar(evento[1], evento[2])
+                else:
+                    log.log(evento[1], "%s", evento[2])
+            else:
+                _, self.estadisticas, self.calor, self.metricas = evento
+        return maximo
+
+    def cerrar(self, espera=5.0):
+        """
+        Detiene el hijo de forma ordenada (guarda el registro) y libera el anillo.
+
+        Parameters
+        ----------
+        espera : float, opcional
+            Segundos de espera antes de terminarlo a la fuerza. Por defecto 5.
+        """
+        if self.proceso.is_alive():
+            self.comandos.put("salir")
+            self.proceso.join(espera)
+            if self.proceso.is_alive():
+                log.warning("El proceso de adquisicion no termino; se detiene a la fuerza")
+                self.proceso.terminate()
+                self.proceso.join(1)
+        self.sondear()          # Ultimo estado y mensajes del hijo
+        self.anillo.cerrar()
@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Nov 20th 2024
+
+@author: Triton Perea
+
+Formatos de trama usados entre el emisor y el receptor UDP.
+
+- Texto (legado): 'x<dato>y', p. ej. 'x50.12y'. Sólo se aceptan datos con la
+  longitud esperada (5 caracteres por defecto). Con varios canales los datos
+  se separan por comas: 'x50.12,49.87,51.03y'.
+- Binario: trama empaquetada con `struct`, en little-endian.
+
+  Versión 1 (un canal):
+
+    =======  ======  ==========================================
+    Campo    Tipo    Descripción
+    =======  ======  ==========================================
+    magic    uint8   0xCA, identifica la trama binaria
+    version  uint8   Versión del formato (1)
+    seq      uint32  Número de secuencia de la muestra
+    t_ms     uint32  Marca de tiempo del dispositivo en ms
+    valor    float32 Temperatura medida
+    crc      uint32  CRC-32 (zlib) de todos los campos anteriores
+    =======  ======  ==========================================
+
+  Versión 2 (N canales):
+
+    =========  ==========  ========================================
+    Campo      Tipo        Descripción
+    =========  ==========  ========================================
+    magic      uint8       0xCA
+    version    uint8       Versión del formato (2)
+    ncanales   uint8       Número de canales N
+    (relleno)  uint8       Sin uso, 0
+    seq        uint32      Número de secuencia de la muestra
+    t_ms       uint32      Marca de tiempo del dispositivo en ms
+    valores    float32[N]  Un valor por canal
+    crc        uint32      CRC-32 (zlib) de todos los campos anteriores
+    =========  ==========  ========================================
+
+Ambos formatos se describen a sí mismos por su primer byte ('x' o 0xCA), así
+el receptor acepta cualquiera de los formatos que tenga habilitados sin
+configuración adicional en el emisor.
+"""
+# Importar librerias a usar
+import struct
+import zlib
+from collections import namedtuple
+import numpy as np
+
+MAGIC_BINARIO = 0xCA
+VERSION_BINARIO = 1             # Un canal
+VERSION_MULTICANAL = 2          # N canales
+FORMATOS = ("texto", "binario")
+
+_CABECERA = struct.Struct("<BBIIf")     # v1: magic, version, seq, t_ms, valor
+_CABECERA_MC = struct.Struct("<BBBxII")  # v2: magic, version, ncanales, seq, t_ms
+_CRC = struct.Struct("<I")
+LONGITUD_BINARIO = _CABECERA.size + _CRC.size
+
+TramaBinaria = namedtuple("TramaBinaria", "version secuencia t_dispositivo valores")
+
+# Vista estructurada de la trama binaria v1 para decodificar lotes con NumPy
+DTYPE_BINARIO = np.dtype([("magic", "u1"), ("version", "u1"), ("secuencia", "<u4"),
+                          ("t_dispositivo", "<u4"), ("valor", "<f4"), ("crc", "<u4")])
+
+LoteDecodificado = namedtuple("LoteDecodificado", "valores mascara secuencias t_dispositivo")
+""" Resultado de `decodificarLote`: arreglos alineados con los datagramas del lote.
+
+valores : float64 de forma (n, n_canales), NaN donde la trama es inválida.
+mascara : bool, True donde la trama es válida.
+secuencias : int64, -1 donde la trama no trae número de secuencia (texto o inválida).
+t_dispositivo : int64, -1 donde la trama no trae marca de tiempo.
+"""
+
+
+def dtypeMulticanal(n_canales):
+    """
+    Vista estructurada de la trama binaria v2 con `n_canales` valores.
+
+    Parameters
+    ----------
+    n_canales : int
+        Número de canales.
+
+    Returns
+    -------
+    numpy.dtype
+    """
+    return np.dtype([("magic", "u1"), ("version", "u1"), ("ncanales", "u1"), ("relleno", "u1"),
+                     ("secuencia", "<u4"), ("t_dispositivo", "<u4"),
+                     ("valores", "<f4", (n_canales,)), ("crc", "<u4")])
+
+
+def longitudMulticanal(n_canales):
+    """int: Longitud en bytes de una trama binaria v2 con `n_canales` valores."""
+    return _CABECERA_MC.size + 4 * n_canales + _CRC.size
+
+
+def esBinario(datagrama):
+    """
+    Indica si un datagrama usa el formato binario.
+
+    Parameters
+    ----------
+    datagrama : bytes
+        Datagrama recibido.
+
+    Returns
+    -------
+    bool
+    """
+    return len(datagrama) > 0 and datagrama[0] == MAGIC_BINARIO
+
+
+def codificarBinario(valor, secuencia, t_dispositivo):
+    """
+    Empaqueta una muestra en el formato binario.
+
+    Un valor escalar usa la versión 1; una secuencia de valores (uno por canal)
+    usa la versión 2.
+
+    Parameters
+    ----------
+    valor : float or sequence of float
+        Temperatura(s) a enviar.
+    secuencia : int
+        Número de secuencia (se trunca a 32 bits).
+    t_dispositivo : int
+        Marca de tiempo del dispositivo en milisegundos (se trunca a 32 bits).
+
+    Returns
+    -------
+    bytes
+        Trama lista para enviarse.
+    """
+    secuencia, t_dispositivo = secuencia & 0xFFFFFFFF, int(t_dispositivo) & 0xFFFFFFFF
+    if np.ndim(valor) == 0:
+        cuerpo = _CABECERA.pack(MAGIC_BINARIO, VERSION_BINARIO, secuencia, t_dispositivo, valor)
+    else:
+        valores = np.asarray(valor, dtype="<f4")
+        cuerpo = _CABECERA_MC.pack(MAGIC_BINARIO, VERSION_MULTICANAL, valores.size,
+                                   secuencia, t_dispositivo) + valores.tobytes()
+    return cuerpo + _CRC.pack(zlib.crc32(cuerpo))
+
+
+def decodificarBinario(datagrama):
+    """
+    Desempaqueta y valida una trama binaria (versión 1 o 2).
+
+    Parameters
+    ----------
+    datagrama : bytes
+        Datagrama recibido.
+
+    Returns
+    -------
+    TramaBinaria or None
+        La trama decodificada (`valores` es una tupla con un valor por canal),
+        o None si la longitud, versión o CRC no coinciden.
+    """
+    if len(datagrama) < 2 or datagrama[0] != MAGIC_BINARIO:
+        return None
+    version = datagrama[1]
+    if version == VERSION_BINARIO:
+        if len(datagrama) != LONGITUD_BINARIO:
+            return None
+        fin = _CABECERA.size
+    elif version == VERSION_MULTICANAL:
+        if len(datagrama) < _CABECERA_MC.size + _CRC.size or len(datagrama) != longitudMulticanal(datagrama[2]):
+            return None
+        fin = len(datagrama) - _CRC.size
+    else:
+        return None
+    if _CRC.unpack_from(datagrama, fin)[0] != zlib.crc32(datagrama[:fin]):
+        return None
+    if version == VERSION_BINARIO:
+        _, _, secuencia, t_dispositivo, valor = _CABECERA.unpack_from(datagrama)
+        return TramaBinaria(version, secuencia, t_dispositivo, (valor,))
+    _, _, n, secuencia, t_dispositivo = _CABECERA_MC.unpack_from(datagrama)
+    valores = struct.unpack_from(f"<{n}f", datagrama, _CABECERA_MC.size)
+    return TramaBinaria(version, secuencia, t_dispositivo, valores)
+
+
+def codificarTexto(valor):
+    """
+    Construye una trama de texto 'x<valor>y' (o 'x<v1>,<v2>,...y' con varios canales).
+
+    Parameters
+    ----------
+    valor : float or str or sequence
+        Dato(s) a enviar.
+
+    Returns
+    -------
+    bytes
+    """
+    if isinstance(valor, (list, tuple, np.ndarray)):
+        valor = ",".join(str(v) for v in valor)
+    return ("x" + str(valor) + "y").encode("utf-8")
+
+
+def codificarLoteTexto(valores, formato="%05.2f"):
+    """
+    Construye las tramas de texto de un bloque de muestras.
+
+    Parameters
+    ----------
+    valores : numpy.ndarray
+        Muestras de forma (n, canales) o (n,).
+    formato : str, opcional
+        Formato de cada dato. Por defecto '%05.2f' (p. ej. '05.10', '50.12').
+
+    Returns
+    -------
+    list of bytes
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    if valores.ndim == 1:
+        valores = valores[:, None]
+    campos = np.char.mod(formato, valores)
+    if valores.shape[1] == 1:
+        return [("x" + c + "y").encode("ascii") for c in campos[:, 0]]
+    return [("x" + ",".join(fila) + "y").encode("ascii") for fila in campos]
+
+
+def codificarLoteBinario(valores, secuencias, t_dispositivo):
+    """
+    Empaqueta un bloque de muestras en tramas binarias con una sola
+    escritura vectorizada (v1 con un canal, v2 con varios).
+
+    Parameters
+    ----------
+    valores : numpy.ndarray
+        Muestras de forma (n, canales) o (n,).
+    secuencias : array_like
+        Número de secuencia de cada muestra.
+    t_dispositivo : array_like
+        Marca de tiempo (ms) de cada muestra.
+
+    Returns
+    -------
+    list of bytes
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    if valores.ndim == 1:
+        valores = valores[:, None]
+    n, n_canales = valores.shape
+    if n_canales == 1:
+        tramas = np.zeros(n, dtype=DTYPE_BINARIO)
+        tramas["version"] = VERSION_BINARIO
+        tramas["valor"] = valores[:, 0]
+        largo, cab = LONGITUD_BINARIO, _CABECERA.size
+    else:
+        tramas = np.zeros(n, dtype=dtypeMulticanal(n_canales))
+        tramas["version"] = VERSION_MULTICANAL
+        tramas["ncanales"] = n_canales
+        tramas["valores"] = valores
+        largo = longitudMulticanal(n_canales)
+        cab = largo - _CRC.size
+    tramas["magic"] = MAGIC_BINARIO
+    tramas["secuencia"] = np.asarray(secuencias, dtype=np.int64) & 0xFFFFFFFF
+    tramas["t_dispositivo"] = np.asarray(t_dispositivo, dtype=np.int64) & 0xFFFFFFFF
+    bruto = memoryview(tramas).cast("B")
+    tramas["crc"] = [zlib.crc32(bruto[k:k + cab]) for k in range(0, n * largo, largo)]
+    bruto = tramas.tobytes()
+    return [bruto[k:k + largo] for k in range(0, n * largo, largo)]
+
+
+def anchoTexto(len_temp, n_canales=1):
+    """int: Longitud de una trama de texto con `n_canales` datos de `len_temp` caracteres."""
+    return n_canales * (len_temp + 1) + 1
+
+
+def decodificarTexto(data_point, len_temp=5, inicio="x", fin="y", n_canales=1):
+    """
+    Valida una trama de texto legado y devuelve su contenido.
+
+    Parameters
+    ----------
+    data_point : str
+        Trama decodificada y sin espacios.
+    len_temp : int, opcional
+        Longitud esperada de cada dato. Por defecto 5.
+    inicio, fin : str, opcional
+        Caracteres delimitadores. Por defecto 'x' y 'y'.
+    n_canales : int, opcional
+        Número de datos separados por comas. Por defecto 1.
+
+    Returns
+    -------
+    str or None
+        El dato sin delimitadores, o None si la trama es inválida.
+    """
+    if len(data_point) == anchoTexto(len_temp, n_canales) and data_point[0] == inicio and data_point[-1] == fin:
+        contenido = data_point[1:-1]
+        if n_canales == 1 or all(len(c) == len_temp for c in contenido.split(",")):
+            return contenido
+    return None
+
+
+def _textoAFlotante(campos):
+    """
+    Convierte una matriz de caracteres ASCII (una fila por dato) a flotantes.
+
+    Acepta dígitos, a lo más un punto decimal y un signo '-' inicial. La
+    conversión se hace columna a columna, sin recorrer los datos en Python.
+
+    Parameters
+    ----------
+    campos : numpy.ndarray
+        Matriz uint8 de forma (n, ancho).
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        Valores (float64) y máscara de validez (bool).
+    """
+    n, ancho = campos.shape
+    es_digito = (campos >= 48) & (campos <= 57)
+    es_punto = campos == 46
+    es_signo = np.zeros_like(es_digito)
+    es_signo[:, 0] = campos[:, 0] == 45
+    mascara = ((es_digito | es_punto | es_signo).all(axis=1)
+               & (es_punto.sum(axis=1) <= 1) & es_digito.any(axis=1))
+
+    digitos = np.where(es_digito, campos.astype(np.int64) - 48, 0)
+    # Exponente de cada dígito = número de dígitos a su derecha
+    exponente = es_digito[:, ::-1].cumsum(axis=1)[:, ::-1] - es_digito
+    mantisa = (digitos * 10 ** exponente).sum(axis=1)
+    # Decimales = dígitos a la derecha del punto
+    pos_punto = np.where(es_punto.any(axis=1), es_punto.argmax(axis=1), ancho)
+    decimales = (es_digito & (np.arange(ancho) > pos_punto[:, None])).sum(axis=1)
+    valores = mantisa / 10.0 ** decimales
+    valores[es_signo[:, 0]] *= -1
+    valores[~mascara] = np.nan
+    return valores, mascara
+
+
+def decodificarLote(datagramas, len_temp=5, formatos=FORMATOS, inicio="x", fin="y", n_canales=1):
+    """
+    Valida y convierte un lote de datagramas crudos a arreglos numéricos.
+
+    Las tramas de texto y binarias se separan por longitud y primer byte, y
+    cada grupo se decodifica en un solo paso vectorizado sobre los bytes
+    concatenados. A las tramas de texto se les quitan antes los espacios y
+    fines de línea de los extremos (p. ej. el "\\r\\n" de muchos dispositivos);
+    las binarias se comparan tal cual. Los datos inválidos quedan como NaN y
+    con máscara False, nunca como ceros.
+
+    Parameters
+    ----------
+    datagramas : list of bytes
+        Datagramas recibidos.
+    len_temp : int, opcional
+        Longitud esperada de cada dato en tramas de texto. Por defecto 5.
+    formatos : tuple of str, opcional
+        Formatos aceptados. Por defecto ("texto", "binario").
+    inicio, fin : str, opcional
+        Delimitadores de la trama de texto. Por defecto 'x' y 'y'.
+    n_canales : int, opcional
+        Número de canales por muestra. Por defecto 1.
+
+    Returns
+    -------
+    LoteDecodificado
+    """
+    n = len(datagramas)
+    valores = np.full((n, n_canales), np.nan)
+    mascara = np.zeros(n, dtype=bool)
+    secuencias = np.full(n, -1, dtype=np.int64)
+    t_dispositivo = np.full(n, -1, dtype=np.int64)
+    if n == 0:
+        return LoteDecodificado(valores, mascara, secuencias, t_dispositivo)
+
+    longitudes = np.fromiter(map(len, datagramas), dtype=np.int64, count=n)
+    primeros = np.fromiter((d[0] if d else 0 for d in datagramas), dtype=np.uint8, count=n)
+
+    ancho = anchoTexto(len_temp, n_canales)
+    if "texto" in formatos:
+        textos = [d.strip() for d in datagramas]        # Espacios ASCII y fines de linea
+        longitudes_t = np.fromiter(map(len, textos), dtype=np.int64, count=n)
+        primeros_t = np.fromiter((d[0] if d else 0 for d in textos), dtype=np.uint8, count=n)
+        idx = np.flatnonzero((longitudes_t == ancho) & (primeros_t == ord(inicio)))
+        if idx.size:
+            bruto = np.frombuffer(b"".join([textos[i] for i in idx]), dtype=np.uint8)
+            bruto = bruto.reshape(idx.size, ancho)
+            # Se sustituye la 'y' final por una coma para separar en (n, canales, len_temp + 1)
+            campos = bruto[:, 1:].copy()
+            ok = campos[:, -1] == ord(fin)
+            campos[:, -1] = ord(",")
+            campos = campos.reshape(idx.size, n_canales, len_temp + 1)
+            ok &= (campos[:, :, -1] == ord(",")).all(axis=1)
+            vals, ok_campos = _textoAFlotante(campos[:, :, :-1].reshape(-1, len_temp))
+            ok &= ok_campos.reshape(idx.size, n_canales).all(axis=1)
+            valores[idx] = np.where(ok[:, None], vals.reshape(idx.size, n_canales), np.nan)
+            mascara[idx] = ok
+
+    if "binario" in formatos:
+        grupos = [(LONGITUD_BINARIO, DTYPE_BINARIO, _CABECERA.size, VERSION_BINARIO)] if n_canales == 1 else []
+        largo_mc = longitudMulticanal(n_canales)
+        grupos.append((largo_mc, dtypeMulticanal(n_canales), largo_mc - _CRC.size, VERSION_MULTICANAL))
+        for largo, dtype, cab, version in grupos:
+            idx = np.flatnonzero((longitudes == largo) & (primeros == MAGIC_BINARIO))
+            if not idx.size:
+                continue
+            bruto = b"".join([datagramas[i] for i in idx])
+            tramas = np.frombuffer(bruto, dtype=dtype)
+            crc = np.fromiter((zlib.crc32(bruto[k:k + cab]) for k in range(0, len(bruto), largo)),
+                              dtype=np.uint32, count=idx.size)
+            ok = (tramas["version"] == version) & (tramas["crc"] == crc)
+            if version == VERSION_MULTICANAL:
+                ok &= tramas["ncanales"] == n_canales
+                vals = tramas["valores"]
+            else:
+                vals = tramas["valor"][:, None]
+            valores[idx] = np.where(ok[:, None], vals, np.nan)
+            mascara[idx] = ok
+            secuencias[idx] = np.where(ok, tramas["secuencia"].astype(np.int64), -1)
+            t_dispositivo[idx] = np.where(ok, tramas["t_dispositivo"].astype(np.int64), -1)
+
+    return LoteDecodificado(valores, mascara, secuencias, t_dispositivo)
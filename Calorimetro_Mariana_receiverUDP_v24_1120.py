@@ -5,13 +5,39 @@ Created on Nov 20th 2024
 @author: Triton Perea
 """
 # Importar librerias a usar
-import numpy as np, pandas as pd     #Numpy y pandas para manejo de datos
-import matplotlib.pyplot as plt  # 3 librearias para graficas 
+import numpy as np     #Numpy para manejo de datos (pandas solo en BufferMuestras.a_dataframe)
 import time as tm                #time para marcar tiempos de ejecucion
 import threading as th, queue as qu   #threading para manejo de hilos
 import sys
 import socket as sk          # socket para recibir datos por UDP
+import selectors             # espera eficiente de datos en el socket (modo por lotes)
 import os
+import re
+import Calorimetro_Mariana_protocoloUDP_v24_1120 as pr   # formatos de trama (texto y binario)
+import Calorimetro_Mariana_almacenamiento_v24_1120 as alm    # formatos de registro (npy, parquet, csv, zlib, lzma)
+import Calorimetro_Mariana_consola_v24_1120 as cs    # consola de mensajes entre hilos
+import Calorimetro_Mariana_estadistica_v24_1120 as est    # estadisticas incrementales del flujo
+import Calorimetro_Mariana_calorimetria_v24_1120 as cal    # calor, energia y capacidad calorifica
+import Calorimetro_Mariana_metricas_v24_1120 as mt    # metricas de la cadena de adquisicion
+
+log = cs.obtenerLogger("receptor")
+
+# Metricas de cada etapa: recepcion, verificacion, cola y registro
+_recibidos = mt.METRICAS.contador("datagramas_recibidos_total", "Datagramas recibidos")
+_invalidos = mt.METRICAS.contador("datagramas_invalidos_total", "Datagramas rechazados por el verificador")
+_tam_lote = mt.METRICAS.histograma("tamano_lote", "Datagramas por lote",
+                                   limites=(1, 2, 4, 8, 16, 64, 256, 1024, 4096))
+_t_verificacion = mt.METRICAS.histograma("verificacion_segundos", "Duracion de la verificacion de un lote")
+_encolados = mt.METRICAS.contador("lotes_encolados_total", "Lotes entregados a la cola de registro")
+_registradas = mt.METRICAS.contador("muestras_registradas_total", "Muestras agregadas al registro")
+_latencia = mt.METRICAS.histograma("latencia_registro_segundos", "Tiempo de la recepcion al registro de un lote")
+_t_guardado = mt.METRICAS.histograma("guardado_segundos", "Duracion de la escritura de un bloque del registro")
+_esperas_escritor = mt.METRICAS.contador("escritor_esperas_total", "Veces que el registro espero al hilo de escritura")
+_t_espera_escritor = mt.METRICAS.histograma("escritor_espera_segundos", "Espera del registro por un lugar en el escritor")
+_perdidos = mt.METRICAS.contador("secuencia_perdidos_total", "Numeros de secuencia dados por perdidos")
+_duplicados = mt.METRICAS.contador("secuencia_duplicados_total", "Datagramas con numero de secuencia repetido")
+_tardios = mt.METRICAS.contador("secuencia_tardios_total", "Datagramas llegados despues de darse por perdidos")
+_reordenados = mt.METRICAS.contador("secuencia_reordenados_total", "Datagramas llegados fuera de orden y reordenados")
 
 # Función que divide cadena de caracteres cada ','
 def separarDatos(busDatos):
@@ -34,6 +60,394 @@ def separarDatos(busDatos):
 """ Funciones relativas a la funcionalidad 
 -------------------------------------------------------------------------------
 """
+class LoteDatos:
+    """
+    Conjunto de datagramas recibidos en un mismo despertar del receptor, ya
+    convertidos a arreglos numéricos alineados (uno por datagrama).
+
+    Atributos:
+    ----------
+    valores : numpy.ndarray
+        Datos verificados (float64) de forma (n, canales), NaN donde el datagrama es inválido.
+    mascara : numpy.ndarray
+        True donde el datagrama es válido.
+    secuencias : numpy.ndarray
+        Número de secuencia de cada dato (int64), -1 si la trama no lo trae.
+    t_dispositivo : numpy.ndarray
+        Marca de tiempo del dispositivo en ms (int64), -1 si la trama no la trae.
+    origenes : list
+        Dirección (ip, puerto) de la que proviene cada datagrama.
+    t_recepcion : float
+        Marca de tiempo (time.time) del despertar en que se drenó el lote.
+    puerto : int or None
+        Puerto local por el que llegó el lote.
+    dispositivo : str or None
+        Dispositivo de origen, asignado por `Demultiplexor` (None sin demultiplexar).
+    """
+    __slots__ = ("valores", "mascara", "secuencias", "t_dispositivo", "origenes", "t_recepcion",
+                 "puerto", "dispositivo")
+
+    def __init__(self, decodificado, origenes, t_recepcion, puerto=None, dispositivo=None):
+        """
+        Parameters
+        ----------
+        decodificado : protocoloUDP.LoteDecodificado
+            Arreglos producidos por `Verificador.verificarLote`.
+        origenes : list
+            Direcciones de origen de los datagramas.
+        t_recepcion : float
+            Marca de tiempo del despertar.
+        puerto : int, opcional
+            Puerto local de recepción.
+        dispositivo : str, opcional
+            Dispositivo de origen.
+        """
+        self.valores, self.mascara, self.secuencias, self.t_dispositivo = decodificado
+        self.origenes = origenes
+        self.t_recepcion = t_recepcion
+        self.puerto, self.dispositivo = puerto, dispositivo
+
+    def __len__(self):
+        return len(self.valores)
+
+    def __iter__(self):
+        return iter(self.valores)
+
+class ReordenadorSecuencias:
+    """
+    Buffer de reordenamiento acotado por número de secuencia.
+
+    Las muestras con número de secuencia (tramas binarias) se entregan en orden
+    creciente y sin repetir. Una muestra espera en el buffer mientras falten
+    secuencias anteriores; el hueco se da por perdido cuando el buffer supera
+    `ventana` muestras o la más antigua lleva más de `espera` segundos. Las
+    muestras sin secuencia (texto, -1) pasan sin cambios. Todo el trabajo se
+    hace por lote con NumPy.
+
+    Un salto hacia atrás de más de `ventana` secuencias (que no sean pérdidas
+    tardías), o más de `ventana` muestras viejas seguidas, se toma como un
+    emisor que volvió a empezar (nuevo `sender()`, reproducción, dispositivo
+    reiniciado): lo retenido se entrega y la secuencia se vuelve a anclar.
+
+    Atributos:
+    ----------
+    ventana : int
+        Máximo de muestras retenidas esperando un hueco.
+    espera : float
+        Segundos máximos que una muestra espera un hueco.
+    siguiente : int or None
+        Siguiente número de secuencia esperado (extendido a 64 bits).
+    perdidos, duplicados, tardios, reordenados : int
+        Secuencias dadas por perdidas, muestras repetidas, muestras llegadas
+        después de darse por perdidas y muestras reordenadas.
+    """
+    MODULO = 2 ** 32        # Las secuencias de la trama son uint32
+
+    def __init__(self, ventana=256, espera=0.5):
+        """
+        Parameters
+        ----------
+        ventana : int, opcional
+            Máximo de muestras retenidas. Por defecto 256.
+        espera : float, opcional
+            Segundos máximos de espera de un hueco. Por defecto 0.5.
+        """
+        self.ventana, self.espera = int(ventana), espera
+        self.siguiente = None
+        self.perdidos = self.duplicados = self.tardios = self.reordenados = 0
+        self._max_visto = -1
+        self._racha = 0                 # Muestras viejas (ya entregadas) seguidas, ver _esReinicio
+        self._perdidas = set()          # Secuencias perdidas recientes, para reconocer las tardias
+        self._pendiente = None          # (secuencias, valores, mascara, t_dispositivo, origenes, t_llegada)
+        self._previas = None
+
+    def __len__(self):
+        return 0 if self._pendiente is None else len(self._pendiente[0])
+
+    def _extender(self, secuencias):
+        """Extiende las secuencias uint32 a 64 bits alrededor de la esperada (cruce por 2**32)."""
+        if self.siguiente is None:
+            return secuencias
+        vueltas = (self.siguiente - secuencias + self.MODULO // 2) // self.MODULO
+        return secuencias + vueltas * self.MODULO
+
+    def procesar(self, lote=None, ahora=None):
+        """
+        Incorpora un lote y devuelve las muestras que ya pueden entregarse en orden.
+
+        Parameters
+        ----------
+        lote : LoteDatos, opcional
+            Lote recién recibido. Si es None sólo se liberan las muestras vencidas.
+        ahora : float, opcional
+            Marca de tiempo actual (time.time). Por defecto la del lote o time.time().
+
+        Returns
+        -------
+        LoteDatos or None
+            Muestras entregables (sin secuencia primero, luego en orden de
+            secuencia), o None si no hay ninguna.
+        """
+        ahora = (lote.t_recepcion if lote is not None else tm.time()) if ahora is None else ahora
+        libres, self._previas = None, None
+        if lote is not None and len(lote):
+            con_sec = lote.secuencias >= 0
+            origenes = np.empty(len(lote), dtype=object)
+            origenes[:] = lote.origenes
+            campos = (lote.secuencias, lote.valores, lote.mascara, lote.t_dispositivo, origenes)
+            if not con_sec.all():
+                libres = tuple(c[~con_sec] for c in campos)
+            if con_sec.any():
+                nuevos = tuple(c[con_sec] for c in campos)
+                self._incorporar(nuevos[0], nuevos[1:], ahora)
+        return self._armar((libres, self._previas, self._liberar(ahora)), ahora)
+
+    @staticmethod
+    def _armar(partes, ahora):
+        """Une las partes entregables (tuplas de arreglos) en un LoteDatos."""
+        partes = [p for p in partes if p is not None and len(p[0])]
+        if not partes:
+            return None
+        sec, val, masc, t_disp, orig = (np.concatenate(c) for c in zip(*partes))
+        return LoteDatos(pr.LoteDecodificado(val, masc, sec, t_disp), list(orig), ahora)
+
+    def _esReinicio(self, sec):
+        """Si las secuencias `sec` (extendidas) indican que el emisor volvió a empezar."""
+        viejas = sec < self.siguiente
+        atras = sec < self.siguiente - self.ventana
+        if atras.any() and not any(s in self._perdidas for s in sec[atras].tolist()):
+            return True
+        nuevas = np.flatnonzero(~viejas)
+        self._racha = self._racha + len(sec) if not len(nuevas) else len(sec) - 1 - int(nuevas[-1])
+        return self._racha > self.ventana
+
+    def _incorporar(self, secuencias, resto, ahora):
+        sec = self._extender(secuencias.astype(np.int64))
+        if self.siguiente is not None and self._esReinicio(sec):
+            log.warning("Reinicio de la secuencia del emisor (%d -> %d)", self.siguiente, int(sec.min()))
+            self._previas = self._liberar(ahora, todas=True)     # Lo retenido del flujo anterior sale primero
+            self.siguiente, self._max_visto, self._racha = None, -1, 0
+            self._perdidas.clear()
+            sec = secuencias.astype(np.int64)
+        # Fuera de orden: menor que alguna secuencia llegada antes
+        previas = np.maximum.accumulate(np.concatenate(([self._max_visto], sec)))[:-1]
+        n_reord = int(np.count_nonzero(sec < previas))
+        self._max_visto = max(self._max_visto, int(sec.max()))
+        if self.siguiente is None:
+            self.siguiente = int(sec.min())
+        # Ya entregadas o dadas por perdidas
+        viejas = sec < self.siguiente
+        if viejas.any():
+            tardias = [s for s in sec[viejas].tolist() if s in self._perdidas]
+            self._perdidas.difference_update(tardias)
+            self.tardios += len(tardias)
+            self.duplicados += int(np.count_nonzero(viejas)) - len(tardias)
+            _tardios.incrementar(len(tardias))
+            _duplicados.incrementar(int(np.count_nonzero(viejas)) - len(tardias))
+            n_reord -= int(np.count_nonzero(viejas & (sec < previas)))
+            sec, resto = sec[~viejas], tuple(c[~viejas] for c in resto)
+        self.reordenados += n_reord
+        _reordenados.incrementar(n_reord)
+        t_llegada = np.full(len(sec), ahora)
+        if self._pendiente is not None:
+            sec = np.concatenate((self._pendiente[0], sec))
+            resto = tuple(np.concatenate((a, b)) for a, b in zip(self._pendiente[1:5], resto))
+            t_llegada = np.concatenate((self._pendiente[5], t_llegada))
+        # Ordenar y quitar repetidas (se conserva la primera en llegar)
+        sec, primeras = np.unique(sec, return_index=True)
+        repetidas = len(t_llegada) - len(primeras)
+        self.duplicados += repetidas
+        _duplicados.incrementar(repetidas)
+        self._pendiente = (sec,) + tuple(c[primeras] for c in resto) + (t_llegada[primeras],)
+
+    def _liberar(self, ahora, todas=False):
+        if self._pendiente is None or not len(self._pendiente[0]):
+            return None
+        sec, t_llegada = self._pendiente[0], self._pendiente[5]
+        # Forzar la entrega de las que exceden la ventana o vencieron su espera
+        forzadas = len(sec) if todas else max(len(sec) - self.ventana, 0)
+        vencidas = np.flatnonzero(t_llegada <= ahora - self.espera)
+        if len(vencidas):
+            forzadas = max(forzadas, int(vencidas.max()) + 1)
+        if forzadas:
+            huecos = np.setdiff1d(np.arange(self.siguiente, sec[forzadas - 1] + 1), sec[:forzadas])
+            self._declararPerdidas(huecos)
+            self.siguiente = int(sec[forzadas - 1]) + 1
+        # Tramo contiguo desde la siguiente esperada
+        resto = sec[forzadas:]
+        rotura = np.flatnonzero(resto != self.siguiente + np.arange(len(resto)))
+        n = forzadas + (int(rotura[0]) if len(rotura) else len(resto))
+        if not n:
+            return None
+        self.siguiente = int(sec[n - 1]) + 1
+        entregadas = tuple(c[:n] for c in self._pendiente[:5])
+        self._pendiente = tuple(c[n:] for c in self._pendiente)
+        return entregadas
+
+    def _declararPerdidas(self, huecos):
+        if not len(huecos):
+            return
+        self.perdidos += len(huecos)
+        _perdidos.incrementar(len(huecos))
+        if len(self._perdidas) + len(huecos) > 16 * self.ventana:
+            self._perdidas.clear()          # Solo se recuerdan las perdidas recientes
+        self._perdidas.update(huecos[-16 * self.ventana:].tolist())
+
+    def vaciar(self):
+        """
+        Entrega todas las muestras retenidas, dando por perdidos los huecos.
+
+        Returns
+        -------
+        LoteDatos or None
+        """
+        ahora = tm.time()
+        return self._armar((self._liberar(ahora, todas=True),), ahora)
+
+class Demultiplexor:
+    """
+    Separa los lotes por dispositivo de origen.
+
+    El dispositivo se identifica por la IP de origen (`por="ip"`), por la
+    dirección completa ip:puerto de origen (`"direccion"`) o por el puerto
+    local de recepción (`"puerto"`). La tabla `dispositivos` da nombre a cada
+    clave ({"192.168.1.64": "calorimetro_A"}); una clave sin nombre se nombra
+    con la propia clave. Cada dispositivo tiene su propio `ReordenadorSecuencias`,
+    porque los números de secuencia sólo tienen sentido dentro de un emisor.
+
+    Atributos:
+    ----------
+    por : str
+        Criterio de identificación: "ip", "direccion" o "puerto".
+    dispositivos : dict
+        {clave (str): nombre del dispositivo}.
+    reordenadores : dict
+        {dispositivo: ReordenadorSecuencias} (vacío si no se reordena).
+    """
+    CRITERIOS = ("ip", "direccion", "puerto")
+
+    def __init__(self, dispositivos=None, por="ip", reordenar=True):
+        """
+        Parameters
+        ----------
+        dispositivos : dict, opcional
+            {clave: nombre}. Por defecto vacío (cada clave es su nombre).
+        por : str, opcional
+            Criterio de identificación. Por defecto "ip".
+        reordenar : bool, opcional
+            Reordenar por secuencia dentro de cada dispositivo. Por defecto True.
+        """
+        if por not in self.CRITERIOS:
+            raise ValueError(f"Criterio de demultiplexado desconocido: {por}")
+        self.por = por
+        self.dispositivos = {str(k): str(v) for k, v in (dispositivos or {}).items()}
+        self.reordenar = reordenar
+        self.reordenadores = {}
+        self._nombres = {}          # (origen, puerto) -> dispositivo, evita rearmar la clave
+
+    def nombre(self, origen, puerto=None):
+        """
+        Dispositivo al que pertenece un datagrama.
+
+        Parameters
+        ----------
+        origen : tuple
+            Dirección (ip, puerto) de origen.
+        puerto : int, opcional
+            Puerto local de recepción.
+
+        Returns
+        -------
+        str
+        """
+        nombre = self._nombres.get((origen, puerto))
+        if nombre is None:
+            if self.por == "ip":
+                clave = str(origen[0])
+            elif self.por == "direccion":
+                clave = f"{origen[0]}:{origen[1]}"
+            else:
+                clave = str(puerto)
+            nombre = self._nombres[(origen, puerto)] = self.dispositivos.setdefault(clave, clave)
+            if nombre not in self.reordenadores:
+                log.info("Nuevo dispositivo: %s", nombre)
+                self.reordenadores[nombre] = ReordenadorSecuencias() if self.reordenar else None
+        return nombre
+
+    def procesar(self, lote=None):
+        """
+        Separa un lote por dispositivo y lo pasa por el reordenador de cada uno.
+
+        Parameters
+        ----------
+        lote : LoteDatos, opcional
+            Lote recién recibido. Si es None sólo se liberan las muestras vencidas.
+
+        Returns
+        -------
+        list of LoteDatos
+            Lotes entregables, cada uno con `dispositivo` asignado.
+        """
+        ahora = lote.t_recepcion if lote is not None else tm.time()
+        partes = {}
+        if lote is not None and len(lote):
+            grupos = {}
+            for i, origen in enumerate(lote.origenes):
+                grupos.setdefault(self.nombre(origen, lote.puerto), []).append(i)
+            if len(grupos) == 1:
+                partes[next(iter(grupos))] = lote       # Caso comun: un solo dispositivo en el lote
+            else:
+                for nombre, sel in grupos.items():
+                    sel = np.asarray(sel)
+                    partes[nombre] = LoteDatos(
+                        pr.LoteDecodificado(lote.valores[sel], lote.mascara[sel], lote.secuencias[sel],
+                                            lote.t_dispositivo[sel]),
+                        [lote.origenes[j] for j in sel], lote.t_recepcion, lote.puerto)
+        salida = []
+        for nombre, reordenador in self.reordenadores.items():
+            parte = partes.get(nombre)
+            if reordenador is not None:
+                parte = reordenador.procesar(parte, ahora)
+            if parte is not None and len(parte):
+                parte.dispositivo = nombre
+                salida.append(parte)
+        return salida
+
+    def vaciar(self):
+        """
+        Entrega lo retenido en todos los reordenadores.
+
+        Returns
+        -------
+        list of LoteDatos
+        """
+        salida = []
+        for nombre, reordenador in self.reordenadores.items():
+            parte = reordenador.vaciar() if reordenador is not None else None
+            if parte is not None and len(parte):
+                parte.dispositivo = nombre
+                salida.append(parte)
+        return salida
+
+
+def _secuenciar(lote, reordenador, demultiplexor):
+    """
+    Pasa un lote por el demultiplexor o el reordenador (si hay) y devuelve los lotes entregables.
+    """
+    if demultiplexor is not None:
+        return demultiplexor.procesar(lote)
+    if reordenador is not None:
+        lote = reordenador.procesar(lote)
+    return [] if lote is None or not len(lote) else [lote]
+
+
+def _vaciarRetenidos(reordenador, demultiplexor):
+    """Entrega lo retenido en el demultiplexor o el reordenador al detener la recepción."""
+    if demultiplexor is not None:
+        return demultiplexor.vaciar()
+    lote = reordenador.vaciar() if reordenador is not None else None
+    return [] if lote is None or not len(lote) else [lote]
+
 class Recibir:
     """
     Clase para recibir datos utilizando el protocolo UDP.
@@ -50,8 +464,19 @@ class Recibir:
         Dirección IP del dispositivo desde el que se reciben los datos. Por defecto "192.168.1.64".
     port : int
         Puerto UDP a utilizar. Por defecto 8889.
+    puertos : tuple of int
+        Puertos UDP escuchados con un mismo selector en `recibirLotes` (el primero es `port`).
+    max_lote : int
+        Número máximo de datagramas drenados por despertar en `recibirLotes`.
+    rcvbuf : int or None
+        Tamaño solicitado del buffer de recepción del kernel (SO_RCVBUF).
+    reordenador : ReordenadorSecuencias or None
+        Entrega las muestras en orden de secuencia y cuenta pérdidas (None: sin reordenar).
+    demultiplexor : Demultiplexor or None
+        Separa las muestras por dispositivo de origen (con un reordenador por dispositivo).
     """
-    def __init__(self,reference, data_queue, data_queue_0, UDP_IP= "192.168.1.64",port=8889):
+    def __init__(self,reference, data_queue, data_queue_0, UDP_IP= "192.168.1.64",port=8889, max_lote=4096, rcvbuf=None, canales=('Temperatura',),
+                 reordenar=True, puertos=None, demultiplexor=None):
         """
         Inicializa la clase de recepción de datos.
 
@@ -67,15 +492,51 @@ class Recibir:
             Dirección IP del dispositivo de recepción. Por defecto es "192.168.1.64".
         port : int, opcional
             Puerto UDP a utilizar. Por defecto es 8889.
+        max_lote : int, opcional
+            Máximo de datagramas por lote en `recibirLotes`. Por defecto 4096.
+        rcvbuf : int, opcional
+            Tamaño del buffer de recepción del kernel en bytes. Por defecto None (el del sistema).
+        canales : tuple of str, opcional
+            Nombres de los canales por muestra. Por defecto ('Temperatura',).
+        reordenar : bool, opcional
+            Reordenar por número de secuencia y detectar pérdidas en `recibirLotes`. Por defecto True.
+        puertos : iterable of int, opcional
+            Varios puertos de escucha para `recibirLotes`. Por defecto sólo `port`.
+        demultiplexor : Demultiplexor, opcional
+            Separar las muestras por dispositivo; reemplaza al reordenador único. Por defecto None.
         """
         # Variables globales
         self.reference = reference      # Paso la referencia del root principal
         self.data_queue = data_queue    # Usar la cola pasada desde la InterfazGrafica
         self.data_queue_0 = data_queue_0    #Cola para datos entre clases de recibir y registro
-        self.UDP_IP, self.port= UDP_IP, port
+        self.puertos = tuple(puertos) if puertos else (port,)
+        self.UDP_IP, self.port= UDP_IP, self.puertos[0]
         self.is_recieving = False       # Ayuda a gestionar el hilo en segundo plano
-        self.sock = sk.socket(sk.AF_INET,sk.SOCK_DGRAM) # Vincular el socket a todas las interfaces locales
-        self.ver= Verificador()
+        self.socks = [sk.socket(sk.AF_INET,sk.SOCK_DGRAM) for _ in self.puertos] # Un socket por puerto
+        self.sock = self.socks[0]
+        self.ver= Verificador(canales=canales)
+        self.max_lote, self.rcvbuf = max_lote, rcvbuf
+        self.demultiplexor = demultiplexor
+        self.reordenador = ReordenadorSecuencias() if reordenar and demultiplexor is None else None
+
+    def _vincularSocket(self):
+        """
+        Configura y vincula cada socket a su puerto de escucha.
+
+        Returns
+        -------
+        None.
+        """
+        try:
+            for sock, port in zip(self.socks, self.puertos):
+                sock.setsockopt(sk.SOL_SOCKET, sk.SO_REUSEADDR, 1)
+                if self.rcvbuf:
+                    sock.setsockopt(sk.SOL_SOCKET, sk.SO_RCVBUF, int(self.rcvbuf))
+                sock.bind(('',port))         #sock.bind(('',SHARED_UDP_PORT))sock.bind((UDP_IP, UDP_PORT))
+                print(f"Servidor UDP escuchando en el puerto {port}")
+        except sk.error as e:
+            print(f"Error al intentar vincular el socket: {e}")
+            sys.exit(1)
 
     def recibirDatos(self):
         """
@@ -88,13 +549,7 @@ class Recibir:
         -------
         None.
         """
-        try:
-            self.sock.setsockopt(sk.SOL_SOCKET, sk.SO_REUSEADDR, 1)
-            self.sock.bind(('',self.port))         #sock.bind(('',SHARED_UDP_PORT))sock.bind((UDP_IP, UDP_PORT))
-            print(f"Servidor UDP escuchando en el puerto {self.port}")
-        except sk.error as e:
-            print(f"Error al intentar vincular el socket: {e}")
-            sys.exit(1)
+        self._vincularSocket()
             
         self.is_recieving = True        # Cambia la variable booleana para indicar que si se estan recibiendo datos
         while self.is_recieving:        # Mientras se sigan recibiendo datos
@@ -102,18 +557,112 @@ class Recibir:
             try:
                 data, addr = self.sock.recvfrom(1024)   # Recibe datos desde el objeto sock
                 try:
-                    print(f"Mensaje recibido de {addr}: {data.decode()}")
-                    data_point = data.decode().strip()     # Decodifica los datos recibidos
-                    Xdata=self.ver.verificarRecepcion(data_point) # Manda los datos a verificar y guardar
+                    log.debug("Mensaje recibido de %s: %r", addr, data)
+                    Xdata=self.ver.verificarDatagrama(data) # Manda los datos a verificar y guardar
                     self.data_queue_0.put(Xdata)         # Se pasa el mensaje a la cola
                 except ValueError as ve:
-                    print(f"Error al convertir datos a float: {ve}")
+                    log.warning("Error al convertir datos a float: %s", ve)
             except Exception as e:
-                        print(f"Error recibiendo datos: {e}")
+                log.error("Error recibiendo datos: %s", e)
+
+    def recibirLotes(self, timeout=0.2):
+        """
+        Recibe datos por UDP drenando el socket por lotes.
+
+        En cada despertar del selector se leen todos los datagramas pendientes
+        en el socket (sin bloquear), se verifican juntos y se pasa un único
+        objeto `LoteDatos` a la cola. Esto reduce el costo por paquete y el
+        número de operaciones sobre la cola cuando el emisor envía en ráfagas.
+        Todos los puertos de `puertos` se atienden con el mismo selector.
+
+        Parameters
+        ----------
+        timeout : float, opcional
+            Tiempo máximo de espera del selector en segundos, permite revisar
+            periódicamente la bandera de paro. Por defecto 0.2.
+
+        Returns
+        -------
+        None.
+        """
+        self._vincularSocket()
+        selector = selectors.DefaultSelector()
+        for sock, port in zip(self.socks, self.puertos):
+            sock.setblocking(False)
+            selector.register(sock, selectors.EVENT_READ, port)
+
+        self.is_recieving = True
+        try:
+            while self.is_recieving:
+                try:
+                    listos = selector.select(timeout)
+                except (OSError, ValueError):
+                    break           # El socket se cerro desde otro hilo
+                if not listos:
+                    self._entregar(None)        # Libera las muestras que vencieron su espera
+                    continue
+                for clave, _ in listos:
+                    crudos, origenes = self._drenarSocket(clave.fileobj)
+                    if crudos:
+                        self._entregar(LoteDatos(self.ver.verificarLote(crudos), origenes, tm.time(), clave.data))
+        finally:
+            try:
+                selector.close()
+            except Exception:
+                pass
+            for lote in _vaciarRetenidos(self.reordenador, self.demultiplexor):
+                self._entregar(lote, reordenar=False)
+
+    def _entregar(self, lote, reordenar=True):
+        """
+        Pasa un lote por el demultiplexor o el reordenador (si los hay) y lo
+        pone en la cola de registro.
+
+        Parameters
+        ----------
+        lote : LoteDatos or None
+            Lote verificado; None sólo libera las muestras retenidas que vencieron.
+        reordenar : bool, opcional
+            Si es False el lote se encola tal cual. Por defecto True.
+        """
+        lotes = _secuenciar(lote, self.reordenador, self.demultiplexor) if reordenar else [lote]
+        for lote in lotes:
+            if lote is not None and len(lote):
+                self.data_queue_0.put(lote)
+                _encolados.incrementar()
+
+    def _drenarSocket(self, sock=None):
+        """
+        Lee sin bloquear todos los datagramas pendientes en un socket.
+
+        Parameters
+        ----------
+        sock : socket.socket, opcional
+            Socket a drenar. Por defecto `sock` (el del primer puerto).
+
+        Returns
+        -------
+        tuple of list
+            Datagramas crudos (bytes) y direcciones de origen.
+        """
+        crudos, origenes = [], []
+        recvfrom = (sock or self.sock).recvfrom
+        for _ in range(self.max_lote):
+            try:
+                data, addr = recvfrom(1024)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as e:
+                if self.is_recieving:
+                    log.error("Error recibiendo datos: %s", e)
+                break
+            crudos.append(data)
+            origenes.append(addr)
+        return crudos, origenes
 
     def detenerRecepcion(self):
         """
-        Detiene la recepción de datos y cierra el socket.
+        Detiene la recepción de datos y cierra los sockets.
 
         Returns
         -------
@@ -121,13 +670,215 @@ class Recibir:
         """
         self.is_recieving = False   # Detiene el bucle de recepción
         
-        if hasattr(self, 'sock') and self.sock:
+        for sock in getattr(self, 'socks', ()):
             try:
-                self.sock.close()
+                sock.close()
                 print("Socket cerrado correctamente.")
             except Exception as e:
                 print(f"Error al cerrar el socket: {e}")
 
+class _ProtocoloDatagramas:
+    """
+    Protocolo asyncio de un punto de escucha UDP del `MotorAsincrono`.
+
+    No hereda de `asyncio.DatagramProtocol` para no importar asyncio al cargar
+    el módulo; implementa los mismos métodos.
+
+    Acumula los datagramas que llegan en una misma vuelta del ciclo de eventos
+    y los despacha juntos como un solo lote.
+    """
+    def __init__(self, motor, port):
+        self.motor, self.port = motor, port
+        self.transport = None
+        self._pendientes, self._origenes = [], []
+        self._programado = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+        print(f"Servidor UDP (asyncio) escuchando en el puerto {self.port}")
+
+    def datagram_received(self, data, addr):
+        self._pendientes.append(data)
+        self._origenes.append(addr)
+        if not self._programado:
+            self._programado = True
+            self.motor._loop.call_soon(self._despachar)
+
+    def _despachar(self):
+        self._programado = False
+        crudos, origenes = self._pendientes, self._origenes
+        self._pendientes, self._origenes = [], []
+        if crudos:
+            self.motor._publicar(crudos, origenes, self.port)
+
+    def error_received(self, exc):
+        log.error("Error recibiendo datos: %s", exc)
+
+    def connection_lost(self, exc):
+        self.transport = None
+
+
+class MotorAsincrono:
+    """
+    Motor de recepción UDP basado en asyncio (`loop.create_datagram_endpoint`).
+
+    Un mismo ciclo de eventos atiende uno o varios puertos. Cada lote verificado
+    se entrega como `LoteDatos` a las colas asyncio suscritas y, si se indica, a
+    la cola de hilos `data_queue_0` que consume `Registro`. Ofrece la misma
+    interfaz que `Recibir` (`recibirLotes`/`detenerRecepcion`) para poder
+    ejecutarse en un hilo desde la interfaz gráfica.
+
+    Atributos:
+    ----------
+    data_queue : queue.Queue
+        Cola para pasar los datos a la interfaz gráfica (se conserva por compatibilidad).
+    data_queue_0 : queue.Queue or None
+        Cola de hilos hacia `Registro`.
+    puertos : tuple of int
+        Puertos UDP a escuchar.
+    ver : Verificador
+        Verificador compartido por todos los puntos de escucha.
+    max_cola : int
+        Tamaño máximo de cada cola asyncio suscrita; si se llena se descarta el lote más antiguo.
+    reordenador : ReordenadorSecuencias or None
+        Entrega las muestras en orden de secuencia y cuenta pérdidas (None: sin reordenar).
+    demultiplexor : Demultiplexor or None
+        Separa las muestras por dispositivo de origen (con un reordenador por dispositivo).
+    """
+    def __init__(self, reference=None, data_queue=None, data_queue_0=None, puertos=(8889,), max_cola=1024, canales=('Temperatura',),
+                 reordenar=True, demultiplexor=None):
+        """
+        Inicializa el motor sin abrir sockets.
+
+        Parameters
+        ----------
+        reference : object, opcional
+            Referencia al objeto principal de la interfaz gráfica.
+        data_queue : queue.Queue, opcional
+            Cola para pasar los datos a la interfaz gráfica.
+        data_queue_0 : queue.Queue, opcional
+            Cola de hilos hacia `Registro`.
+        puertos : iterable of int, opcional
+            Puertos UDP a escuchar. Por defecto (8889,).
+        max_cola : int, opcional
+            Tamaño máximo de cada cola asyncio suscrita. Por defecto 1024.
+        canales : tuple of str, opcional
+            Nombres de los canales por muestra. Por defecto ('Temperatura',).
+        reordenar : bool, opcional
+            Reordenar por número de secuencia y detectar pérdidas. Por defecto True.
+        demultiplexor : Demultiplexor, opcional
+            Separar las muestras por dispositivo; reemplaza al reordenador único. Por defecto None.
+        """
+        self.reference = reference
+        self.data_queue, self.data_queue_0 = data_queue, data_queue_0
+        self.puertos = tuple(puertos)
+        self.max_cola = max_cola
+        self.ver = Verificador(canales=canales)
+        self.demultiplexor = demultiplexor
+        self.reordenador = ReordenadorSecuencias() if reordenar and demultiplexor is None else None
+        self.is_recieving = False
+        self._suscriptores = []
+        self._transportes = []
+        self._loop = None
+        self._paro = None
+
+    def suscribir(self):
+        """
+        Crea una cola asyncio que recibirá cada `LoteDatos` publicado.
+
+        Returns
+        -------
+        asyncio.Queue
+        """
+        import asyncio
+        cola = asyncio.Queue(self.max_cola)
+        self._suscriptores.append(cola)
+        return cola
+
+    def _publicar(self, crudos, origenes, puerto=None):
+        lote = LoteDatos(self.ver.verificarLote(crudos), origenes, tm.time(), puerto)
+        for lote in _secuenciar(lote, self.reordenador, self.demultiplexor):
+            self._entregar(lote)
+
+    def _entregar(self, lote):
+        if self.data_queue_0 is not None:
+            self.data_queue_0.put(lote)
+            _encolados.incrementar()
+        for cola in self._suscriptores:
+            if cola.full():
+                cola.get_nowait()       # Descarta el lote mas antiguo si el consumidor se retrasa
+            cola.put_nowait(lote)
+
+    async def iniciar(self):
+        """
+        Abre un punto de escucha UDP por cada puerto en el ciclo de eventos actual.
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        self._paro = asyncio.Event()
+        for port in self.puertos:
+            transporte, _ = await loop.create_datagram_endpoint(
+                lambda port=port: _ProtocoloDatagramas(self, port),
+                local_addr=('0.0.0.0', port))
+            self._transportes.append(transporte)
+        self.is_recieving = True
+
+    async def ejecutar(self):
+        """
+        Abre los puntos de escucha y espera hasta que se solicite el paro.
+        """
+        await self.iniciar()
+        try:
+            await self._paro.wait()
+        finally:
+            self.cerrar()
+
+    def cerrar(self):
+        """
+        Cierra todos los puntos de escucha.
+        """
+        self.is_recieving = False
+        for transporte in self._transportes:
+            transporte.close()
+        self._transportes = []
+        for lote in _vaciarRetenidos(self.reordenador, self.demultiplexor):
+            self._entregar(lote)
+
+    def recibirLotes(self):
+        """
+        Ejecuta el motor en un ciclo de eventos propio, bloqueando el hilo actual
+        hasta que se llame a `detenerRecepcion`.
+
+        Returns
+        -------
+        None.
+        """
+        import asyncio      # Solo al usar el motor asincrono
+        try:
+            asyncio.run(self.ejecutar())
+        except OSError as e:
+            print(f"Error al intentar vincular el socket: {e}")
+
+    recibirDatos = recibirLotes
+
+    def detenerRecepcion(self):
+        """
+        Solicita el paro del motor desde cualquier hilo y cierra los sockets.
+
+        Returns
+        -------
+        None.
+        """
+        self.is_recieving = False
+        loop, paro = self._loop, self._paro
+        if loop is not None and paro is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(paro.set)
+                print("Socket cerrado correctamente.")
+            except RuntimeError:
+                pass        # El ciclo de eventos ya termino
+
 class Verificador:
     """
     Clase encargada de verificar la recepción de los datos y asegurarse de que sean válidos.
@@ -142,17 +893,36 @@ class Verificador:
         Primer carácter que debe aparecer al inicio del dato.
     verificador_1 : str
         Primer carácter que debe aparecer al final del dato.
+    formatos : tuple of str
+        Formatos de trama aceptados ("texto" y/o "binario").
+    canales : tuple of str
+        Nombres de los canales (termopares) que trae cada muestra.
+    n_lotes, n_datos, n_invalidos : int
+        Lotes, datos y datos inválidos procesados por `verificarLote`.
+    t_analisis : float
+        Tiempo acumulado (s) de decodificación de lotes.
+    t_ultimo_lote : float
+        Tiempo (s) que tomó decodificar el último lote.
     """
-    def __init__(self, len_temp=5):
+    def __init__(self, len_temp=5, formatos=pr.FORMATOS, canales=('Temperatura',)):
         """
         Inicializa el objeto Verificador.
 
         Parameters
         ----------
         len_temp : int, opcional
-            Longitud esperada para los datos. El valor por defecto es 5.
+            Longitud esperada para cada dato de texto. El valor por defecto es 5.
+        formatos : tuple of str, opcional
+            Formatos de trama aceptados. Por defecto ("texto", "binario").
+        canales : tuple of str, opcional
+            Nombres de los canales por muestra. Por defecto ('Temperatura',).
         """
         self.len_temp= len_temp
+        self.formatos = tuple(formatos)
+        self.canales = tuple(canales)
+        self.n_canales = len(self.canales)
+        self.n_lotes = self.n_datos = self.n_invalidos = 0
+        self.t_analisis = self.t_ultimo_lote = 0.0
         self.Tdata = "0"
         self.verificador_0, self.verificador_1= "x", "y"
         self.data_queue_0 = qu.Queue()    #Cola para transferencia de datos entre clases
@@ -175,24 +945,351 @@ class Verificador:
         
         # Se verifica mensaje completo con la letra x, al inicio y al final
         if data_point[0]==self.verificador_0 and data_point[-1]==self.verificador_1 and len(temp_data)==self.len_temp:
-            print("Mensaje completo\n")
-            print(temp_data)
+            log.debug("Mensaje completo: %s", temp_data)
             self.Tdata=temp_data
         else:
-            print("Warning: Mensaje incompleto")
-            print(temp_data)
+            log.warning("Mensaje incompleto: %s", temp_data)
             # Reiniciar el DataFrame a ceros con el mismo número de columnas y los índices correspondientes
             self.Tdata="0"
-              
-        
-        print(f"\n {self.Tdata} \n")
+
         
         return self.Tdata
 
+    def verificarDatagrama(self, data):
+        """
+        Verifica un datagrama crudo en cualquiera de los formatos aceptados y
+        lo convierte a número.
+
+        Parameters
+        ----------
+        data : bytes
+            Datagrama recibido.
+
+        Returns
+        -------
+        float or numpy.ndarray
+            El valor verificado (un arreglo con un valor por canal si hay varios
+            canales), o NaN si el dato es inválido.
+        """
+        lote = pr.decodificarLote([data], self.len_temp, self.formatos, self.verificador_0,
+                                  self.verificador_1, self.n_canales)
+        if lote.mascara[0]:
+            self.Tdata = ",".join(str(v) for v in lote.valores[0])
+            log.debug("Mensaje completo: %s", self.Tdata)
+        else:
+            self.Tdata = "0"
+            log.warning("Mensaje incompleto: %r", data)
+        return float(lote.valores[0, 0]) if self.n_canales == 1 else lote.valores[0]
+
+    def verificarLote(self, datos):
+        """
+        Valida y convierte un lote de datagramas en un solo paso vectorizado.
+
+        No imprime por cada mensaje: reporta un único resumen cuando hay datos
+        inválidos, que quedan como NaN (nunca como ceros). El tiempo de
+        decodificación se mide por lote.
+
+        Parameters
+        ----------
+        datos : list of bytes
+            Datagramas recibidos en el lote.
+
+        Returns
+        -------
+        protocoloUDP.LoteDecodificado
+            Valores (float64, una columna por canal), máscara de validez,
+            secuencias y marcas de tiempo.
+        """
+        t0 = tm.perf_counter()
+        lote = pr.decodificarLote(datos, self.len_temp, self.formatos, self.verificador_0,
+                                  self.verificador_1, self.n_canales)
+        self.t_ultimo_lote = tm.perf_counter() - t0
+        self.t_analisis += self.t_ultimo_lote
+
+        invalidos = len(datos) - int(np.count_nonzero(lote.mascara))
+        self.n_lotes += 1
+        self.n_datos += len(datos)
+        self.n_invalidos += invalidos
+        _recibidos.incrementar(len(datos))
+        _invalidos.incrementar(invalidos)
+        _tam_lote.observar(len(datos))
+        _t_verificacion.observar(self.t_ultimo_lote)
+        if invalidos:
+            log.warning("%d de %d mensajes incompletos en el lote", invalidos, len(datos))
+        return lote
+
 # ----------------------------------------------------------------------------
+class BufferMuestras:
+    """
+    Buffer columnar preasignado de muestras numéricas respaldado por NumPy.
+
+    Las muestras se guardan como flotantes tipados en bloques (chunks) de tamaño
+    fijo, con una fila contigua por canal (forma (canales, capacidad)). Agregar
+    una muestra cuesta O(1) sin importar el tamaño de la ventana, y las vistas
+    que se entregan a la interfaz gráfica o al escritor del registro no copian datos.
+    Sólo se construye un DataFrame cuando se pide explícitamente.
+
+    Atributos:
+    ----------
+    capacidad : int
+        Número máximo de muestras por bloque.
+    canales : tuple of str
+        Nombres de los canales (una fila del bloque por canal).
+    dtype : numpy.dtype
+        Tipo de dato de las muestras almacenadas.
+    n : int
+        Número de muestras ocupadas en el bloque actual.
+    """
+    def __init__(self, capacidad=3600, canales=('Temperatura',), dtype=np.float64):
+        """
+        Inicializa el buffer con un bloque vacío.
+
+        Parameters
+        ----------
+        capacidad : int, opcional
+            Número de muestras por bloque. Por defecto 3600.
+        canales : tuple of str, opcional
+            Nombres de los canales. Por defecto ('Temperatura',).
+        dtype : numpy.dtype, opcional
+            Tipo de dato de las muestras. Por defecto np.float64.
+        """
+        self.capacidad = int(capacidad)
+        self.canales = tuple(canales)
+        self.dtype = np.dtype(dtype)
+        self.n = 0
+        self._datos = self._nuevoBloque()
+
+    def _nuevoBloque(self):
+        return np.empty((len(self.canales), self.capacidad), dtype=self.dtype)
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def lleno(self):
+        """bool: Indica si el bloque actual alcanzó su capacidad."""
+        return self.n >= self.capacidad
+
+    def agregar(self, valor):
+        """
+        Agrega una muestra al final del bloque actual.
+
+        Parameters
+        ----------
+        valor : float or array_like
+            Muestra a guardar (un valor por canal).
+
+        Returns
+        -------
+        bool
+            True si el bloque quedó lleno tras agregar la muestra.
+        """
+        if self.n >= self.capacidad:
+            raise OverflowError("BufferMuestras lleno: llamar extraer() antes de agregar")
+        self._datos[:, self.n] = valor
+        self.n += 1
+        return self.n >= self.capacidad
+
+    def extender(self, valores):
+        """
+        Copia un arreglo de muestras al bloque actual, hasta llenarlo.
+
+        Parameters
+        ----------
+        valores : numpy.ndarray
+            Muestras a guardar, de forma (n, canales) o (n,) con un solo canal.
+
+        Returns
+        -------
+        int
+            Número de muestras copiadas; si es menor que len(valores) el bloque
+            quedó lleno y el resto debe agregarse tras `extraer()`.
+        """
+        k = min(len(valores), self.capacidad - self.n)
+        bloque = np.asarray(valores[:k])
+        self._datos[:, self.n:self.n + k] = bloque.T if bloque.ndim == 2 else bloque
+        self.n += k
+        return k
+
+    def vista(self):
+        """
+        Devuelve una vista (sin copia) de las muestras ocupadas del bloque actual.
+
+        Returns
+        -------
+        numpy.ndarray
+            Vista de sólo lectura de forma (canales, n).
+        """
+        vista = self._datos[:, :self.n]
+        vista.flags.writeable = False
+        return vista
+
+    def columna(self, canal):
+        """
+        Devuelve la vista contigua (sin copia) de un canal del bloque actual.
+
+        Parameters
+        ----------
+        canal : str
+            Nombre del canal.
+
+        Returns
+        -------
+        numpy.ndarray
+        """
+        return self.vista()[self.canales.index(canal)]
+
+    def extraer(self):
+        """
+        Entrega el bloque actual y comienza uno nuevo.
+
+        El arreglo entregado no vuelve a escribirse, por lo que los consumidores
+        (gráfica, escritor del registro) pueden conservarlo sin copiarlo.
+
+        Returns
+        -------
+        numpy.ndarray
+            Vista de forma (canales, n) sobre las muestras del bloque entregado.
+        """
+        bloque = self.vista()
+        self._datos = self._nuevoBloque()
+        self.n = 0
+        return bloque
+
+    def a_dict(self, bloque=None):
+        """
+        Asocia cada canal con su fila de muestras, sin copiar.
+
+        Parameters
+        ----------
+        bloque : numpy.ndarray, opcional
+            Bloque entregado por `extraer`. Por defecto el bloque actual.
+
+        Returns
+        -------
+        dict
+            {canal: numpy.ndarray}
+        """
+        bloque = self.vista() if bloque is None else bloque
+        return dict(zip(self.canales, bloque))
+
+    def a_dataframe(self, bloque=None):
+        """
+        Materializa las muestras en un DataFrame con una columna por canal.
+
+        Parameters
+        ----------
+        bloque : numpy.ndarray, opcional
+            Bloque entregado por `extraer`. Por defecto el bloque actual.
+
+        Returns
+        -------
+        pd.DataFrame
+        """
+        import pandas as pd
+        return pd.DataFrame(self.a_dict(bloque))
+
+
+class SerieViva:
+    """
+    Serie columnar creciente para la gráfica en vivo.
+
+    Un solo hilo escribe (Registro) y otro lee (la interfaz gráfica) sin candado:
+    las muestras se copian antes de publicar el nuevo tamaño `n`, y al crecer se
+    reemplaza el arreglo completo, así que una vista tomada con `vista()` nunca
+    ve muestras a medio escribir.
+
+    Atributos:
+    ----------
+    canales : tuple of str
+        Nombres de las columnas (una fila del arreglo por columna).
+    n : int
+        Número de muestras publicadas.
+    generacion : int
+        Número de reinicios; cambia al empezar un registro nuevo.
+    """
+    def __init__(self, canales=('Temperatura',), capacidad=4096, dtype=np.float64):
+        """
+        Parameters
+        ----------
+        canales : tuple of str, opcional
+            Nombres de las columnas. Por defecto ('Temperatura',).
+        capacidad : int, opcional
+            Capacidad inicial; se duplica al llenarse. Por defecto 4096.
+        dtype : numpy.dtype, opcional
+            Tipo de dato de las muestras. Por defecto np.float64.
+        """
+        self.canales = tuple(canales)
+        self.dtype = np.dtype(dtype)
+        self._capacidad0 = int(capacidad)
+        self.generacion = -1
+        self.reiniciar()
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def t0(self):
+        """float: Primer valor de la primera columna (la marca de tiempo), NaN si no hay."""
+        datos = self._datos
+        return float(datos[0, 0]) if self.n else float("nan")
+
+    def reiniciar(self):
+        """Descarta la serie y comienza una vacía."""
+        self._datos = np.empty((len(self.canales), self._capacidad0), dtype=self.dtype)
+        self.n = 0
+        self.generacion += 1
+
+    def extender(self, valores):
+        """
+        Agrega muestras al final de la serie.
+
+        Parameters
+        ----------
+        valores : numpy.ndarray
+            Muestras de forma (n, columnas).
+        """
+        n, k = self.n, len(valores)
+        if n + k > self._datos.shape[1]:
+            nuevo = np.empty((len(self.canales), max(2 * self._datos.shape[1], n + k)), dtype=self.dtype)
+            nuevo[:, :n] = self._datos[:, :n]
+            self._datos = nuevo
+        self._datos[:, n:n + k] = np.asarray(valores).T
+        self.n = n + k          # Publicar sólo después de copiar
+
+    def vista(self):
+        """
+        Vista (sin copia) de las muestras publicadas.
+
+        Returns
+        -------
+        numpy.ndarray
+            Arreglo de forma (columnas, n).
+        """
+        n = self.n
+        return self._datos[:, :n]
+
+
+def _publicarMedidores(data_queue, data_queue_0, registros):
+    """
+    Publica en `mt.METRICAS` las colas del registro y lo pendiente de guardar,
+    sumado sobre `registros()` (uno o los de todos los dispositivos).
+    """
+    mt.METRICAS.medidor("cola_registro", "Lotes esperando en la cola de registro", data_queue_0.qsize)
+    mt.METRICAS.medidor("cola_interfaz", "Bloques esperando en la cola de la interfaz", data_queue.qsize)
+    mt.METRICAS.medidor("bitacora_pendientes", "Muestras de la bitacora aun no guardadas en el registro",
+                        lambda: sum(r.bitacoraPendientes() for r in registros()))
+    mt.METRICAS.medidor("escritor_pendientes", "Bloques entregados al hilo de escritura sin escribir aun",
+                        lambda: sum(r.escritorPendientes() for r in registros()))
+
 class Registro:
     """
-    Clase para el registro y almacenamiento de los datos recibidos en un archivo CSV.
+    Clase para el registro y almacenamiento de los datos recibidos.
+
+    Los bloques se guardan con el formato elegido (ver almacenamiento): un
+    directorio de bloques .npy (por defecto), un archivo Parquet, CSV o
+    comprimido (zlib/lzma). Cada bloque lleva una columna 't' con la marca de
+    tiempo de cada muestra (time.time) y una columna por canal.
 
     Atributos:
     ----------
@@ -205,15 +1302,52 @@ class Registro:
     isWriting : bool
         Bandera para determinar si se está escribiendo datos.
     ruta_csv : str
-        Ruta del archivo CSV donde se almacenarán los datos.
+        Ruta del archivo CSV donde se almacenarán los datos (formato "csv").
+    ruta_registro : str or None
+        Ruta (archivo o directorio) del registro. Si es None se usa `ruta_csv`
+        para el formato "csv" y `ruta_csv` con la extensión del formato para los
+        demás (".npy", ".parquet", ".zlib" o ".lzma").
+    formato : str
+        Formato de registro (uno de `alm.FORMATOS_REGISTRO`).
+    escritor : EscritorFondo or EscritorBloques or None
+        Escritor abierto del registro en curso (en un hilo de E/S si `buffers` > 0).
+    politica : PoliticaVaciado
+        Cuándo se entrega el bloque en curso al escritor (muestras, segundos o bytes).
+    buffers : int
+        Bloques entregados al hilo de E/S sin terminar de escribir, como máximo;
+        0 escribe en el mismo hilo que registra.
+    usar_bitacora : bool
+        Si es True cada muestra se escribe también en una bitácora mapeada en
+        memoria (`rutaRegistro() + ".bitacora"`) para recuperarla tras un cierre inesperado.
+        Con un escritor no duradero (Parquet) las muestras siguen en la bitácora
+        hasta que el registro se cierra bien.
+    intervalo_sync : float or None
+        Segundos entre sincronizaciones a disco de la bitácora.
+    bitacora : BitacoraMmap or None
+        Bitácora abierta del registro en curso.
     flag_inter : bool
         Bandera de interrupción del proceso de registro.
     contador : int
         Contador para los datos procesados.
-    data_register : pd.DataFrame
-        DataFrame donde se almacenan los datos temporales.
+    data_register : BufferMuestras
+        Buffer columnar preasignado donde se almacenan los datos temporales.
+    serie : SerieViva or None
+        Todas las muestras del registro en curso, para la gráfica en vivo (None sin gráfica).
+    estadisticas : EstadisticasCanales
+        Estadísticas en vivo (acumuladas, EWMA y por ventanas) de cada canal.
+    calorimetro : Calorimetro
+        Cálculo calorimétrico en vivo sobre el primer canal (la temperatura de la muestra).
+        Ambos se actualizan cada `PERIODO_ANALISIS` s con las muestras acumuladas,
+        no por lote, para no cargar el hilo de recepción.
+    canales : tuple of str
+        Nombres de los canales de cada muestra (una columna del registro por canal).
     """
-    def __init__(self, isWriting, data_queue, data_queue_0, men_queue):
+    TOLERANCIA_RELOJ = 1.0         # s: desfase admitido entre las marcas del dispositivo y la recepcion
+    PERIODO_ANALISIS = 0.25        # s entre actualizaciones de las estadisticas y la calorimetria
+
+    def __init__(self, isWriting, data_queue, data_queue_0, men_queue, canales=('Temperatura',), formato="npy",
+                 bitacora=True, intervalo_sync=1.0, ventanas=(60, 600), serie_viva=True, politica=None, buffers=2,
+                 medidores=True):
         """
         Inicializa la clase de registro de datos.
 
@@ -227,6 +1361,27 @@ class Registro:
             Cola para pasar los datos entre clases.
         men_queue : queue.Queue
             Cola para manejar los mensajes.
+        canales : tuple of str, opcional
+            Nombres de los canales. Por defecto ('Temperatura',).
+        formato : str, opcional
+            Formato de registro (uno de `alm.FORMATOS_REGISTRO`). Por defecto "npy".
+        bitacora : bool, opcional
+            Escribir cada muestra en la bitácora de recuperación. Por defecto True.
+        intervalo_sync : float or None, opcional
+            Segundos entre sincronizaciones de la bitácora. Por defecto 1.0.
+        ventanas : tuple of int, opcional
+            Tamaños (en muestras) de las ventanas de estadísticas. Por defecto (60, 600).
+        serie_viva : bool, opcional
+            Conservar en memoria todas las muestras para la gráfica en vivo. Por defecto True;
+            sin interfaz gráfica conviene False para que la memoria no crezca con el registro.
+        politica : PoliticaVaciado, opcional
+            Cuándo entregar cada bloque al escritor. Por defecto cada 3600 muestras.
+        buffers : int, opcional
+            Bloques en vuelo hacia el hilo de E/S (1: doble buffer, 2: triple).
+            0 escribe en el hilo del registro. Por defecto 2.
+        medidores : bool, opcional
+            Publicar las colas y pendientes de este registro en `mt.METRICAS`. Por defecto
+            True; `BancoRegistros` publica en cambio la suma de sus registros.
         """
         # Variables Globales
         self.data_queue= data_queue
@@ -234,67 +1389,447 @@ class Registro:
         self.men_queue = men_queue
         self.isWriting = isWriting
         self.ruta_csv = r"C:\..."           # Ruta absoluta a donde se desea guardar. Personalizar
+        self.ruta_registro = None
+        if formato not in alm.FORMATOS_REGISTRO:
+            raise ValueError(f"Formato de registro desconocido: {formato}")
+        self.formato = formato
+        self.escritor = None
+        self.politica = politica or alm.PoliticaVaciado()
+        self.buffers = buffers
+        self._t_aviso = 0.0             # Ultimo aviso de contrapresion del escritor
+        self.usar_bitacora, self.intervalo_sync = bitacora, intervalo_sync
+        self.bitacora = None
+        self._candado = th.Lock()       # Evita cerrar la bitacora mientras se escribe en ella
         self.flag_inter = False
         self.contador=0                 #
-        self.data_register= pd.DataFrame()
-        self.ver=Verificador()
-        self.buffer = pd.DataFrame()
+        self.canales = tuple(canales)
+        self.data_register= BufferMuestras(self.politica.capacidad(len(self.canales) + 1), ('t',) + self.canales)     # Columna de tiempo + canales
+        self.serie = SerieViva(('t',) + self.canales) if serie_viva else None
+        self.estadisticas = est.EstadisticasCanales(self.canales, ventanas)
+        self.calorimetro = cal.Calorimetro()
+        self._analisis = []             # Muestras (n, 1 + canales) aun no analizadas, ver _analizar
+        self._t_analisis = 0.0
+        if medidores:
+            _publicarMedidores(data_queue, data_queue_0, lambda: [self])
+        self.ver=Verificador(canales=self.canales)
         
     # Evento: registrar datos de vuelo en una hoja de calculo
     def registrarDatos(self): 
         """
-        Método para registrar los datos en un archivo CSV.
+        Método para registrar los datos en el registro con el formato elegido (`formato`).
 
-        Este método recibe los datos de la cola, los procesa y los almacena en un archivo CSV
-        cada 3600 datos. También se encarga de actualizar la interfaz con mensajes de estado.
+        Este método recibe los datos de la cola, los procesa y entrega un bloque al
+        escritor según `politica` (por defecto cada 3600 datos), que lo agrega al
+        archivo o directorio de `rutaRegistro()`. También se encarga
+        de actualizar la interfaz con mensajes de estado.
 
         Returns
         -------
         None.
         """
-        self.contador=0                 #
-        self.men_queue.put("Datos incompletos")
+        self._iniciarRegistro()
         
         while self.isWriting:
             try:
-                data_point = self.data_queue_0.get()  # Timeout para evitar bloqueo indefinido
-                
-                # Decodificar y procesar el data_point
-                #data= self.ver.verificarRecepcion(self, data_point)
-                Ddata = pd.DataFrame([data_point])
-                     # Dividir la cadena en una lista
-#Ajustar numero de datos a recibir                
-                if self.contador<3600:
-                    self.data_register= pd.concat([self.data_register, Ddata], ignore_index=True)
-                    self.contador += 1  # Incrementar el contador
-                else:
-                    #Graficar cada 3600 datos. En este caso, se recibe un dato cada 0.5 seg.
-                    self.data_queue.put(self.data_register)
-                    self.men_queue.put("Datos completos")
-                    # Guardar informacion en .csv cada 3600 datos. *estimado cada 30 minutos de recepcion
-                    self.data_register.to_csv(self.ruta_csv, mode='a', index=False, header=not os.path.exists(self.ruta_csv))
-                    self.data_register=pd.DataFrame() #Reiniciar el Data Frame vacio
-                    self.contador=0     #Reiniciar contador
-                    
-            except self.data_queue_0.Empty:
-                continue
+                elemento = self.data_queue_0.get(timeout=0.5)  # Timeout para evitar bloqueo indefinido
+            except qu.Empty:
+                elemento = None             # Sin datos: revisar igual el vencimiento del bloque
+            with self._candado:
+                if not self.isWriting:
+                    break
+                if elemento is not None:
+                    self._procesar(elemento)
+                self._revisarBloque()
+
+    def _iniciarRegistro(self):
+        """
+        Reinicia la serie, las estadísticas y el cálculo calorimétrico y abre la bitácora.
+        """
+        self.contador=0                 #
+        if self.serie is not None:
+            self.serie.reiniciar()
+        self.estadisticas.reiniciar()
+        self.calorimetro.reiniciar()
+        self._analisis = []
+        self._t_analisis = tm.monotonic()
+        self._t_previo = self._td_previo = None     # Ultima marca asignada y del dispositivo (ver _tiemposLote)
+        self.men_queue.put("Datos incompletos")
+        if self.usar_bitacora:
+            self._abrirBitacora()
+
+    def bitacoraPendientes(self):
+        """int: Muestras de la bitácora aún no guardadas en el registro."""
+        bitacora = self.bitacora
+        return bitacora.n - bitacora.persistidas if bitacora is not None else 0
+
+    def escritorPendientes(self):
+        """int: Bloques entregados al hilo de escritura sin escribir aún."""
+        return getattr(self.escritor, "pendientes", 0)
+
+    def _revisarBloque(self):
+        """
+        Entrega el bloque en curso si venció su tiempo, pasa a la bitácora lo
+        que el hilo de E/S ya escribió y actualiza el análisis si toca.
+        """
+        self._analizar()
+        if len(self.data_register) and self.politica.vencido(self.data_register.vista()[0, 0], tm.time()):
+            self._entregarBloque()
+        if self.bitacora is not None and isinstance(self.escritor, alm.EscritorFondo):
+            persistidas = self.escritor.tomarPersistidas()
+            if persistidas and self.escritor.duradero:      # Si no, la bitacora se borra solo al cerrar bien
+                self.bitacora.marcarPersistidas(persistidas)
+
+    def _analizar(self, forzar=False):
+        """
+        Pasa a las estadísticas y al cálculo calorimétrico las muestras
+        acumuladas, cada `PERIODO_ANALISIS` s (o ya, si `forzar`). Procesarlas
+        juntas da el mismo resultado que lote a lote con una fracción del costo fijo.
+        """
+        if not self._analisis or not (forzar or tm.monotonic() - self._t_analisis >= self.PERIODO_ANALISIS):
+            return
+        valores = np.concatenate(self._analisis) if len(self._analisis) > 1 else self._analisis[0]
+        self._analisis = []
+        self._t_analisis = tm.monotonic()
+        self.estadisticas.actualizar(valores[:, 1:])
+        self.calorimetro.actualizar(valores[:, 0], valores[:, 1])
+
+    def _procesar(self, elemento):
+        """
+        Registra un elemento de la cola: un `LoteDatos` o un dato suelto.
+        """
+        # Un LoteDatos trae un arreglo de datos; un dato suelto se procesa igual
+        if isinstance(elemento, LoteDatos):
+            self._registrarLote(elemento.valores, elemento.t_recepcion, elemento.t_dispositivo)
+            _latencia.observar(tm.time() - elemento.t_recepcion)
+        else:
+            self._registrarPunto(elemento, tm.time())
+
+    def _abrirBitacora(self):
+        """
+        Recupera la bitácora de una ejecución interrumpida (si existe) y abre una nueva.
+        """
+        ruta = self.rutaRegistro() + ".bitacora"
+        recuperadas = alm.recuperarBitacora(ruta, self.formato, self.rutaRegistro())
+        if recuperadas:
+            print(f"Se recuperaron {recuperadas} datos de una ejecucion interrumpida")
+        self.bitacora = alm.BitacoraMmap(ruta, self.data_register.canales, intervalo_sync=self.intervalo_sync)
+
+    def _registrarPunto(self, data_point, t):
+        """
+        Agrega un dato al buffer y lo entrega cuando se completa un bloque.
+
+        Parameters
+        ----------
+        data_point : float or numpy.ndarray
+            Dato verificado, uno por canal (NaN si es inválido).
+        t : float
+            Marca de tiempo de recepción.
+        """
+        fila = np.empty(len(self.canales) + 1)
+        fila[0] = t
+        # Decodificar y procesar el data_point
+        try:
+            fila[1:] = np.asarray(data_point, dtype=np.float64)
+        except (TypeError, ValueError):
+            fila[1:] = np.nan      # Dato no numerico: se guarda como NaN
+        if self.bitacora is not None:
+            self.bitacora.agregar(fila)
+        if self.serie is not None:
+            self.serie.extender(fila[None])
+        self._analisis.append(fila[None])
+        _registradas.incrementar()
+#Ajustar numero de datos a recibir (capacidad del buffer)
+        if self.data_register.agregar(fila):
+            self._entregarBloque()
+        self.contador = len(self.data_register)
+
+    def _tiemposLote(self, n, t, t_dispositivo=None):
+        """
+        Marca de tiempo (time.time) de cada muestra de un lote.
+
+        Con marcas del dispositivo (tramas binarias) se respetan sus intervalos:
+        cada muestra sigue a la anterior según su marca en ms (con la vuelta de
+        los 32 bits), y se vuelve a anclar en la recepción si la serie quedara
+        en el futuro o más de `TOLERANCIA_RELOJ` s atrás (reloj del dispositivo
+        reiniciado o con deriva). Sin marcas se reparten las muestras entre la
+        recepción del lote anterior y la de éste, que es cuando llegaron (a lo
+        sumo `TOLERANCIA_RELOJ` s por muestra, para no estirarlas sobre una pausa).
+
+        Parameters
+        ----------
+        n : int
+            Muestras del lote.
+        t : float
+            Marca de tiempo de recepción del lote.
+        t_dispositivo : numpy.ndarray, opcional
+            Marcas del dispositivo en ms (int64), -1 si la trama no la trae.
+
+        Returns
+        -------
+        numpy.ndarray
+            Tiempos (float64) de forma (n,), crecientes y el último no posterior a `t`.
+        """
+        if t_dispositivo is not None and n and (t_dispositivo >= 0).all():
+            td = t_dispositivo.astype(np.int64)
+            pasos = np.diff(td, prepend=td[0] if self._td_previo is None else self._td_previo) % 2**32
+            tiempos = np.cumsum(pasos) / 1000.0
+            if self._t_previo is not None:
+                tiempos += self._t_previo
+            if self._t_previo is None or not (t - self.TOLERANCIA_RELOJ <= tiempos[-1] <= t):
+                tiempos += t - tiempos[-1]          # Anclar la ultima muestra a la recepcion
+            self._td_previo = int(td[-1])
+        else:
+            inicio = t if self._t_previo is None else min(max(self._t_previo, t - self.TOLERANCIA_RELOJ * n), t)
+            tiempos = inicio + (t - inicio) * np.arange(1, n + 1) / n
+            self._td_previo = None
+        if n:
+            self._t_previo = float(tiempos[-1])
+        return tiempos
+
+    def _registrarLote(self, valores, t, t_dispositivo=None):
+        """
+        Agrega un arreglo de datos al buffer, entregando cada bloque que se complete.
+
+        Parameters
+        ----------
+        valores : numpy.ndarray
+            Datos verificados de forma (n, canales) (NaN donde son inválidos).
+        t : float
+            Marca de tiempo de recepción del lote.
+        t_dispositivo : numpy.ndarray, opcional
+            Marcas del dispositivo en ms; con ellas cada muestra lleva su propio tiempo
+            (ver `_tiemposLote`).
+        """
+        tiempos = self._tiemposLote(len(valores), t, t_dispositivo)
+        valores = np.column_stack((tiempos, valores.reshape(len(valores), -1)))
+        if self.bitacora is not None:
+            self.bitacora.extender(valores)
+        if self.serie is not None:
+            self.serie.extender(valores)
+        self._analisis.append(valores)
+        _registradas.incrementar(len(valores))
+        i = 0
+        while i < len(valores):
+            i += self.data_register.extender(valores[i:])
+            if self.data_register.lleno:
+                self._entregarBloque()
+        self.contador = len(self.data_register)
+
+    def _entregarBloque(self):
+        """
+        Entrega el bloque lleno a la interfaz gráfica y lo guarda en el registro.
+        """
+        #Graficar cada bloque (3600 datos por defecto). En este caso, se recibe un dato cada 0.5 seg.
+        bloque = self.data_register.extraer()     # Vista sin copia, el buffer inicia un bloque nuevo
+        self.data_queue.put(self.data_register.a_dict(bloque))     # {canal: arreglo contiguo}
+        self.men_queue.put("Datos completos")
+        # Guardar informacion cada bloque. *3600 datos: estimado cada 30 minutos de recepcion
+        self._guardarBloque(bloque)
+        self.contador=0     #Reiniciar contador
             
     def detenerRegistro(self):
         """
-        Detiene el proceso de registro de datos y guarda la información acumulada en un archivo CSV.
+        Detiene el proceso de registro de datos y guarda la información acumulada en el registro.
 
-        Este método interrumpe el proceso de escritura en el archivo CSV y guarda cualquier dato
-        pendiente en el DataFrame en el archivo correspondiente. Si el registro es interrumpido antes
-        de completar el ciclo de 3600 datos, se guarda la información registrada hasta ese momento.
+        Este método interrumpe el proceso de escritura y guarda cualquier dato
+        pendiente en el buffer en el archivo correspondiente. Si el registro es interrumpido antes
+        de completar el bloque en curso, se guarda la información registrada hasta ese momento.
 
         Returns
         -------
         None
         """
-        self.isWriting = False 
-        # Guardar informacion en .csv si se interrumpe el registro. *estimado cada 30 minutos de recepcion
-        if not self.data_register.empty:
-            self.data_register.to_csv(self.ruta_csv, mode='a', index=False, header=not os.path.exists(self.ruta_csv))
-        self.data_register=pd.DataFrame() #Reiniciar el Data Frame vacio
-        self.contador=0     #Reiniciar contador
-        
\ No newline at end of file
+        with self._candado:
+            self.isWriting = False 
+            # Guardar informacion si se interrumpe el registro. *estimado cada 30 minutos de recepcion
+            if len(self.data_register):
+                self._guardarBloque(self.data_register.extraer())
+            error = None
+            if self.escritor is not None:
+                self.escritor.cerrar()          # Espera a que el hilo de E/S termine lo encolado
+                error = getattr(self.escritor, "error", None)
+                self._revisarBloque()
+                self.escritor = None
+            if self.bitacora is not None:
+                if error is not None:
+                    log.error("Fallo la escritura del registro (%s); los datos quedan en la bitacora %s",
+                              error, self.bitacora.ruta)
+                self.bitacora.cerrar(borrar=error is None)      # Cierre limpio: todo quedo en el registro
+                self.bitacora = None
+            self._analizar(forzar=True)
+            for canal, e in self.estadisticas.resumen().items():
+                if e["n"]:
+                    log.info("%s: %d datos, media %.4g, desviacion %.3g, min %.4g, max %.4g",
+                             canal, e["n"], e["media"], e["desviacion"], e["minimo"], e["maximo"])
+            self.contador=0     #Reiniciar contador
+
+    def rutaRegistro(self):
+        """
+        Ruta del registro según el formato elegido.
+
+        Returns
+        -------
+        str
+        """
+        if self.ruta_registro:
+            return self.ruta_registro
+        if self.formato == "csv":
+            return self.ruta_csv
+        return os.path.splitext(self.ruta_csv)[0] + "." + self.formato
+
+    def _guardarBloque(self, bloque):
+        """
+        Agrega un bloque de muestras al registro, abriendo el escritor si hace falta.
+
+        Parameters
+        ----------
+        bloque : numpy.ndarray
+            Muestras a escribir, de forma (columnas, n).
+        """
+        if self.escritor is None:
+            self.escritor = alm.crearEscritor(self.formato, self.rutaRegistro(), self.data_register.canales)
+            if self.buffers:
+                self.escritor = alm.EscritorFondo(self.escritor, self.buffers, observar=_t_guardado.observar)
+        if isinstance(self.escritor, alm.EscritorFondo):
+            espera = self.escritor.escribir(bloque)      # La bitacora se marca al terminar la escritura
+            if espera:
+                _esperas_escritor.incrementar()
+                _t_espera_escritor.observar(espera)
+                if tm.monotonic() - self._t_aviso > 10:
+                    self._t_aviso = tm.monotonic()
+                    log.warning("El escritor no da abasto: el registro espero %.3f s por un lugar", espera)
+            return
+        t0 = tm.perf_counter()
+        self.escritor.escribir(bloque)
+        _t_guardado.observar(tm.perf_counter() - t0)
+        if self.bitacora is not None and self.escritor.duradero:
+            self.bitacora.marcarPersistidas(bloque.shape[-1])
+
+
+class BancoRegistros:
+    """
+    Un `Registro` por dispositivo, para los lotes separados por `Demultiplexor`.
+
+    Un solo hilo consume `data_queue_0` y pasa cada lote al registro de su
+    dispositivo, que se crea la primera vez que aparece. Cada dispositivo tiene
+    su propio archivo (`rutaDispositivo`), su serie para la gráfica, sus
+    estadísticas y su cálculo calorimétrico. Ofrece la interfaz de `Registro`
+    (`registrarDatos`, `detenerRegistro`, `isWriting`, `ruta_registro`).
+
+    Atributos:
+    ----------
+    registros : dict
+        {dispositivo: Registro}, en orden de aparición.
+    ruta_registro : str or None
+        Ruta base; cada dispositivo agrega su nombre antes de la extensión.
+        Si es None se usa "registro." + formato.
+    formato : str
+        Formato de registro de todos los dispositivos.
+    isWriting : bool
+        Bandera para determinar si se está escribiendo datos.
+    """
+    SIN_DISPOSITIVO = "dispositivo"     # Nombre de los datos sin dispositivo asignado
+
+    def __init__(self, isWriting, data_queue, data_queue_0, men_queue, canales=('Temperatura',), formato="npy",
+                 **opciones):
+        """
+        Parameters
+        ----------
+        isWriting : bool
+            Bandera para determinar si se deben escribir los datos.
+        data_queue, data_queue_0, men_queue : queue.Queue
+            Las mismas colas que recibe `Registro`; todos los registros las comparten.
+        canales : tuple of str, opcional
+            Nombres de los canales. Por defecto ('Temperatura',).
+        formato : str, opcional
+            Formato de registro (uno de `alm.FORMATOS_REGISTRO`). Por defecto "npy".
+        **opciones
+            Resto de opciones de `Registro` (bitacora, intervalo_sync, ventanas, serie_viva,
+            politica, buffers).
+        """
+        if formato not in alm.FORMATOS_REGISTRO:
+            raise ValueError(f"Formato de registro desconocido: {formato}")
+        self.isWriting = isWriting
+        self.data_queue, self.data_queue_0, self.men_queue = data_queue, data_queue_0, men_queue
+        self.canales, self.formato, self.opciones = tuple(canales), formato, opciones
+        self.ruta_registro = None
+        self.registros = {}
+        self._candado = th.Lock()
+        _publicarMedidores(data_queue, data_queue_0, lambda: list(self.registros.values()))
+
+    def rutaRegistro(self):
+        """
+        Ruta base del banco.
+
+        Returns
+        -------
+        str
+        """
+        return self.ruta_registro or "registro." + self.formato
+
+    def rutaDispositivo(self, dispositivo):
+        """
+        Ruta del registro de un dispositivo: la base con el nombre antes de la extensión.
+
+        Parameters
+        ----------
+        dispositivo : str
+            Nombre del dispositivo.
+
+        Returns
+        -------
+        str
+        """
+        raiz, extension = os.path.splitext(self.rutaRegistro())
+        nombre = re.sub(r"[^\w.-]", "_", dispositivo)      # Sin ':' ni separadores de ruta
+        return f"{raiz}_{nombre}{extension}"
+
+    def _registro(self, dispositivo):
+        """Registro del dispositivo, creándolo e iniciándolo la primera vez."""
+        registro = self.registros.get(dispositivo)
+        if registro is None:
+            registro = Registro(True, self.data_queue, self.data_queue_0, self.men_queue, canales=self.canales,
+                                formato=self.formato, medidores=False, **self.opciones)
+            registro.ruta_registro = self.rutaDispositivo(dispositivo)
+            registro._iniciarRegistro()
+            self.registros[dispositivo] = registro
+            log.info("Registro de %s en %s", dispositivo, registro.rutaRegistro())
+        return registro
+
+    def registrarDatos(self):
+        """
+        Consume `data_queue_0` y registra cada lote en el registro de su dispositivo.
+
+        Returns
+        -------
+        None.
+        """
+        for registro in self.registros.values():
+            registro.isWriting = True
+            registro._iniciarRegistro()
+        while self.isWriting:
+            try:
+                elemento = self.data_queue_0.get(timeout=0.5)  # Timeout para evitar bloqueo indefinido
+            except qu.Empty:
+                elemento = None
+            with self._candado:
+                if not self.isWriting:
+                    break
+                if elemento is not None:
+                    dispositivo = getattr(elemento, "dispositivo", None) or self.SIN_DISPOSITIVO
+                    self._registro(dispositivo)._procesar(elemento)
+                for registro in self.registros.values():
+                    registro._revisarBloque()
+
+    def detenerRegistro(self):
+        """
+        Detiene todos los registros y guarda lo pendiente de cada uno.
+
+        Returns
+        -------
+        None
+        """
+        with self._candado:
+            self.isWriting = False
+            for registro in self.registros.values():
+                registro.detenerRegistro()
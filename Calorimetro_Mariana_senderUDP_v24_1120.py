@@ -5,22 +5,119 @@ Created on Nov 26th 2024
 @author: Triton Perea
 """
 # Importar librerias a usar
-import random
 import socket as sk
-import pandas as pd
+import numpy as np
 import time
+import argparse
+import Calorimetro_Mariana_protocoloUDP_v24_1120 as pr   # formatos de trama (texto y binario)
+import Calorimetro_Mariana_almacenamiento_v24_1120 as alm    # lectura de registros para reproducirlos
+import Calorimetro_Mariana_consola_v24_1120 as cs    # consola de mensajes entre hilos
+
+log = cs.obtenerLogger("emisor")
 
 """ SENDER UDP
 ----------------------------------------------------------------------------"""
+class ProgramadorTasa:
+    """
+    Programador de envíos tipo "token bucket" sin deriva acumulada.
+
+    Los permisos (tokens) se calculan a partir del tiempo transcurrido desde el
+    inicio (time.monotonic), no sumando intervalos, por lo que el error de cada
+    `sleep` no se acumula. Se admite una ráfaga de hasta `rafaga` envíos por
+    despertar, lo que permite tasas de decenas de kHz con la resolución de
+    `time.sleep`.
+
+    Attributes
+    ----------
+    tasa : float
+        Envíos por segundo (de 0.1 Hz a decenas de kHz).
+    rafaga : int
+        Máximo de envíos acumulables por despertar.
+    consumidos : int
+        Permisos entregados desde `iniciar`.
+    """
+    def __init__(self, tasa, rafaga=None):
+        """
+        Parameters
+        ----------
+        tasa : float
+            Envíos por segundo.
+        rafaga : int, optional
+            Máximo de envíos por despertar. Default: ~10 ms de envíos (mínimo 1).
+        """
+        if tasa <= 0:
+            raise ValueError("La tasa de envio debe ser positiva")
+        self.tasa = float(tasa)
+        self.rafaga = max(1, int(rafaga if rafaga is not None else self.tasa * 0.01))
+        self.iniciar()
+
+    def iniciar(self):
+        """
+        Reinicia la referencia de tiempo y el contador de permisos.
+        """
+        self.t0 = time.monotonic()
+        self.consumidos = 0
+
+    def esperar(self, timeout=None):
+        """
+        Bloquea hasta que haya al menos un permiso y los consume.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Espera máxima en segundos. Default: None (sin límite).
+
+        Returns
+        -------
+        int
+            Número de envíos permitidos en este despertar (1..rafaga), o 0 si
+            se agotó `timeout`.
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            transcurrido = time.monotonic() - self.t0
+            disponibles = int(transcurrido * self.tasa) + 1 - self.consumidos
+            if disponibles > 0:
+                if disponibles > self.rafaga:
+                    # Tras un retraso largo no se envia una avalancha: se descartan permisos viejos
+                    self.consumidos += disponibles - self.rafaga
+                    disponibles = self.rafaga
+                self.consumidos += disponibles
+                return disponibles
+            espera = (self.consumidos - transcurrido * self.tasa) / self.tasa
+            if limite is not None:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    return 0
+                espera = min(espera, restante)
+            time.sleep(espera)
+
+    def instante(self, k):
+        """
+        Instante programado (time.monotonic) del envío número `k`.
+
+        Parameters
+        ----------
+        k : int
+
+        Returns
+        -------
+        float
+        """
+        return self.t0 + k / self.tasa
+
+
 class sender:
     """
     Clase para enviar datos a través de UDP. 
     Simula datos o los carga desde un archivo CSV y los envía a una dirección y puerto específicos.
+    También puede reproducir un registro grabado por `Registro` (ver `reproducir`).
 
     Attributes
     ----------
     opcion : str
-        Método de simulación a utilizar ("simuladorCSV" o "simuladorRandom").
+        Método de simulación a utilizar ("simuladorCSV", "simuladorRandom" o
+        "reproducir" para reenviar `ruta_registro`).
     simular : simuladorExperimento
         Instancia de la clase `simuladorExperimento` para generar los datos.
     UDP_IP : str
@@ -33,8 +130,24 @@ class sender:
         Indica si el envío de datos está activo.
     n : int
         Número de datos a enviar.
+    formato : str
+        Formato de trama a enviar: "texto" ('x00.00y') o "binario" (ver protocoloUDP).
+    secuencia : int
+        Número de secuencia de la siguiente trama binaria.
+    ruta_registro : str or None
+        Registro (npy, parquet, csv, zlib o lzma) a reproducir con la opción "reproducir".
+    velocidad : float
+        Factor de velocidad de la reproducción (1 = tiempo real, 10 = diez veces
+        más rápido, 0 o inf = tan rápido como sea posible).
+    tasa : float
+        Datos por segundo en `send` (2.0 equivale al intervalo original de 0.5 s).
+    verbose : bool
+        Si es True imprime cada dato enviado (sólo recomendable a tasas bajas).
+    enviados, errores : int
+        Datos enviados y errores de envío de la última ejecución de `send`.
     """
-    def __init__(self,isSending= False, opcion='simuladorCSV' , UDP_IP="192.168.1.66", UDP_PORT=8889, n=5000):
+    def __init__(self,isSending= False, opcion='simuladorCSV' , UDP_IP="192.168.1.66", UDP_PORT=8889, n=5000, formato="texto", n_canales=1,
+                 ruta_registro=None, velocidad=1.0, tasa=2.0, verbose=False):
         """
         Inicializa el objeto Sender con los parámetros dados.
 
@@ -50,61 +163,241 @@ class sender:
             Puerto UDP del receptor. Default: 8889.
         n : int, optional
             Número de datos a enviar. Default: 5000.
+        formato : str, optional
+            Formato de trama: "texto" o "binario". Default: "texto".
+        n_canales : int, optional
+            Número de termopares por dato simulado. Default: 1.
+        ruta_registro : str, optional
+            Registro a reproducir con opcion="reproducir". Default: None.
+        velocidad : float, optional
+            Factor de velocidad de la reproducción. Default: 1.0.
+        tasa : float, optional
+            Datos por segundo. Default: 2.0 (un dato cada 0.5 s).
+        verbose : bool, optional
+            Imprimir cada dato enviado. Default: False.
         
         """
+        if formato not in pr.FORMATOS:
+            raise ValueError(f"Formato de trama desconocido: {formato}")
         self.opcion=opcion
-        self.simular = simuladorExperimento(n)
+        self.simular = simuladorExperimento(n, n_canales=n_canales)
         self.UDP_IP, self.UDP_PORT= UDP_IP, UDP_PORT
         self.num_test=""
         self.isSending = isSending
         self.n= n
+        self.formato = formato
+        self.secuencia = 0
+        self._t0 = time.monotonic()     # Referencia para la marca de tiempo del dispositivo
+        self.ruta_registro, self.velocidad = ruta_registro, velocidad
+        self.tasa, self.verbose = tasa, verbose
+        self.enviados = self.errores = 0
+        self._t_inicio = self._t_fin = None
         
     def send(self):
         """
         Envía datos a través del protocolo UDP utilizando el método de simulación especificado.
         Si la opción no es válida, muestra un mensaje de error.
+
+        Usa un solo socket, tramas codificadas de antemano y un `ProgramadorTasa`
+        a `self.tasa` datos por segundo. Al terminar imprime `reporte()`.
         """
-        while self.isSending:
-            sock = sk.socket(sk.AF_INET, sk.SOCK_DGRAM)
-            metodo= getattr(self.simular, self.opcion, None)
-            if callable(metodo):
-                dataset= metodo()
-                for i, num_test in enumerate(dataset):
-                    try:
-                      sock.sendto(bytes(num_test, "utf-8"), (self.UDP_IP, self.UDP_PORT))
-                      #print("UDP IP:", self.UDP_IP)
-                      #print("UDP puerto:", self.UDP_PORT)
-                      print("Mensaje enviado:", num_test, "\n")
-                      time.sleep(0.5)
-
-                      if i>=self.n-1:
+        self.isSending = True
+        if self.opcion == "reproducir":
+            self.reproducir(self.ruta_registro, self.velocidad)
+            return
+        if self.simular.bloques(self.opcion) is None:
+            print(f"Error: la simulacion {self.opcion} no esta definida")
+            return
+
+        sock = sk.socket(sk.AF_INET, sk.SOCK_DGRAM)     # Un solo socket para todo el envio
+        sendto, destino = sock.sendto, (self.UDP_IP, self.UDP_PORT)
+        programador = ProgramadorTasa(self.tasa)
+        self.enviados = self.errores = 0
+        self._t_inicio, self._t_fin = time.monotonic(), None
+        try:
+            while self.isSending:
+                # Los datos se generan por bloques bajo demanda; cada bloque se codifica
+                # completo antes de enviarse, asi el ciclo de envio solo llama a sendto
+                generados = 0
+                for bloque in self.simular.bloques(self.opcion):
+                    if not self.isSending:
                         break
-                    except Exception as e:
-                        print(f"Error al enviar: {e}")
-                        pass 
-            else:
-                print(f"Error: la simulacion{self.tipo} no esta definida")
-            
+                    generados += len(bloque)
+                    datagramas = self._precodificar(bloque, programador)
+                    i = 0
+                    while i < len(datagramas) and self.isSending:
+                        permitidos = programador.esperar(0.1)       # Revisa la bandera de paro al menos cada 0.1 s
+                        for trama in datagramas[i:i + permitidos]:
+                            try:
+                                sendto(trama, destino)
+                                self.enviados += 1
+                            except OSError as e:
+                                self.errores += 1
+                                log.error("Error al enviar: %s", e)
+                        if self.verbose:
+                            for trama in datagramas[i:i + permitidos]:
+                                log.info("Mensaje enviado: %r", trama)
+                        i += permitidos
+                if not generados and self.isSending:
+                    log.warning("La simulacion %s no genero datos; se detiene el envio", self.opcion)
+                    break       # Repetir una fuente vacia solo ocuparia el CPU
+        finally:
+            sock.close()
+            self._t_fin = time.monotonic()
+            print(self.reporte())
+
+    def _precodificar(self, bloque, programador):
+        """
+        Codifica un bloque de muestras en tramas listas para enviar.
+
+        En formato binario la secuencia y la marca de tiempo de cada trama se
+        toman del instante programado para su envío.
+
+        Parameters
+        ----------
+        bloque : numpy.ndarray
+            Muestras de forma (k, canales) generadas por el simulador.
+        programador : ProgramadorTasa
+            Programador del envío en curso.
+
+        Returns
+        -------
+        list of bytes
+        """
+        if self.formato != "binario":
+            return pr.codificarLoteTexto(bloque)
+        k = np.arange(len(bloque))
+        secuencias = self.secuencia + k
+        t_ms = (programador.instante(programador.consumidos + k) - self._t0) * 1000
+        self.secuencia += len(bloque)
+        return pr.codificarLoteBinario(bloque, secuencias, t_ms)
+
+    def reporte(self):
+        """
+        Resume la última ejecución de `send`: tasa lograda frente a la objetivo.
+
+        Returns
+        -------
+        dict
+            enviados, errores, duracion (s), tasa_objetivo y tasa_lograda (datos/s).
+        """
+        if self._t_inicio is None:
+            duracion = 0.0
+        else:
+            duracion = (self._t_fin or time.monotonic()) - self._t_inicio
+        lograda = self.enviados / duracion if duracion > 0 else 0.0
+        return {"enviados": self.enviados, "errores": self.errores, "duracion": duracion,
+                "tasa_objetivo": self.tasa, "tasa_lograda": lograda}
+
+    def reproducir(self, ruta, velocidad=1.0):
+        """
+        Reenvía un registro grabado respetando su temporización original.
+
+        El registro se lee por bloques (ver almacenamiento.iterarBloques), así
+        que la memoria no depende de su duración. Los intervalos entre muestras
+        se toman de la columna 't' y se dividen entre `velocidad`; con
+        velocidad 0 o infinita se envía tan rápido como sea posible. Las
+        muestras inválidas (NaN) se reenvían como tramas inválidas.
+
+        Parameters
+        ----------
+        ruta : str
+            Archivo o directorio del registro.
+        velocidad : float, optional
+            Factor de velocidad. Default: 1.0 (tiempo real).
+
+        Returns
+        -------
+        int
+            Número de muestras enviadas.
+        """
+        escala = 0.0 if not velocidad or np.isinf(velocidad) else 1.0 / velocidad
+        sock = sk.socket(sk.AF_INET, sk.SOCK_DGRAM)
+        destino = (self.UDP_IP, self.UDP_PORT)
+        self.isSending = True
+        enviados, t_reg0, t_real0 = 0, None, time.monotonic()
+        try:
+            for columnas, bloque in alm.iterarBloques(ruta):
+                i_t = columnas.index('t') if 't' in columnas else None
+                canales = np.asarray(bloque[[k for k in range(len(columnas)) if k != i_t]]).T
+                tiempos = bloque[i_t] if i_t is not None else np.arange(enviados, enviados + len(canales)) * 0.5
+                for t, valores in zip(tiempos, canales):
+                    if not self.isSending:
+                        return enviados
+                    if t_reg0 is None:
+                        t_reg0 = t
+                    espera = t_real0 + (t - t_reg0) * escala - time.monotonic()
+                    if espera > 0:
+                        time.sleep(espera)
+                    sock.sendto(self.codificarValores(valores), destino)
+                    enviados += 1
+        finally:
             sock.close()
-            
+            print(f"Reproduccion terminada: {enviados} datos enviados")
+        return enviados
+
+    def codificarValores(self, valores, t_ms=None):
+        """
+        Construye una trama a partir de los valores numéricos de una muestra.
+
+        Una muestra con NaN se envía como trama inválida: en texto con '?' en
+        lugar de dígitos y en binario con el CRC alterado (conserva su número
+        de secuencia, así que el receptor la cuenta como perdida).
+
+        Parameters
+        ----------
+        valores : array_like
+            Un valor por canal.
+        t_ms : float, optional
+            Marca de tiempo del dispositivo (ms) para tramas binarias. Default:
+            el tiempo transcurrido desde que se creó el emisor.
+
+        Returns
+        -------
+        bytes
+            Trama a enviar en el formato configurado.
+        """
+        valores = np.atleast_1d(valores)
+        if self.formato == "binario":
+            if t_ms is None:
+                t_ms = (time.monotonic() - self._t0) * 1000
+            trama = pr.codificarBinario(valores[0] if len(valores) == 1 else valores, self.secuencia, t_ms)
+            self.secuencia += 1
+            if np.isnan(valores).any():
+                trama = trama[:-1] + bytes([trama[-1] ^ 0xFF])      # CRC invalido: el receptor la descarta
+            return trama
+        if np.isnan(valores).any():
+            return b"x" + b"?" * 5 + b"y"      # Se reproduce como trama invalida
+        return pr.codificarTexto([f"{v:05.2f}" for v in valores])
+
     def detenerEnvio(self):
         """
         Detiene el envío de datos.
         """
-        self.is_sending = False
+        self.isSending = False
 
 class simuladorExperimento:
     """
     Clase para simular experimentos y generar datos aleatorios o cargar datos desde un archivo CSV.
 
+    Las fuentes son generadores que producen bloques de muestras bajo demanda
+    (`fuenteRandom`, `fuenteTermica`, `fuenteCSV`), de modo que el tiempo de
+    arranque es constante y la memoria no depende del número de datos.
+
     Attributes
     ----------
     is_sending : bool
         Indica si se están generando datos para envío.
     repeticiones : int
         Número de datos a generar.
+    n_canales : int
+        Número de termopares simulados por dato.
+    ruta_csv : str
+        Archivo CSV usado por `simuladorCSV`/`fuenteCSV`.
+    bloque : int
+        Número de muestras por bloque generado.
     """
-    def __init__(self, n, is_sending=True):
+    def __init__(self, n, is_sending=True, n_canales=1, ruta_csv=r"C:\Users\iapcl\Documents\BioC\DatosEmulador.csv", bloque=4096):
         """
         Inicializa la clase con el número de datos a generar.
 
@@ -114,62 +407,178 @@ class simuladorExperimento:
             Número de datos a generar.
         is_sending : bool, optional
             Indica si la simulación está activa. Default: True.
+        n_canales : int, optional
+            Número de termopares simulados por dato. Default: 1.
+        ruta_csv : str, optional
+            Archivo CSV de datos del emulador.
+        bloque : int, optional
+            Muestras por bloque generado. Default: 4096.
         """
         self.is_sending=is_sending
         self.repeticiones= n
-        
-    
+        self.n_canales = n_canales
+        self.ruta_csv = ruta_csv
+        self.bloque = bloque
+        self._rng = np.random.default_rng()
+
+    def _tamanos(self, n=None):
+        """Tamaños de bloque que suman `n` (por defecto `repeticiones`) muestras."""
+        restantes = self.repeticiones if n is None else n
+        while restantes > 0:
+            k = min(self.bloque, restantes)
+            yield k
+            restantes -= k
+
+    def fuenteRandom(self, n=None, mu=50, sigma=5):
+        """
+        Genera bloques de temperaturas aleatorias con distribución normal.
+
+        Parameters
+        ----------
+        n : int, optional
+            Número de datos. Default: `repeticiones`.
+        mu : float, optional
+            Media (valor central). Default: 50.
+        sigma : float, optional
+            Desviación estándar. Default: 5.
+
+        Yields
+        ------
+        numpy.ndarray
+            Bloque de forma (k, n_canales), redondeado a 2 decimales.
+        """
+        for k in self._tamanos(n):
+            yield np.round(self._rng.normal(mu, sigma, (k, self.n_canales)), 2)
+
+    def fuenteTermica(self, n=None, T0=25.0, Tf=60.0, tau=600.0, dt=0.5, ruido=0.05):
+        """
+        Genera bloques de una curva de calentamiento exponencial con ruido:
+        T(t) = Tf - (Tf - T0) * exp(-t / tau) + ruido.
+
+        Parameters
+        ----------
+        n : int, optional
+            Número de datos. Default: `repeticiones`.
+        T0, Tf : float, optional
+            Temperatura inicial y final. Default: 25 y 60.
+        tau : float, optional
+            Constante de tiempo en segundos. Default: 600.
+        dt : float, optional
+            Intervalo entre muestras en segundos. Default: 0.5.
+        ruido : float, optional
+            Desviación estándar del ruido del sensor. Default: 0.05.
+
+        Yields
+        ------
+        numpy.ndarray
+            Bloque de forma (k, n_canales), redondeado a 2 decimales.
+        """
+        i0 = 0
+        for k in self._tamanos(n):
+            t = (i0 + np.arange(k))[:, None] * dt
+            curva = Tf - (Tf - T0) * np.exp(-t / tau)
+            yield np.round(curva + self._rng.normal(0, ruido, (k, self.n_canales)), 2)
+            i0 += k
+
+    def fuenteCSV(self, n=None, ruta_csv=None):
+        """
+        Lee el archivo CSV por bloques, sin cargarlo completo.
+
+        Parameters
+        ----------
+        n : int, optional
+            Máximo de datos a leer. Default: `repeticiones`.
+        ruta_csv : str, optional
+            Archivo CSV. Default: `self.ruta_csv`.
+
+        Yields
+        ------
+        numpy.ndarray
+            Bloque de forma (k, n_canales) con las primeras columnas del archivo.
+        """
+        import pandas as pd      # Solo la simulacion desde CSV lo necesita
+        restantes = self.repeticiones if n is None else n
+        for df in pd.read_csv(ruta_csv or self.ruta_csv, header=None, chunksize=self.bloque):
+            if restantes <= 0:
+                break
+            valores = df.to_numpy(dtype=np.float64)[:restantes, :self.n_canales]
+            restantes -= len(valores)
+            yield valores
+
+    def bloques(self, opcion):
+        """
+        Devuelve la fuente de bloques numéricos asociada a una opción de simulación.
+
+        Parameters
+        ----------
+        opcion : str
+            "simuladorRandom", "simuladorCSV", "simuladorTermico" o el nombre de una fuente.
+
+        Returns
+        -------
+        generator or None
+        """
+        fuentes = {"simuladorRandom": self.fuenteRandom, "simuladorCSV": self.fuenteCSV,
+                   "simuladorTermico": self.fuenteTermica}
+        metodo = fuentes.get(opcion)
+        if metodo is None and opcion.startswith("fuente"):
+            metodo = getattr(self, opcion, None)
+        return metodo() if callable(metodo) else None
+
+    @staticmethod
+    def _aTexto(bloques):
+        for bloque in bloques:
+            for trama in pr.codificarLoteTexto(bloque, "%.2f"):
+                yield trama.decode("ascii")
+
     def simuladorRandom(self): #-----------------------------------------------------
         """
         Genera datos aleatorios en el formato 'x00.00y', donde:
         - 'x': Identificador inicial del dato.
         - '00.00': Temperatura registrada por el sensor (valor aleatorio).
+          Con varios canales se envía un valor por termopar separado por comas.
         - 'y': Identificador final del dato.
 
         Returns
         -------
-        list
-            Lista de cadenas representando los datos generados.
+        generator of str
+            Cadenas representando los datos, generadas por bloques bajo demanda.
         """
-        mu= 50  #Media (valor central)
-        sigma=5 #Desviacion estandar
-        
-        dataset=[]
-        
-        for i in range(self.repeticiones):
-            num_random=[]           #Lista vacia
-            num_random.append('x')  # en el algoritmo, el x sirve para verificar inicio 
-        
-            # Generar un numero flotante aleatorio de 4 digitos, 2 antes del punto y 2 despues
-            digit = round(random.gauss(mu,sigma),2)     #Redondear a 2 decimales
-            num_random.append(str(digit))               #Convertir a cadena de texto y concatenarlo
-                
-            num_random.append('y')   # se agrega el ultimo digito de la cadena para verificar si llega completo el dato
-        
-            # Concatenar lista en cadena
-            num_test = ''.join(num_random)
-            
-            dataset.append(num_test)
-            
-        print(f"\n-------------------- \n Enviar:{dataset}")
-        
-        return dataset
+        return self._aTexto(self.fuenteRandom())
+
+    def simuladorTermico(self):
+        """
+        Genera datos 'x<valor>y' de una curva de calentamiento (ver `fuenteTermica`).
+
+        Returns
+        -------
+        generator of str
+        """
+        return self._aTexto(self.fuenteTermica())
     
     # Importar datos de archivo CSV
     def simuladorCSV(self):
         """
-        Carga datos desde un archivo CSV y los convierte al formato 'x<data>y'.
+        Lee datos desde un archivo CSV por bloques y los convierte al formato 'x<data>y'.
 
         Returns
         -------
-        list
-            Lista de cadenas representando los datos cargados.
+        generator of str
+            Cadenas representando los datos, leídas por bloques bajo demanda.
         """
-        ruta_csv=r"C:\Users\iapcl\Documents\BioC\DatosEmulador.csv"
-        data = pd.read_csv(ruta_csv, header=None)
-        dataset= ["x"+str(valor[0])+"y" for valor in data.values]
-        
-        #print(f"\n-------------------- \n Enviar:{dataset}")
-        
-        return dataset
-    
\ No newline at end of file
+        return self._aTexto(self.fuenteCSV())
+
+
+if __name__ == "__main__":
+    # Reproducir un registro grabado hacia un receptor (por defecto local)
+    parser = argparse.ArgumentParser(description="Reproduce un registro grabado por UDP")
+    parser.add_argument("registro", help="Archivo o directorio del registro (npy, parquet, csv, zlib o lzma)")
+    parser.add_argument("--ip", default="127.0.0.1", help="Direccion del receptor")
+    parser.add_argument("--puerto", type=int, default=8889, help="Puerto del receptor")
+    parser.add_argument("--velocidad", type=float, default=1.0,
+                        help="Factor de velocidad (1 = tiempo real, 0 = tan rapido como sea posible)")
+    parser.add_argument("--formato", choices=pr.FORMATOS, default="texto", help="Formato de trama")
+    args = parser.parse_args()
+    emisor = sender(True, "reproducir", args.ip, args.puerto, formato=args.formato,
+                    ruta_registro=args.registro, velocidad=args.velocidad)
+    emisor.send()
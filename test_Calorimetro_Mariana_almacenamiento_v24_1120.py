@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de ida y vuelta y de recuperación de `Calorimetro_Mariana_almacenamiento_v24_1120`.
+"""
+import numpy as np
+import pytest
+import Calorimetro_Mariana_almacenamiento_v24_1120 as alm
+
+
+def leerTodo(ruta, formato=None):
+    """(columnas, datos de forma (columnas, n)) de un registro, sin pandas."""
+    columnas, bloques = None, []
+    for columnas, bloque in alm.iterarBloques(str(ruta), formato):
+        bloques.append(np.asarray(bloque))
+    return columnas, np.concatenate(bloques, axis=1)
+
+
+def muestras(n, t0=1000.0, canales=1):
+    """Bloque (1 + canales, n) con 't' creciente y una rampa por canal."""
+    t = t0 + 0.5 * np.arange(n)
+    return np.vstack([t] + [20.0 + 0.01 * np.arange(n) + c for c in range(canales)])
+
+
+def test_bitacora_agrega_crece_y_rebobina(tmp_path):
+    ruta = str(tmp_path / "r.bitacora")
+    bitacora = alm.BitacoraMmap(ruta, ("t", "T"), capacidad=4)
+    filas = muestras(10).T
+    bitacora.agregar(filas[0])
+    bitacora.extender(filas[1:])               # Supera la capacidad inicial
+    assert bitacora.capacidad >= 10
+    bitacora.marcarPersistidas(6)
+    np.testing.assert_array_equal(bitacora.pendientes(), filas[6:])
+    bitacora.marcarPersistidas(4)
+    assert bitacora.n == bitacora.persistidas == 0 and len(bitacora.pendientes()) == 0
+    bitacora.cerrar(borrar=True)
+    assert not (tmp_path / "r.bitacora").exists()
+
+
+def test_bitacora_sobrevive_a_un_cierre_inesperado(tmp_path):
+    ruta = str(tmp_path / "r.bitacora")
+    filas = muestras(50).T
+    bitacora = alm.BitacoraMmap(ruta, ("t", "T"))
+    bitacora.extender(filas)
+    bitacora.marcarPersistidas(20)
+    bitacora.cerrar()                           # Sin borrar: como si el proceso terminara
+    reabierta = alm.BitacoraMmap(ruta, ())
+    assert reabierta.columnas == ("t", "T")
+    np.testing.assert_array_equal(reabierta.pendientes(), filas[20:])
+    reabierta.cerrar()
+
+
+def test_recuperar_bitacora_agrega_sin_tocar_lo_guardado(tmp_path):
+    ruta_registro, ruta_bitacora = str(tmp_path / "r.npy"), str(tmp_path / "r.npy.bitacora")
+    datos = muestras(300)
+    escritor = alm.crearEscritor("npy", ruta_registro, ("t", "T"))
+    escritor.escribir(datos[:, :100])
+    escritor.cerrar()
+    bitacora = alm.BitacoraMmap(ruta_bitacora, ("t", "T"))
+    bitacora.extender(datos.T)
+    bitacora.marcarPersistidas(100)
+    bitacora.cerrar()
+    assert alm.recuperarBitacora(ruta_bitacora, "npy", ruta_registro) == 200
+    assert not (tmp_path / "r.npy.bitacora").exists()
+    columnas, leidos = leerTodo(ruta_registro)
+    assert columnas == ("t", "T")
+    np.testing.assert_array_equal(leidos, datos)
+    assert alm.recuperarBitacora(ruta_bitacora, "npy", ruta_registro) == 0
+
+
+def test_registro_recupera_tras_un_cierre_inesperado(tmp_path):
+    import queue as qu
+    import Calorimetro_Mariana_receiverUDP_v24_1120 as rc
+
+    def registro():
+        r = rc.Registro(True, qu.Queue(), qu.Queue(), qu.Queue(), serie_viva=False, medidores=False,
+                        politica=alm.PoliticaVaciado(muestras=100), buffers=0)
+        r.ruta_registro = str(tmp_path / "r.npy")
+        r._iniciarRegistro()
+        return r
+
+    r = registro()
+    r._registrarLote(np.arange(250.0)[:, None], 1000.0)
+    r.bitacora.cerrar()                         # El proceso termina sin detenerRegistro
+    r = registro()                              # La siguiente ejecucion recupera lo pendiente
+    r.detenerRegistro()
+    _, leidos = leerTodo(tmp_path / "r.npy")
+    np.testing.assert_array_equal(leidos[1], np.arange(250.0))
+
+
+def test_comprimido_ida_y_vuelta(tmp_path):
+    for compresor in alm.FORMATOS_COMPRIMIDOS:
+        ruta = str(tmp_path / f"r.{compresor}")
+        datos = muestras(1000, canales=2)
+        datos[1, 10] = np.nan                   # Dato invalido
+        escritor = alm.crearEscritor(compresor, ruta, ("t", "T0", "T1"))
+        for i in range(0, 1000, 300):           # Bloques de distinto tamaño
+            escritor.escribir(datos[:, i:i + 300])
+        escritor.cerrar()
+        assert alm.detectarFormato(ruta) == compresor
+        lector = alm.LectorComprimido(ruta)
+        assert (lector.columnas, len(lector), lector.n_muestras) == (("t", "T0", "T1"), 4, 1000)
+        _, leidos = leerTodo(ruta)
+        assert np.isnan(leidos[1, 10]) and np.isfinite(np.delete(leidos, 10, axis=1)).all()
+        np.testing.assert_allclose(leidos[0], datos[0], rtol=0, atol=alm.RESOLUCION_TIEMPO / 2)
+        np.testing.assert_allclose(leidos[1:], datos[1:], rtol=0, atol=alm.RESOLUCION_SENSOR / 2)
+        np.testing.assert_array_equal(lector.leer(2), leidos[:, 600:900])
+
+
+def test_comprimido_valores_fuera_de_rango_se_leen_como_nan(tmp_path):
+    ruta = str(tmp_path / "r.zlib")
+    datos = muestras(8)
+    datos[1, 2], datos[1, 4], datos[1, 5], datos[1, 6] = 1e300, np.inf, -1e300, -np.inf
+    escritor = alm.crearEscritor("zlib", ruta, ("t", "T"))
+    escritor.escribir(datos)
+    escritor.cerrar()
+    _, leidos = leerTodo(ruta)
+    invalidos = [2, 4, 5, 6]
+    assert np.isnan(leidos[1, invalidos]).all()
+    # Las demas no se corrompen por el desborde de las diferencias
+    np.testing.assert_allclose(np.delete(leidos[1], invalidos), np.delete(datos[1], invalidos), atol=0.005)
+
+
+def test_comprimido_continua_y_descarta_un_bloque_cortado(tmp_path):
+    ruta = str(tmp_path / "r.lzma")
+    datos = muestras(300)
+    escritor = alm.crearEscritor("lzma", ruta, ("t", "T"))
+    escritor.escribir(datos[:, :100])
+    escritor.cerrar()
+    with open(ruta, "ab") as f:
+        f.write(b"\x10\x00\x00\x00basura")     # Bloque a medio escribir
+    escritor = alm.crearEscritor("lzma", ruta, ("t", "T"))
+    escritor.escribir(datos[:, 100:])
+    escritor.cerrar()
+    _, leidos = leerTodo(ruta)
+    np.testing.assert_allclose(leidos, datos, atol=alm.RESOLUCION_SENSOR / 2)
+    with pytest.raises(ValueError):
+        alm.crearEscritor("lzma", ruta, ("t", "T0", "T1"))
+
+
+def escribirRegistro(ruta, formato, datos, filas=100):
+    escritor = alm.crearEscritor(formato, str(ruta), ("t", "T"))
+    for i in range(0, datos.shape[1], filas):
+        escritor.escribir(datos[:, i:i + filas])
+    escritor.cerrar()
+
+
+def test_indice_carga_solo_el_intervalo(tmp_path):
+    datos = muestras(500)                       # 5 bloques de 50 s
+    for formato in ("npy", "zlib"):
+        ruta = tmp_path / f"r.{formato}"
+        escribirRegistro(ruta, formato, datos)
+        indice = alm.IndiceRegistro(str(ruta))
+        assert (indice.formato, len(indice), indice.n_muestras) == (formato, 5, 500)
+        assert indice.intervalo == (1000.0, 1249.5)
+        assert indice.bloquesEn(1060.0, 1120.0).tolist() == [1, 2]
+        t, leidos, resumido = indice.cargarIntervalo(1060.0, 1120.0)
+        dentro = (datos[0] >= 1060.0) & (datos[0] <= 1120.0)
+        assert not resumido
+        np.testing.assert_array_equal(t, datos[0, dentro])
+        np.testing.assert_allclose(leidos, datos[:, dentro], atol=alm.RESOLUCION_SENSOR / 2)
+        t, resumen, resumido = indice.cargarIntervalo(maximo=100)     # Demasiadas: resumen por bloque
+        assert resumido and len(t) == 10
+        np.testing.assert_allclose(resumen[1, 0::2], datos[1, ::100], atol=alm.RESOLUCION_SENSOR / 2)
+        np.testing.assert_allclose(resumen[1, 1::2], datos[1, 99::100], atol=alm.RESOLUCION_SENSOR / 2)
+
+
+def test_indice_se_reutiliza_y_crece(tmp_path):
+    ruta = tmp_path / "r.npy"
+    datos = muestras(500)
+    escribirRegistro(ruta, "npy", datos[:, :300])
+    alm.IndiceRegistro(str(ruta))
+    assert (ruta / "indice.npz").exists()
+    escribirRegistro(ruta, "npy", datos[:, 300:])     # El registro sigue creciendo
+    indice = alm.IndiceRegistro(str(ruta))
+    assert (len(indice), indice.n_muestras) == (5, 500)
+    t, leidos, _ = indice.cargarIntervalo(1200.0, None)
+    np.testing.assert_array_equal(leidos, datos[:, datos[0] >= 1200.0])
+
+
+def test_catalogo_lista_y_abre_corridas(tmp_path):
+    escribirRegistro(tmp_path / "b.npy", "npy", muestras(200, t0=5000.0))
+    escribirRegistro(tmp_path / "a.zlib", "zlib", muestras(300, t0=2000.0))
+    (tmp_path / "notas.txt").write_text("no es un registro")
+    (tmp_path / "roto.zlib").write_bytes(b"basura")
+    catalogo = alm.CatalogoCorridas(str(tmp_path))
+    assert [(c["nombre"], c["formato"], c["n_muestras"]) for c in catalogo.corridas] == \
+        [("a.zlib", "zlib", 300), ("b.npy", "npy", 200)]
+    assert (tmp_path / "catalogo.json").exists()
+    assert catalogo.abrir("b.npy").intervalo == (5000.0, 5099.5)
+    with pytest.raises(KeyError):
+        catalogo.abrir("c.npy")
+    escribirRegistro(tmp_path / "b.npy", "npy", muestras(100, t0=5100.0))
+    assert [c["n_muestras"] for c in alm.CatalogoCorridas(str(tmp_path)).corridas] == [300, 300]
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de la decodificación por lotes de `Calorimetro_Mariana_protocoloUDP_v24_1120`.
+"""
+import numpy as np
+import Calorimetro_Mariana_protocoloUDP_v24_1120 as pr
+
+
+def test_texto_con_fin_de_linea_y_espacios():
+    lote = pr.decodificarLote([b"x50.12y", b"x50.12y\r\n", b" x50.12y", b"x50.12y\n", b"\tx50.12y  "])
+    assert lote.mascara.all()
+    np.testing.assert_allclose(lote.valores[:, 0], 50.12)
+
+
+def test_texto_invalido_sigue_rechazado():
+    lote = pr.decodificarLote([b"x50.1y\r\n", b"x5a.12y", b"50.12y\r\n", b"x50.12 y"])
+    assert not lote.mascara.any()
+    assert np.isnan(lote.valores).all()
+
+
+def test_binario_no_se_recorta():
+    trama = pr.codificarBinario(23.5, 7, 1000)
+    lote = pr.decodificarLote([trama, b"x21.00y\r\n"])
+    assert lote.mascara.tolist() == [True, True]
+    np.testing.assert_allclose(lote.valores[:, 0], [23.5, 21.0])
+    assert lote.secuencias[0] == 7
+
+
+def test_binario_v1_ida_y_vuelta():
+    trama = pr.codificarBinario(23.5, 2 ** 32 + 7, 123456)
+    assert len(trama) == pr.LONGITUD_BINARIO and pr.esBinario(trama)
+    decodificada = pr.decodificarBinario(trama)
+    assert (decodificada.version, decodificada.secuencia, decodificada.t_dispositivo) == (1, 7, 123456)
+    assert decodificada.valores == (23.5,)
+
+
+def test_binario_v2_multicanal_ida_y_vuelta():
+    trama = pr.codificarBinario([21.25, -3.5, 100.0], 9, 42)
+    assert len(trama) == pr.longitudMulticanal(3)
+    decodificada = pr.decodificarBinario(trama)
+    assert (decodificada.version, decodificada.secuencia) == (2, 9)
+    assert decodificada.valores == (21.25, -3.5, 100.0)
+    lote = pr.decodificarLote([trama], n_canales=3)
+    assert lote.mascara.all() and lote.secuencias[0] == 9 and lote.t_dispositivo[0] == 42
+    np.testing.assert_allclose(lote.valores[0], [21.25, -3.5, 100.0])
+
+
+def test_binario_lote_igual_que_por_trama():
+    valores = np.array([[20.0, 30.0], [20.5, 30.5], [21.0, 31.0]])
+    tramas = pr.codificarLoteBinario(valores, [5, 6, 7], [100, 200, 300])
+    assert tramas == [pr.codificarBinario(v, s, t) for v, s, t in zip(valores, [5, 6, 7], [100, 200, 300])]
+    lote = pr.decodificarLote(tramas, n_canales=2)
+    np.testing.assert_allclose(lote.valores, valores)
+    assert lote.secuencias.tolist() == [5, 6, 7]
+
+
+def test_binario_corrupto_se_rechaza():
+    for trama, n_canales in ((pr.codificarBinario(23.5, 1, 2), 1), (pr.codificarBinario([1.0, 2.0], 1, 2), 2)):
+        for i in range(2, len(trama)):          # Cualquier byte alterado tras magic/version
+            alterada = bytearray(trama)
+            alterada[i] ^= 0x01
+            assert pr.decodificarBinario(bytes(alterada)) is None
+        assert pr.decodificarBinario(trama[:-1]) is None          # Truncada
+        crc_malo = trama[:-1] + bytes([trama[-1] ^ 0xFF])
+        lote = pr.decodificarLote([crc_malo, trama], n_canales=n_canales)
+        assert lote.mascara.tolist() == [False, True]
+        assert lote.secuencias.tolist() == [-1, 1] and np.isnan(lote.valores[0]).all()
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas del reordenamiento y del registro de `Calorimetro_Mariana_receiverUDP_v24_1120`.
+"""
+import numpy as np
+import Calorimetro_Mariana_protocoloUDP_v24_1120 as pr
+import Calorimetro_Mariana_receiverUDP_v24_1120 as rc
+
+
+def lote(secuencias, t=1000.0):
+    """LoteDatos de un canal con valor igual a la secuencia."""
+    sec = np.asarray(secuencias, dtype=np.int64)
+    n = len(sec)
+    decodificado = pr.LoteDecodificado(sec[:, None].astype(float), np.ones(n, dtype=bool), sec,
+                                       np.full(n, -1, dtype=np.int64))
+    return rc.LoteDatos(decodificado, [("127.0.0.1", 5000)] * n, t)
+
+
+def entregadas(reordenador, *lotes):
+    salida = []
+    for i, secuencias in enumerate(lotes):
+        listo = reordenador.procesar(lote(secuencias), ahora=1000.0 + 0.01 * i)
+        if listo is not None:
+            salida += listo.secuencias.tolist()
+    listo = reordenador.vaciar()
+    if listo is not None:
+        salida += listo.secuencias.tolist()
+    return salida
+
+
+def test_reordena_sin_perdidas():
+    r = rc.ReordenadorSecuencias(ventana=16, espera=10)
+    assert entregadas(r, [0, 1, 3, 2], [5, 4, 6], [7, 9, 8]) == list(range(10))
+    assert (r.perdidos, r.duplicados, r.reordenados) == (0, 0, 3)
+
+
+def test_duplicadas_y_tardias():
+    r = rc.ReordenadorSecuencias(ventana=2, espera=10)
+    assert entregadas(r, [0, 1, 1], [3, 4, 5], [2]) == [0, 1, 3, 4, 5]
+    assert (r.perdidos, r.duplicados, r.tardios) == (1, 1, 1)
+
+
+def test_reinicio_del_emisor():
+    r = rc.ReordenadorSecuencias(ventana=16, espera=10)
+    assert entregadas(r, range(5000, 5010)) == list(range(5000, 5010))
+    nuevas = entregadas(r, range(0, 500), range(500, 1000))
+    assert nuevas == list(range(1000))
+    assert r.duplicados == 0
+
+
+def test_reinicio_sobre_perdidas_por_racha():
+    r = rc.ReordenadorSecuencias(ventana=4, espera=10)
+    entregadas(r, [0, 1], range(3, 30))            # La 2 queda como perdida
+    assert r.perdidos == 1
+    # El emisor vuelve a empezar en 2: parece una tardia, pero la racha de viejas supera la ventana
+    assert entregadas(r, range(2, 10)) == list(range(2, 10))
+    assert r.tardios == 0
+
+
+def registro(ruta, **opciones):
+    import queue as qu
+    r = rc.Registro(True, qu.Queue(), qu.Queue(), qu.Queue(), serie_viva=False, medidores=False, **opciones)
+    r.ruta_registro = str(ruta)
+    r._iniciarRegistro()
+    return r
+
+
+def test_analisis_por_periodo_igual_que_por_lote(tmp_path):
+    import Calorimetro_Mariana_calorimetria_v24_1120 as cal
+    import Calorimetro_Mariana_estadistica_v24_1120 as est
+    r = registro(tmp_path / "r.npy", bitacora=False)
+    r.PERIODO_ANALISIS = 3600.0         # Todo se analiza al detener el registro
+    referencia = cal.Calorimetro()
+    estadisticas = est.EstadisticasCanales(ventanas=(60, 600))
+    for i in range(200):
+        temperatura = np.array([[20.0 + 0.01 * i]])
+        r._registrarLote(temperatura, 1000.0 + 0.5 * i)
+        referencia.actualizar(r._t_previo, temperatura[0, 0])
+        estadisticas.actualizar(temperatura)
+        r._revisarBloque()
+    assert r.calorimetro.ultimo is None and r.estadisticas.acumulada.n[0] == 0
+    r.detenerRegistro()
+    np.testing.assert_allclose(r.calorimetro.ultimo.dTdt, referencia.ultimo.dTdt)
+    np.testing.assert_allclose(r.calorimetro.energia, referencia.energia)
+    obtenido, esperado = r.estadisticas.resumen()["Temperatura"], estadisticas.resumen()["Temperatura"]
+    assert obtenido["n"] == esperado["n"] == 200
+    for clave in ("media", "desviacion", "minimo", "maximo", "ewma"):
+        np.testing.assert_allclose(obtenido[clave], esperado[clave])
+    np.testing.assert_allclose(obtenido["ventanas"][60]["media"], esperado["ventanas"][60]["media"])
+
+
+def test_buffer_muestras_extender_hasta_llenar():
+    buffer = rc.BufferMuestras(capacidad=4, canales=('t', 'T'))
+    valores = np.arange(12.0).reshape(6, 2)
+    assert buffer.extender(valores) == 4 and buffer.lleno
+    bloque = buffer.extraer()
+    assert len(buffer) == 0 and not buffer.lleno
+    assert buffer.extender(valores[4:]) == 2
+    buffer.agregar([100.0, 101.0])
+    np.testing.assert_array_equal(bloque, valores[:4].T)      # El bloque entregado no se sobrescribe
+    np.testing.assert_array_equal(buffer.vista(), [[8.0, 10.0, 100.0], [9.0, 11.0, 101.0]])
+    assert not buffer.vista().flags.writeable
+
+
+def test_serie_viva_crece_sin_perder_muestras():
+    serie = rc.SerieViva(('t', 'T'), capacidad=4)
+    previa = None
+    for i in range(10):
+        serie.extender(np.array([[i, 2.0 * i], [i + 0.5, 2.0 * i + 1]]))
+        if i == 1:
+            previa = serie.vista()
+    assert len(serie) == 20 and serie._datos.shape[1] >= 20
+    np.testing.assert_array_equal(serie.vista()[1], np.arange(20.0))
+    np.testing.assert_array_equal(previa[1], np.arange(4.0))      # Una vista anterior sigue valida
+
+
+def test_registro_entrega_bloques_y_vacia_al_detener(tmp_path):
+    import Calorimetro_Mariana_almacenamiento_v24_1120 as alm
+    r = registro(tmp_path / "r.npy", politica=alm.PoliticaVaciado(muestras=100), buffers=0)
+    r._registrarLote(np.arange(250.0)[:, None], 1000.0)
+    bloques = [np.load(b) for b in alm.bloquesNPY(r.ruta_registro)]
+    assert [b.shape[1] for b in bloques] == [100, 100]
+    assert r.bitacoraPendientes() == 50 and len(r.data_register) == 50
+    r.detenerRegistro()
+    datos = np.hstack([np.load(b) for b in alm.bloquesNPY(r.ruta_registro)])
+    np.testing.assert_array_equal(datos[1], np.arange(250.0))
+    np.testing.assert_array_equal(datos[0], 1000.0)       # Sin lote anterior no hay desde donde repartir
+    assert not (tmp_path / "r.npy.bitacora").exists()
+
+
+def test_registro_marca_la_bitacora_con_lo_persistido(tmp_path):
+    import time
+    import Calorimetro_Mariana_almacenamiento_v24_1120 as alm
+    r = registro(tmp_path / "r.npy", politica=alm.PoliticaVaciado(muestras=100), buffers=2)
+    r._registrarLote(np.arange(230.0)[:, None], 1000.0)
+    assert r.bitacoraPendientes() == 230
+    limite = time.monotonic() + 5
+    while r.escritorPendientes() and time.monotonic() < limite:
+        time.sleep(0.01)
+    assert r.escritor.tomarPersistidas() == 200
+    assert r.escritor.tomarPersistidas() == 0              # Cada muestra se cuenta una vez
+    r.bitacora.marcarPersistidas(200)
+    assert r.bitacoraPendientes() == 30
+    r.detenerRegistro()
+    assert r.bitacora is None and not (tmp_path / "r.npy.bitacora").exists()
+    assert sum(np.load(b).shape[1] for b in alm.bloquesNPY(r.ruta_registro)) == 230